@@ -0,0 +1,81 @@
+# Copyright (c) 2025 ByteDance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""Extra cost per edit of the crash-safe writes of the edit tool.
+
+Writes a source file repeatedly, in place (the previous behaviour of the edit
+tool), with the edit tool flushing to disk at the end of every step of
+`--edits-per-step` edits (the default), and with the edit tool flushing after
+every write. Exits with an error when the default exceeds the in-place write
+by more than `--budget-us` per edit.
+
+Usage:
+    python benchmarks/atomic_write.py [--size 20000] [--edits 500] [--edits-per-step 4] [--budget-us 500]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from trae_agent.tools.edit_tool import TextEditorTool  # noqa: E402
+
+
+def in_place(path: Path, contents: list[str], edits_per_step: int) -> None:
+    for content in contents:
+        _ = path.write_text(content)
+
+
+def edit_tool(defer_fsync: bool):
+    def write(path: Path, contents: list[str], edits_per_step: int) -> None:
+        tool = TextEditorTool()
+        tool.defer_fsync = defer_fsync
+        for i, content in enumerate(contents, 1):
+            tool.write_file(path, content)
+            if i % edits_per_step == 0:
+                tool.end_step()
+        tool.end_step()
+
+    return write
+
+
+def measure(function, path: Path, contents: list[str], edits_per_step: int) -> float:
+    start = time.perf_counter()
+    function(path, contents, edits_per_step)
+    return (time.perf_counter() - start) / len(contents)
+
+
+def main(size: int, edits: int, edits_per_step: int, budget_us: float) -> None:
+    line = "value = compute(value)  # keep the line a typical length\n"
+    text = (line * (size // len(line) + 1))[:size]
+    contents = [f"# edit {i}\n{text}" for i in range(edits)]
+    print(f"{edits} edits of a {size} bytes file, {edits_per_step} per step")
+    print(f"{'write':<22}{'per edit (us)':>16}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "file.py"
+        results = {}
+        for name, function in (
+            ("in place", in_place),
+            ("atomic, step fsync", edit_tool(defer_fsync=True)),
+            ("atomic, edit fsync", edit_tool(defer_fsync=False)),
+        ):
+            _ = path.write_text(text)
+            results[name] = measure(function, path, contents, edits_per_step) * 1e6
+            print(f"{name:<22}{results[name]:>16.1f}")
+    extra = results["atomic, step fsync"] - results["in place"]
+    print(f"extra cost per edit: {extra:.1f} us (budget {budget_us:.0f} us)")
+    if extra > budget_us:
+        sys.exit("over budget")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=20_000)
+    parser.add_argument("--edits", type=int, default=500)
+    parser.add_argument("--edits-per-step", type=int, default=4)
+    parser.add_argument("--budget-us", type=float, default=500.0)
+    args = parser.parse_args()
+    main(args.size, args.edits, args.edits_per_step, args.budget_us)
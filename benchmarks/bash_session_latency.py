@@ -0,0 +1,101 @@
+# Copyright (c) 2025 ByteDance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""Latency benchmark for the bash tool session.
+
+Compares the event-driven reader of `_BashSession` against the previous
+implementation, which slept 200 ms between scans of the whole stdout buffer.
+
+Usage:
+    python benchmarks/bash_session_latency.py [--repeat 10]
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from trae_agent.tools.base import ToolError, ToolExecResult  # noqa: E402
+from trae_agent.tools.bash_tool import _BashSession  # noqa: E402
+
+
+class _PollingBashSession(_BashSession):
+    """The previous sleep-and-rescan implementation, kept for comparison only."""
+
+    _output_delay: float = 0.2  # seconds
+    _sentinel: str = "<<exit>>"
+
+    async def run(self, command: str) -> ToolExecResult:
+        assert self._process and self._process.stdin
+        assert self._process.stdout and self._process.stderr
+
+        self._process.stdin.write(
+            command.encode() + f"; echo '{self._sentinel}'\n".encode()
+        )
+        await self._process.stdin.drain()
+
+        try:
+            async with asyncio.timeout(self._timeout):
+                while True:
+                    await asyncio.sleep(self._output_delay)
+                    output: str = self._process.stdout._buffer.decode()  # type: ignore[attr-defined]
+                    if self._sentinel in output:
+                        output = output[: output.index(self._sentinel)]
+                        break
+        except asyncio.TimeoutError:
+            raise ToolError("timed out") from None
+
+        error: str = self._process.stderr._buffer.decode()  # type: ignore[attr-defined]
+        self._process.stdout._buffer.clear()  # type: ignore[attr-defined]
+        self._process.stderr._buffer.clear()  # type: ignore[attr-defined]
+        return ToolExecResult(output=output, error=error)
+
+
+CASES = {
+    "tiny (echo)": "echo hello",
+    "1 MB": "head -c 1000000 /dev/zero | tr '\\0' 'a' | fold -w 100",
+    "8 MB": "head -c 8000000 /dev/zero | tr '\\0' 'a' | fold -w 100",
+}
+
+
+async def measure(session_cls: type[_BashSession], command: str, repeat: int):
+    session = session_cls()
+    await session.start()
+    # the polling session's StreamReader stops reading from the pipe once its
+    # buffer exceeds the limit, so large outputs need a large enough limit
+    assert session._process and session._process.stdout
+    session._process.stdout._limit = 64 * 1024 * 1024  # type: ignore[attr-defined]
+    timings: list[float] = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await session.run(command)
+            timings.append(time.perf_counter() - start)
+    finally:
+        # the shell runs in its own process group, kill it as a whole
+        os.killpg(session._process.pid, signal.SIGKILL)
+        await session._process.wait()
+    return timings
+
+
+async def main(repeat: int) -> None:
+    print(f"{'case':<14}{'polling (ms)':>16}{'event-driven (ms)':>20}{'speedup':>10}")
+    for name, command in CASES.items():
+        legacy = statistics.median(await measure(_PollingBashSession, command, repeat))
+        current = statistics.median(await measure(_BashSession, command, repeat))
+        print(
+            f"{name:<14}{legacy * 1000:>16.1f}{current * 1000:>20.1f}{legacy / current:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat))
@@ -0,0 +1,97 @@
+# Copyright (c) 2025 ByteDance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""Cost of printing the thought of a streamed sequential thinking tool call.
+
+Streams the arguments of a tool call with a long thought in small deltas, once
+completing and parsing the whole accumulated arguments on every delta (the
+previous behaviour of the chunk printer) and once with the incremental
+decoder, which only reads each delta.
+
+Usage:
+    python benchmarks/json_stream.py [--size 20000] [--delta 4] [--repeat 5]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from db_agent.utils.json_stream import JsonStringFieldDecoder  # noqa: E402
+
+
+def _deltas(size: int, delta: int) -> list[str]:
+    words = ("select", "index", "join", "rows", "plan", "scan", "表", '"a"\n')
+    thought = ""
+    i = 0
+    while len(thought) < size:
+        thought += words[i % len(words)] + " "
+        i += 1
+    arguments = json.dumps(
+        {
+            "thought": thought[:size],
+            "thoughtNumber": 1,
+            "totalThoughts": 3,
+            "nextThoughtNeeded": True,
+        },
+        ensure_ascii=False,
+    )
+    return [arguments[i : i + delta] for i in range(0, len(arguments), delta)]
+
+
+def reparse(deltas: list[str]) -> str:
+    """Parse the accumulated arguments on every delta, closing the open string and object."""
+    arguments = ""
+    printed = ""
+    for delta in deltas:
+        arguments += delta
+        for suffix in ("", "}", '"}'):
+            try:
+                thought = json.loads(arguments + suffix).get("thought", "")
+                break
+            except json.JSONDecodeError:
+                continue
+        else:
+            continue
+        if len(thought) > len(printed):
+            printed = thought
+    return printed
+
+
+def incremental(deltas: list[str]) -> str:
+    decoder = JsonStringFieldDecoder(["thought"])
+    printed = []
+    for delta in deltas:
+        printed.extend(decoder.feed(delta).values())
+    return "".join(printed)
+
+
+def measure(function, deltas: list[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(deltas)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(size: int, delta: int, repeat: int) -> None:
+    deltas = _deltas(size, delta)
+    assert reparse(deltas) == incremental(deltas)
+    print(f"{size} characters of thought in {len(deltas)} deltas")
+    print(f"{'decoder':<14}{'time (ms)':>12}")
+    reparsed = measure(reparse, deltas, repeat)
+    print(f"{'reparse':<14}{reparsed * 1e3:>12.2f}")
+    incremented = measure(incremental, deltas, repeat)
+    print(f"{'incremental':<14}{incremented * 1e3:>12.2f}")
+    print(f"speedup: {reparsed / incremented:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=20_000)
+    parser.add_argument("--delta", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.size, args.delta, args.repeat)
@@ -0,0 +1,58 @@
+# Copyright (c) 2025 ByteDance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""Peak memory of capturing large command output.
+
+Compares `communicate()` followed by `maybe_truncate` (the previous
+implementation of `run`) with the streaming head/tail capture.
+
+Usage:
+    python benchmarks/run_output_memory.py [--mb 200]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from trae_agent.tools.run import maybe_truncate, run  # noqa: E402
+
+
+async def _buffered_run(cmd: str) -> tuple[int, str, str]:
+    process = await asyncio.create_subprocess_shell(
+        cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    return (
+        process.returncode or 0,
+        maybe_truncate(stdout.decode()),
+        maybe_truncate(stderr.decode()),
+    )
+
+
+async def measure(name: str, coro_fn, cmd: str) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    _ = await coro_fn(cmd)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<12}{peak / 2**20:>14.1f}{elapsed:>12.2f}")
+
+
+async def main(mb: int) -> None:
+    cmd = f"head -c {mb * 1000000} /dev/zero | tr '\\0' 'a' | fold -w 100"
+    print(f"{'capture':<12}{'peak (MiB)':>14}{'time (s)':>12}")
+    await measure("buffered", _buffered_run, cmd)
+    await measure("streaming", lambda c: run(c, keep_tail=2000), cmd)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.mb))
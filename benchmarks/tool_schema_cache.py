@@ -0,0 +1,105 @@
+# Copyright (c) 2025 ByteDance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""Per-request cost of describing a large toolset to the model.
+
+Builds the arguments of a chat request with a toolset the size of a database
+agent with many MCP tools, once rebuilding every tool schema (the previous
+behaviour) and once reusing the schemas cached by the client.
+
+Usage:
+    python benchmarks/tool_schema_cache.py [--tools 60] [--params 8] [--repeat 2000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from trae_agent.tools.base import (  # noqa: E402
+    Tool,
+    ToolCallArguments,
+    ToolExecResult,
+    ToolParameter,
+)
+from trae_agent.utils.anthropic_client import AnthropicClient  # noqa: E402
+from trae_agent.utils.config import ModelParameters  # noqa: E402
+from trae_agent.utils.doubao_client import DoubaoClient  # noqa: E402
+from trae_agent.utils.llm_basics import LLMMessage  # noqa: E402
+
+
+class _FakeTool(Tool):
+    def __init__(self, index: int, num_params: int):
+        super().__init__("openai")
+        self._index = index
+        self._parameters = [
+            ToolParameter(
+                name=f"param_{i}",
+                type="string",
+                description=f"Parameter {i} of tool {index}.",
+                enum=["a", "b", "c"] if i % 3 == 0 else None,
+                required=i % 2 == 0,
+            )
+            for i in range(num_params)
+        ]
+
+    def get_name(self) -> str:
+        return f"tool_{self._index}"
+
+    def get_description(self) -> str:
+        return f"Tool number {self._index}, used for benchmarking."
+
+    def get_parameters(self) -> list[ToolParameter]:
+        return self._parameters
+
+    async def execute(self, arguments: ToolCallArguments) -> ToolExecResult:
+        return ToolExecResult()
+
+
+def _model_parameters() -> ModelParameters:
+    return ModelParameters(
+        model="benchmark",
+        api_key="benchmark",
+        max_tokens=1000,
+        temperature=0.0,
+        top_p=1.0,
+        top_k=0,
+        parallel_tool_calls=False,
+        max_retries=1,
+        base_url="http://localhost",
+    )
+
+
+def measure(client, tools: list[Tool], repeat: int, cached: bool) -> float:
+    model_parameters = _model_parameters()
+    messages = [LLMMessage(role="user", content="hello")]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if not cached:
+            client._tool_schemas.clear()
+        client._prepare_request(messages, model_parameters, tools, False)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(num_tools: int, num_params: int, repeat: int) -> None:
+    tools: list[Tool] = [_FakeTool(i, num_params) for i in range(num_tools)]
+    print(f"{num_tools} tools with {num_params} parameters each")
+    print(f"{'client':<12}{'rebuilt (us)':>16}{'cached (us)':>16}{'speedup':>10}")
+    for name, client_cls in (("openai", DoubaoClient), ("anthropic", AnthropicClient)):
+        client = client_cls(_model_parameters())
+        rebuilt = measure(client, tools, repeat, cached=False)
+        cached = measure(client, tools, repeat, cached=True)
+        print(
+            f"{name:<12}{rebuilt * 1e6:>16.1f}{cached * 1e6:>16.1f}{rebuilt / cached:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tools", type=int, default=60)
+    parser.add_argument("--params", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.tools, args.params, args.repeat)
@@ -13,14 +13,15 @@ class CallLLMNode():
 
         local_tools = shared["local_tools"]
         mcp_tools = shared["mcp_tools"]
+        mcp_tool_schemas = shared.get("mcp_tool_schemas")
         llm_client = shared["llm_client"]
         messages = shared["next_messages"]
         output_stream = shared["output_stream"]
-        return llm_client, local_tools, mcp_tools, messages, output_stream
+        return llm_client, local_tools, mcp_tools, mcp_tool_schemas, messages, output_stream
 
     async def exec_async(self, prep_res, log_to_history):
         """Retrieve tools from the MCP server"""
-        llm_client, local_tools, mcp_tools, messages, output_stream = prep_res
+        llm_client, local_tools, mcp_tools, mcp_tool_schemas, messages, output_stream = prep_res
 
         llm_client: LLMClient = llm_client
         local_tools: list[LocalTool] = local_tools
@@ -38,6 +39,7 @@ class CallLLMNode():
                 mcp_tools=mcp_tools,
                 log_to_history=log_to_history,
                 printer=chunk_printer,
+                mcp_tool_schemas=mcp_tool_schemas,
             )
         except Exception as e:
             print(f"Error in LLM chat: {e}")
@@ -1,40 +1,28 @@
-import json
-import streamingjson
+from db_agent.utils.json_stream import JsonStringFieldDecoder
 from db_agent.utils.output_stream import OutputStream
 
 from openai.types.chat import ChatCompletionChunk
 
 from db_agent.utils.stream_printer import StreamPrinter
 
+# the string arguments of the tool calls that are printed while they stream, by tool name
+PRINTED_TOOL_ARGUMENTS = {"sequentialthinking": ["thought"]}
+
 class ChunkPrinter(StreamPrinter):
-    def __init__(self, output_stream: OutputStream):
+    def __init__(self, output_stream: OutputStream, printed_arguments: dict[str, list[str]] = PRINTED_TOOL_ARGUMENTS):
         super().__init__()
         self._output_stream = output_stream
-        self._lexers:list[streamingjson.Lexer] = []
-        self._tool_call_para:list[str] = []
-        self._function_names:list[str] = []
+        self._printed_arguments = printed_arguments
+        # by tool call index, None when no argument of the tool is printed
+        self._decoders: list[JsonStringFieldDecoder | None] = []
         self.started:bool = False
 
-    async def print_sequential_thinking_parameters(self, lexer: streamingjson.Lexer, seg: str, call_id: int):
-        lexer.append_string(seg)
-        try:
-            json_complete = lexer.complete_json()
-            func = json.loads(json_complete)
-        except json.JSONDecodeError:
-            return
-        except Exception as e:
-            return
-
-        if func.get("thought") is None:
-            return
-        
-        if len(func["thought"]) > len(self._tool_call_para[call_id]):
-            msg = func["thought"][len(self._tool_call_para[call_id]):]
-            self._tool_call_para[call_id] = func["thought"]
+    async def print_tool_call_arguments(self, decoder: JsonStringFieldDecoder, seg: str):
+        for text in decoder.feed(seg).values():
             if not self.started:
                 self.started = True
                 await self._output_stream.start_chunk()
-            await self._output_stream.send_chunk(msg)
+            await self._output_stream.send_chunk(text)
 
     async def print_chunk(self, chunk: ChatCompletionChunk):
         if chunk.choices:
@@ -51,18 +39,11 @@ class ChunkPrinter(StreamPrinter):
             # 收集工具调用
             if delta.tool_calls:
                 for tool_call in delta.tool_calls:
-                    lexer : streamingjson.Lexer = None                   
                     # 处理新工具调用
-                    if tool_call.index >= len(self._lexers):
-                        lexer = streamingjson.Lexer()
-                        self._lexers.append(lexer)
-                        self._tool_call_para.append("")
-                        self._function_names.append(tool_call.function.name)
+                    if tool_call.index >= len(self._decoders):
+                        fields = self._printed_arguments.get(tool_call.function.name)
+                        self._decoders.append(JsonStringFieldDecoder(fields) if fields else None)
                     # 追加现有工具调用的参数
-                    else:
-                        lexer = self._lexers[tool_call.index]
-
-                    if self._function_names[tool_call.index] == "sequentialthinking":
-                        await self.print_sequential_thinking_parameters(
-                            lexer, tool_call.function.arguments, tool_call.index
-                        )
+                    decoder = self._decoders[tool_call.index]
+                    if decoder is not None and tool_call.function.arguments:
+                        await self.print_tool_call_arguments(decoder, tool_call.function.arguments)
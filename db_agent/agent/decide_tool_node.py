@@ -35,7 +35,7 @@ class DecideNode(AsyncNode):
             await output_stream.send_chunk(llm_response.content)
             shared['answer'].append(llm_response.content)
 
-        if llm_response.finish_reason == "stop" and (llm_response.tool_calls is None or len(llm_response.tool_calls) == 0):
+        if not llm_response.tool_calls:
             if len(llm_response.content) > 0:
                 #shared["next_messages"] = [
                 #    LLMMessage(
@@ -1,13 +1,88 @@
+import asyncio
 import json
+import re
+from typing import List, Optional
+from mcp.types import Tool as MCPTool
 from db_agent.tools import ToolExecutor, ToolResult
 from .pocketflow import AsyncNode
 from db_agent.utils.output_stream import OutputStream
 from db_agent.tools import ToolCall
-from db_agent.utils.mcp_client import MCPClientBase
+from db_agent.utils.mcp_client import PooledMCPClient
 from fastmcp.client.client import CallToolResult
 from db_agent.utils.llm_client import LLMMessage
 
+# local tools that neither change the shared state nor depend on the order of calls
+READ_ONLY_LOCAL_TOOLS = {"chat_history"}
+# statements that cannot modify the database
+READ_ONLY_SQL = {"select", "show", "describe", "desc", "explain"}
+# a quoted string or identifier, a comment, or the start of one that cannot be
+# read safely: a string with backslashes, whose end depends on the database, a
+# "--" not followed by a space, which MySQL does not take for a comment, an
+# executable "/*!" comment, or an unterminated one
+SQL_LEXEME_RE = re.compile(
+    r"""
+    (?P<string>'(?:[^'\\]|'')*'|"(?:[^"\\]|"")*"|`[^`]*`)
+    |(?P<comment>--(?=\s)[^\n]*|\#[^\n]*|/\*(?!!)(?:[^*]|\*(?!/))*\*/)
+    |(?P<unsafe>['"`\\]|--|/\*)
+    """,
+    re.VERBOSE,
+)
+# EXPLAIN and its options, ANALYZE runs the statement that is explained
+EXPLAIN_RE = re.compile(
+    r"(?:explain|describe|desc)\s+((?:analy[sz]e|verbose|extended|partitions|format\s*=\s*\w+|\([^)]*\))\s*)*",
+    re.IGNORECASE,
+)
+
+
+def strip_sql(query: str) -> Optional[str]:
+    """`query` with its strings emptied and its comments removed, None if it cannot be read safely."""
+    parts: List[str] = []
+    pos = 0
+    for match in SQL_LEXEME_RE.finditer(query):
+        if match.lastgroup == "unsafe":
+            return None
+        parts.append(query[pos:match.start()])
+        parts.append("''" if match.lastgroup == "string" else " ")
+        pos = match.end()
+    parts.append(query[pos:])
+    return "".join(parts)
+
+
+def is_read_only_sql(query: str) -> bool:
+    """Whether `query` is a single statement that only reads from the database."""
+    stripped = strip_sql(query)
+    if stripped is None:
+        return False
+    return _is_read_only_statement(stripped.strip().rstrip(";").strip())
+
+
+def _is_read_only_statement(query: str) -> bool:
+    if not query or ";" in query:
+        return False
+    first_word = query.split(None, 1)[0].lower()
+    if first_word not in READ_ONLY_SQL:
+        return False
+    explain = EXPLAIN_RE.match(query)
+    if explain and re.search(r"analy[sz]e", explain.group(0), re.IGNORECASE):
+        # the explained statement is run, so it has to be read only itself
+        statement = query[explain.end():]
+        if EXPLAIN_RE.match(statement) or not _is_read_only_statement(statement):
+            return False
+    # SELECT ... INTO OUTFILE and SELECT ... FOR UPDATE have side effects
+    return re.search(r"\binto\b|\bfor\s+update\b", query, re.IGNORECASE) is None
+
+
 class ExecuteToolsNode(AsyncNode):
+    """Execute the tool calls of one LLM turn.
+
+    Consecutive read-only calls run concurrently, at most `max_concurrency` at a
+    time. Any other call waits for the calls before it, and the calls after it
+    wait for it. Results are returned in the order of the calls.
+    """
+    def __init__(self, max_concurrency: int = 4) -> None:
+        super().__init__()
+        self.max_concurrency = max_concurrency
+
     async def prep_async(self, shared):
         """Initialize and get tools"""
         output_stream : OutputStream = shared["output_stream"]
@@ -16,20 +91,33 @@ class ExecuteToolsNode(AsyncNode):
         tool_calls: list[ToolCall] = shared["tool_calls"]
         self.tool_caller = ToolExecutor(shared["local_tools"])
 
-        self.mcp_client: MCPClientBase = shared["mcp_client"]
+        self.mcp_client: PooledMCPClient = shared["mcp_client"]
+        self.mcp_tools: dict[str, MCPTool] = {
+            tool.name: tool for tool in shared.get("mcp_tools") or []
+        }
         return tool_calls
 
     async def exec_async(self, prep_res):
         """Retrieve tools from the MCP server"""
         tool_calls: list[ToolCall] = prep_res
 
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(call: ToolCall) -> ToolResult:
+            async with semaphore:
+                return await self.exec_tool(call)
+
         results: list[ToolResult] = []
+        batch: list[ToolCall] = []
         for call in tool_calls:
-            if call.name in ["sequentialthinking", "task_done", "chat_history"]:
-                results.append(await self.exec_local_tool(call))
-            else:
-                if self.mcp_client is not None:
-                    results.append(await self.exec_mcp_tool(call))
+            if self.is_read_only(call):
+                batch.append(call)
+                continue
+            # a call with side effects runs alone, after everything before it
+            results.extend(await asyncio.gather(*(run(c) for c in batch)))
+            batch = []
+            results.append(await self.exec_tool(call))
+        results.extend(await asyncio.gather(*(run(c) for c in batch)))
         return results
 
     async def post_async(self, shared, prep_res, exec_res):
@@ -54,16 +142,39 @@ class ExecuteToolsNode(AsyncNode):
         
         return "call_llm"
 
+    def is_read_only(self, tool_call: ToolCall) -> bool:
+        """Whether the call can run concurrently with other read-only calls."""
+        if tool_call.name in ["sequentialthinking", "task_done", "chat_history"]:
+            return tool_call.name in READ_ONLY_LOCAL_TOOLS
+        if tool_call.name == "execute_sql":
+            query = tool_call.arguments.get("query")
+            return isinstance(query, str) and is_read_only_sql(query)
+        tool = self.mcp_tools.get(tool_call.name)
+        return bool(tool and tool.annotations and tool.annotations.readOnlyHint)
+
+    async def exec_tool(self, tool_call: ToolCall) -> ToolResult:
+        if tool_call.name in ["sequentialthinking", "task_done", "chat_history"]:
+            return await self.exec_local_tool(tool_call)
+        if self.mcp_client is None:
+            return ToolResult(
+                id=tool_call.id,
+                call_id=tool_call.call_id,
+                name=tool_call.name,
+                result="",
+                success=False,
+                error=f"Tool '{tool_call.name}' not found: no MCP server is connected"
+            )
+        return await self.exec_mcp_tool(tool_call)
+
     async def exec_local_tool(self, tool_call: ToolCall) -> ToolResult:
         return await self.tool_caller.execute_tool_call(tool_call)
         
     async def exec_mcp_tool(self, tool_call: ToolCall):
         try:
-            async with self.mcp_client as client:
-                result: CallToolResult = await client.call_tool(
-                    tool_name=tool_call.name,
-                    parameters=tool_call.arguments
-                )
+            result: CallToolResult = await self.mcp_client.call_tool(
+                tool_name=tool_call.name,
+                parameters=tool_call.arguments
+            )
             return ToolResult(
                 id=tool_call.id,
                 call_id=tool_call.call_id,
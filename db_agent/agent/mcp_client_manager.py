@@ -1,27 +1,201 @@
-from typing import Dict
-from db_agent.utils.mcp_client import SSEClient, StdioClient, MCPClientBase
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from mcp.types import ServerNotification, Tool as MCPTool, ToolListChangedNotification
+from openai.types.chat import ChatCompletionToolParam
+from db_agent.utils.async_openai_client import mcp_tool_schema
+from db_agent.utils.mcp_client import SSEClient, StdioClient, MCPClientBase, PooledMCPClient
+
+
+class MCPToolCatalog:
+    """The tools of one MCP server, with their OpenAI schemas built once.
+
+    The catalog is reused until it is older than `ttl` seconds or the server
+    notifies that its tool list changed. An outdated catalog is still served
+    while it is refreshed in the background, so only the first request to a
+    server waits for `list_tools`.
+    """
+    def __init__(self, client: PooledMCPClient, ttl: float = 3600.0):
+        self.client = client
+        self.ttl = ttl
+        self._tools: Optional[Tuple[List[MCPTool], List[ChatCompletionToolParam]]] = None
+        self._fetched_at = 0.0
+        # incremented on every change notification, a fetch started before one is outdated
+        self._generation = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def outdated(self) -> bool:
+        return self._tools is None or time.monotonic() - self._fetched_at > self.ttl
+
+    async def get_tools(self) -> Tuple[List[MCPTool], List[ChatCompletionToolParam]]:
+        """Get the tools of the server and their OpenAI schemas."""
+        if self._tools is None:
+            await asyncio.shield(self.refresh())
+        elif self.outdated:
+            self.refresh()
+        assert self._tools is not None
+        return self._tools
+
+    def refresh(self) -> asyncio.Task:
+        """Fetch the tools again, unless a fetch is already running."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch())
+            self._refresh_task.add_done_callback(self._on_refreshed)
+        return self._refresh_task
+
+    def invalidate(self) -> None:
+        """Fetch the tools again, e.g. after the server changed them."""
+        self._generation += 1
+        self._fetched_at = float("-inf")
+        if self._tools is not None:
+            self.refresh()
+
+    async def handle_message(self, message: Any) -> None:
+        """Message handler of the MCP client, refreshes the catalog when the tools change."""
+        if isinstance(message, ServerNotification) and isinstance(
+            message.root, ToolListChangedNotification
+        ):
+            self.invalidate()
+
+    async def _fetch(self) -> None:
+        # fetched again until no change was notified during the fetch, as
+        # `refresh` would return this very task
+        while True:
+            generation = self._generation
+            tools = await self.client.list_tools()
+            self._tools = (tools, [mcp_tool_schema(tool) for tool in tools])
+            if generation == self._generation:
+                self._fetched_at = time.monotonic()
+                return
+
+    def _on_refreshed(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"failed to fetch MCP tools: {task.exception()}")
+
 
 class MCPClientManager:
-    def __init__(self) -> None:
-        self.clients: Dict[str, MCPModelClient] = {}
+    """Long-lived MCP connections, shared by all sessions and keyed by server config.
 
-    def get_client(self, provider: str) -> MCPClientBase:
-        # TODO: get client according to database type
-        #return SSEClient("http://localhost:9000/sse")
-        return StdioClient(
-            command="uv",
-            args=[
+    At most `max_clients` connections are kept open. The least recently used
+    idle connection is closed to make room for a new one, and connections that
+    were not used for `idle_timeout` seconds are closed by `evict_idle`, which
+    runs periodically once `start` was called. Every server also has a tool
+    catalog, which outlives its connection.
+    """
+    def __init__(
+        self,
+        max_clients: int = 8,
+        idle_timeout: float = 600.0,
+        health_check_interval: float = 30.0,
+        tool_catalog_ttl: float = 3600.0,
+    ) -> None:
+        self.max_clients = max_clients
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.tool_catalog_ttl = tool_catalog_ttl
+        self.clients: OrderedDict[str, PooledMCPClient] = OrderedDict()
+        self.tool_catalogs: Dict[str, MCPToolCatalog] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def get_server_config(self, provider: str) -> Dict[str, Any]:
+        # TODO: get server config according to database type
+        #return {"transport": "sse", "url": "http://localhost:9000/sse"}
+        return {
+            "transport": "stdio",
+            "command": "uv",
+            "args": [
                 "--directory",
                 "/opt/anaconda3/bin",
                 "run",
                 "mysql_mcp_server"
             ],
-            env={
+            "env": {
                 "MYSQL_HOST": "127.0.0.1",
                 "MYSQL_PORT": "3306",
                 "MYSQL_USER": "root",
                 "MYSQL_PASSWORD": "my-secret-pw",
                 "MYSQL_DATABASE": "test"
             }
+        }
+
+    def create_client(self, server_config: Dict[str, Any], message_handler: Any = None) -> MCPClientBase:
+        if server_config["transport"] == "sse":
+            return SSEClient(server_config["url"], message_handler=message_handler)
+        return StdioClient(
+            command=server_config["command"],
+            args=server_config["args"],
+            env=server_config.get("env", {}),
+            message_handler=message_handler,
+        )
+
+    async def get_client(self, provider: str) -> PooledMCPClient:
+        """Get the shared connection to the MCP server of `provider`."""
+        server_config = self.get_server_config(provider)
+        key = json.dumps(server_config, sort_keys=True)
+
+        client = self.clients.get(key)
+        if client is not None:
+            self.clients.move_to_end(key)
+            return client
+
+        client = PooledMCPClient(
+            lambda: self.create_client(
+                server_config, message_handler=self.tool_catalogs[key].handle_message
+            ),
+            health_check_interval=self.health_check_interval,
         )
-    
+        self.clients[key] = client
+        if key in self.tool_catalogs:
+            self.tool_catalogs[key].client = client
+        else:
+            self.tool_catalogs[key] = MCPToolCatalog(client, ttl=self.tool_catalog_ttl)
+
+        # make room by closing the least recently used connections not in use
+        for other_key, other in list(self.clients.items()):
+            if len(self.clients) <= self.max_clients:
+                break
+            if other is not client and not other.busy:
+                del self.clients[other_key]
+                await other.close()
+        return client
+
+    async def get_tool_catalog(self, provider: str) -> MCPToolCatalog:
+        """Get the tool catalog of the MCP server of `provider`."""
+        key = json.dumps(self.get_server_config(provider), sort_keys=True)
+        if key not in self.clients:
+            await self.get_client(provider)
+        return self.tool_catalogs[key]
+
+    async def evict_idle(self) -> None:
+        """Close the connections that were not used for `idle_timeout` seconds."""
+        now = time.monotonic()
+        for key, client in list(self.clients.items()):
+            if not client.busy and now - client.last_used > self.idle_timeout:
+                del self.clients[key]
+                await client.close()
+
+    def start(self) -> None:
+        """Start closing idle connections in the background."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 60.0))
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                print(f"failed to evict idle MCP connections: {e}")
+
+    async def close(self) -> None:
+        """Stop the background eviction and close all connections."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        clients = list(self.clients.values())
+        self.clients.clear()
+        for client in clients:
+            await client.close()
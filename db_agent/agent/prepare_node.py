@@ -1,5 +1,6 @@
 from .pocketflow import AsyncNode
-from db_agent.utils.mcp_client import MCPClientBase
+from db_agent.utils.mcp_client import PooledMCPClient
+from .mcp_client_manager import MCPToolCatalog
 from db_agent.tools import TaskDoneTool, SequentialThinkingTool, ChatHistoryTool
 from db_agent.tools import Tool as LocalTool
 from db_agent.utils.output_stream import OutputStream
@@ -18,9 +19,9 @@ class PrepareNode(AsyncNode):
     async def prep_async(self, shared):
         """Initialize and get tools"""
         output_stream : OutputStream = shared["output_stream"]
-        output_stream.update_status("Getting tools")
+        await output_stream.update_status("Getting tools")
 
-        mcp_client = shared["mcp_client"]
+        mcp_client = shared.get("mcp_tool_catalog") or shared["mcp_client"]
         shared['chat_history'] = [
             #LLMMessage(role="user", content=shared["user_message"]),
             {"role": "user", "content": shared["user_message"]}
@@ -31,17 +32,19 @@ class PrepareNode(AsyncNode):
 
     async def exec_async(self, prep_res):
         """Retrieve tools from the MCP server"""
-        mcp_client: MCPClientBase = prep_res
+        mcp_client: MCPToolCatalog | PooledMCPClient = prep_res
         if mcp_client is None:
-            return [], None
+            return ([], None), None
 
         try:
-            async with mcp_client:
-                tools = await mcp_client.list_tools()
+            if isinstance(mcp_client, MCPToolCatalog):
+                # the tools and their schemas are cached across conversations
+                return await mcp_client.get_tools(), None
+            tools = await mcp_client.list_tools()
         except Exception as e:
             print(e)
             return None, e
-        return tools, None
+        return (tools, None), None
 
     async def post_async(self, shared, prep_res, exec_res):
         """Store tools and process to decision node"""
@@ -50,8 +53,10 @@ class PrepareNode(AsyncNode):
             shared["error"] = error
             return "error"
 
+        mcp_tools, mcp_tool_schemas = mcp_tools
         mcp_tools: list[MCPTool] = mcp_tools
         shared['mcp_tools'] = mcp_tools
+        shared['mcp_tool_schemas'] = mcp_tool_schemas
         print([tool.name for tool in mcp_tools])
 
         session = shared['session']
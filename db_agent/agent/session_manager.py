@@ -1,6 +1,10 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
 from typing_extensions import Dict
+import asyncio
+import json
+import time
 import uuid
-import threading
 import datetime
 
 class Conversation:
@@ -16,47 +20,213 @@ class Session:
     id: str = ""
     conversations: Dict[str, Conversation] = {}
 
-    def __init__(self, session_id: str):
+    def __init__(self, session_id: str, max_conversations: int = 50):
         self.id = session_id
         self.create_time = datetime.datetime.now()
+        self.last_active = time.monotonic()
+        # the oldest conversations are dropped beyond this number
+        self.max_conversations = max_conversations
+        self.conversations = {}
+        self.last_conversation: Optional[Conversation] = None
+        # running conversations, by conversation id
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def touch(self) -> None:
+        self.last_active = time.monotonic()
 
     def newConversation(self) -> Conversation:
         conversation_id = str(uuid.uuid4())
         self.conversations[conversation_id] = Conversation(conversation_id)
         self.conversations[conversation_id].context['session'] = self
+        self.last_conversation = self.conversations[conversation_id]
+
+        for old_id in list(self.conversations):
+            if len(self.conversations) <= self.max_conversations:
+                break
+            if old_id not in self.tasks:
+                del self.conversations[old_id]
         return self.conversations[conversation_id]
 
+    @property
+    def running(self) -> bool:
+        return len(self.tasks) > 0
+
+    def cancel(self) -> bool:
+        """Cancel the running conversations, returns whether there were any."""
+        for task in self.tasks.values():
+            task.cancel()
+        return len(self.tasks) > 0
+
     def dump_chat_history(self) -> list:
         ret = []
         for conversation in self.conversations.values():
-            ret.extend(conversation.context['chat_history'])
+            ret.extend(conversation.context.get('chat_history', []))
         return ret
 
+    def approximate_size(self) -> int:
+        """Approximate number of bytes held by the histories of the conversations."""
+        size = 0
+        for conversation in self.conversations.values():
+            size += _approximate_size(conversation.context.get('chat_history'))
+            llm_client = conversation.context.get('llm_client')
+            size += _approximate_size(getattr(llm_client, 'message_history', None))
+        return size
+
+
+def _approximate_size(value: Any) -> int:
+    if not value:
+        return 0
+    return len(json.dumps(value, default=str, ensure_ascii=False))
+
 class SessionManager:
+    """Sessions of the connected clients and their running conversations.
+
+    All sessions live on the server's event loop, so they need no locking.
+    Conversations run as tasks, at most `max_running_conversations` at a time
+    over all sessions; the others wait for a free slot.
+
+    At most `max_sessions` sessions are kept: the least recently active idle
+    session is dropped to make room for a new one. Sessions idle for longer
+    than `session_ttl` seconds are dropped by `evict_expired`, which runs
+    periodically once `run_clean_task` was started.
+    """
     sessions: Dict[str, Session] = {}
 
-    def __init__(self):
-        self.sessions = {}
-        self.lock = threading.Lock()
+    def __init__(
+        self,
+        max_running_conversations: int = 16,
+        max_sessions: int = 1000,
+        session_ttl: float = 3600.0,
+        max_conversations_per_session: int = 50,
+        clean_interval: float = 60.0,
+    ):
+        self.sessions: OrderedDict[str, Session] = OrderedDict()
+        self.max_running_conversations = max_running_conversations
+        self._conversation_slots = asyncio.Semaphore(max_running_conversations)
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.max_conversations_per_session = max_conversations_per_session
+        self.clean_interval = clean_interval
+        self.evicted_sessions = 0
 
     def new_session(self) -> Session:
-        with self.lock:
-            session_id = str(uuid.uuid4())
-            self.sessions[session_id] = Session(session_id)
-            return self.sessions[session_id]
+        session_id = str(uuid.uuid4())
+        self.sessions[session_id] = Session(
+            session_id, max_conversations=self.max_conversations_per_session
+        )
+
+        for old_id, old in list(self.sessions.items()):
+            if len(self.sessions) <= self.max_sessions:
+                break
+            if not old.running:
+                self._evict(old_id)
+        return self.sessions[session_id]
 
     def get_session(self, session_id: str) -> Session:
-        with self.lock:
-            return self.sessions[session_id]
+        session = self.sessions[session_id]
+        self.touch(session)
+        return session
+
+    def touch(self, session: Session) -> None:
+        """Mark a session as active, e.g. when it received a message."""
+        session.touch()
+        if session.id in self.sessions:
+            self.sessions.move_to_end(session.id)
 
     def delete_session(self, session_id: str, physical: bool = True) -> None:
-        with self.lock:
-            if physical:
-                del self.sessions[session_id]
-            else:
-                self.sessions[session_id].deleted = True
+        session = self.sessions.get(session_id)
+        if session is None:
+            # already evicted
+            return
+        session.cancel()
+        if physical:
+            del self.sessions[session_id]
+        else:
+            session.deleted = True
+
+    def evict_expired(self) -> int:
+        """Drop the sessions idle for longer than `session_ttl`, returns their number."""
+        now = time.monotonic()
+        expired = [
+            session_id
+            for session_id, session in self.sessions.items()
+            if not session.running and now - session.last_active > self.session_ttl
+        ]
+        for session_id in expired:
+            self._evict(session_id)
+        return len(expired)
+
+    def _evict(self, session_id: str) -> None:
+        del self.sessions[session_id]
+        self.evicted_sessions += 1
+
+    def metrics(self) -> dict:
+        running = sum(len(session.tasks) for session in self.sessions.values())
+        return {
+            "live_sessions": len(self.sessions),
+            "conversations": sum(
+                len(session.conversations) for session in self.sessions.values()
+            ),
+            "running_conversations": running,
+            "bytes_held": sum(
+                session.approximate_size() for session in self.sessions.values()
+            ),
+            "evicted_sessions": self.evicted_sessions,
+        }
+
+    def start_conversation(
+        self,
+        session: Session,
+        conversation: Conversation,
+        run: Callable[[], Awaitable[None]],
+        on_waiting: Optional[Callable[[], Awaitable[None]]] = None,
+        on_error: Optional[Callable[[BaseException], Awaitable[None]]] = None,
+    ) -> asyncio.Task:
+        """Run a conversation in the background.
+
+        :param run: Runs the conversation
+        :param on_waiting: Called when the conversation has to wait for a free slot
+        :param on_error: Called when the conversation failed or was cancelled
+        """
+        async def supervise() -> None:
+            try:
+                if self._conversation_slots.locked() and on_waiting is not None:
+                    await on_waiting()
+                async with self._conversation_slots:
+                    await run()
+            except asyncio.CancelledError as e:
+                await report(e)
+                raise
+            except Exception as e:
+                print(f"conversation {conversation.id} failed: {e}")
+                await report(e)
+
+        async def report(error: BaseException) -> None:
+            if on_error is None:
+                return
+            try:
+                await on_error(error)
+            except Exception as e:
+                # e.g. the client is gone
+                print(f"failed to report the end of conversation {conversation.id}: {e}")
+
+        task = asyncio.create_task(supervise(), name=f"conversation-{conversation.id}")
+        session.tasks[conversation.id] = task
+
+        def done(_: asyncio.Task) -> None:
+            session.tasks.pop(conversation.id, None)
+            self.touch(session)
+
+        task.add_done_callback(done)
+        self.touch(session)
+        return task
 
     async def run_clean_task(self):
-        # TODO: add session timeout, use a timer to delete session
-        pass
+        """Drop expired sessions every `clean_interval` seconds, until cancelled."""
+        while True:
+            await asyncio.sleep(self.clean_interval)
+            try:
+                self.evict_expired()
+            except Exception as e:
+                print(f"failed to evict expired sessions: {e}")
 
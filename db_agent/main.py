@@ -1,13 +1,14 @@
+import asyncio
 import json
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
-from agent.session_manager import SessionManager, Session
+from agent.session_manager import SessionManager, Session, Conversation
 from agent.mcp_client_manager import MCPClientManager
 from agent.agent import Agent
 from utils.config import load_config, Config, ModelParameters
-from utils.output_stream import WebSocketOutputStream
+from utils.output_stream import WebSocketOutputStream, OutputMessage, MessageType
 from utils.async_openai_client import AsyncOpenAIClient
 
 app = FastAPI()
@@ -17,25 +18,63 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 async def get_chat_interface():
     return FileResponse("static/index.html")
 
+@app.get("/metrics")
+async def get_metrics():
+    return app.state.session_manager.metrics()
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     session_manager: SessionManager = app.state.session_manager
     await websocket.accept()
 
     session: Session = session_manager.new_session()
-    
+    output_stream = WebSocketOutputStream(websocket)
+
+    async def send_error(content: str) -> None:
+        # through the stream, so that it is not sent before the pending output
+        await output_stream.send_message(OutputMessage(MessageType.ERROR, content))
+
+    async def on_waiting() -> None:
+        await output_stream.update_status("Waiting")
+
+    async def on_error(error: BaseException) -> None:
+        if isinstance(error, asyncio.CancelledError):
+            await output_stream.update_status("Cancelled")
+        else:
+            await send_error(f"conversation failed: {error}")
+
+    def start(conversation: Conversation) -> None:
+        # the conversation runs in the background, so that this loop keeps
+        # receiving messages, e.g. to cancel it
+        agent = Agent()
+        session_manager.start_conversation(
+            session,
+            conversation,
+            lambda: agent.run(conversation),
+            on_waiting=on_waiting,
+            on_error=on_error,
+        )
+
     try:
         while True:
             data = await websocket.receive_text()
             message = json.loads(data)
+            if session.id not in session_manager.sessions:
+                # the session expired while the client was idle
+                session = session_manager.new_session()
+            session_manager.touch(session)
 
             m_type = message.get("type", message)
             m_content = message.get("content", "")
             if m_type == "message":
+                if session.running:
+                    await send_error("a conversation is still running, cancel it first")
+                    continue
                 conversation = session.newConversation()
                 conversation.context["user_message"] = m_content
-                conversation.context["output_stream"] = WebSocketOutputStream(websocket)
-                conversation.context["mcp_client"] = app.state.mcp_client_manager.get_client("")
+                conversation.context["output_stream"] = output_stream
+                conversation.context["mcp_client"] = await app.state.mcp_client_manager.get_client("")
+                conversation.context["mcp_tool_catalog"] = await app.state.mcp_client_manager.get_tool_catalog("")
                 # todo: get db info from message and create the right mcp client
                 config: Config = app.state.config
                 #conversation.context["llm_client"] = LLMClient(
@@ -44,30 +83,64 @@ async def websocket_endpoint(websocket: WebSocket):
                 conversation.context["llm_client"] = AsyncOpenAIClient(
                     config.model_providers[config.default_provider]
                 )
-                agent = Agent()
-                await agent.run(conversation)
+                start(conversation)
+            elif m_type == "cancel":
+                if not session.cancel():
+                    await send_error("no conversation is running")
             elif m_type == "acknowledge":
                 if m_content == "cancel" or m_content == "":
                     continue
                 else:
-                    conversation = session.conversations.get(conversation.id)
+                    conversation_id = message.get("conversation_id")
+                    conversation = (
+                        session.conversations.get(conversation_id)
+                        if conversation_id
+                        else session.last_conversation
+                    )
                     if conversation is None:
-                        websocket.send_text(json.dumps({"type": "error", "content": "conversation not found"}))
+                        await send_error("conversation not found")
+                        continue
+                    if session.running:
+                        await send_error("a conversation is still running, cancel it first")
                         continue
                     conversation.context['is_continue'] = True
-                    agent = Agent()
-                    await agent.run(conversation)
+                    start(conversation)
             
     except WebSocketDisconnect:
+        pass
+    finally:
+        # however the loop ended, e.g. on a malformed message, the conversations
+        # can no longer send their output and would keep their slots
         session_manager.delete_session(session.id)
+        await output_stream.close()
 
 
 @app.on_event("startup")
 async def startup_event():
     app.state.config = load_config()
-    app.state.session_manager = SessionManager()
+    app.state.session_manager = SessionManager(
+        max_running_conversations=16,
+        max_sessions=1000,
+        session_ttl=3600.0,
+        max_conversations_per_session=50,
+    )
+    app.state.session_clean_task = asyncio.create_task(
+        app.state.session_manager.run_clean_task()
+    )
     # TODO：config中加上mcp相关配置，以及最大重试次数
     app.state.mcp_client_manager = MCPClientManager()
+    app.state.mcp_client_manager.start()
+    # fetch the MCP tools before the first conversation needs them
+    catalog = await app.state.mcp_client_manager.get_tool_catalog("")
+    catalog.refresh()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.session_clean_task.cancel()
+    for session in app.state.session_manager.sessions.values():
+        session.cancel()
+    await app.state.mcp_client_manager.close()
 
 if __name__ == "__main__":
     import uvicorn
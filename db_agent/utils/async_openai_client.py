@@ -1,23 +1,24 @@
 """OpenAI API client wrapper with tool integration."""
 
+import asyncio
 import json
 import os
 import random
 import time
+from collections import OrderedDict
 from typing import override, AsyncGenerator
 
 import openai
 
+from openai.types import CompletionUsage
 from openai.types.chat import (
+    ChatCompletionAssistantMessageParam,
     ChatCompletionMessageParam,
+    ChatCompletionMessageToolCallParam,
     ChatCompletionToolParam,
     ChatCompletionToolMessageParam,
     ChatCompletionChunk,
-    ChatCompletion,
-    ChatCompletionMessage,
-    ChatCompletionMessageToolCall,
 )
-from openai.types.chat.chat_completion import Choice    
 
 from openai.types.shared_params import FunctionDefinition
 from mcp.types import Tool as MCPTool
@@ -25,9 +26,158 @@ from mcp.types import Tool as MCPTool
 from db_agent.tools.base import Tool, ToolCall, ToolResult
 from .config import ModelParameters
 from .base_client import BaseLLMClient
-from .llm_basics import LLMMessage, LLMResponse, LLMUsage
+from .llm_basics import LLMMessage, LLMResponse, LLMTiming, LLMUsage
 from .stream_printer import StreamPrinter
 
+# number of toolsets whose schemas are kept by each client
+TOOL_SCHEMA_CACHE_SIZE = 8
+# the delay before retrying a failed request doubles from the first to the last, in seconds
+RETRY_FIRST_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+
+def retry_delay(attempt: int) -> float:
+    """The delay before retrying after failed `attempt` (from 0): exponential, with half of it random.
+
+    The jitter keeps the clients that failed together from retrying together.
+    """
+    delay = min(RETRY_MAX_DELAY, RETRY_FIRST_DELAY * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def mcp_tool_schema(tool: MCPTool) -> ChatCompletionToolParam:
+    """Describe an MCP tool to the model."""
+    return ChatCompletionToolParam(
+        type="function",
+        function=FunctionDefinition(
+            name=tool.name,
+            description=tool.description,
+            parameters=tool.inputSchema,
+            strict=True
+        )
+    )
+
+
+class _ToolCallBuilder:
+    """A tool call of a streamed completion, with its arguments received so far."""
+    __slots__ = ("id", "name", "arguments")
+
+    def __init__(self):
+        self.id: str = ""
+        self.name: str = ""
+        self.arguments: list[str] = []
+
+
+class ChatCompletionAccumulator:
+    """Assembles the chunks of a streamed completion into an LLMResponse.
+
+    The text and the arguments of every tool call are kept as lists of deltas
+    and joined once at the end.
+    """
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.first_token_at: float | None = None
+        self.finished_at: float | None = None
+        self.model: str | None = None
+        self.finish_reason: str | None = None
+        self.usage: CompletionUsage | None = None
+        self._content: list[str] = []
+        self._tool_calls: list[_ToolCallBuilder] = []
+        # deltas with output, the number of tokens when the usage is not sent
+        self._output_deltas = 0
+
+    def add(self, chunk: ChatCompletionChunk) -> None:
+        now = time.monotonic()
+        self.finished_at = now
+        if self.model is None:
+            self.model = chunk.model
+        if chunk.usage is not None:
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return
+
+        choice = chunk.choices[0]
+        if choice.finish_reason is not None:
+            self.finish_reason = choice.finish_reason
+        delta = choice.delta
+        if delta.content:
+            self._content.append(delta.content)
+            self._output_deltas += 1
+            if self.first_token_at is None:
+                self.first_token_at = now
+        for tool_call in delta.tool_calls or ():
+            if tool_call.index >= len(self._tool_calls):
+                self._tool_calls.extend(
+                    _ToolCallBuilder() for _ in range(tool_call.index + 1 - len(self._tool_calls))
+                )
+            builder = self._tool_calls[tool_call.index]
+            if tool_call.id:
+                builder.id = tool_call.id
+            if tool_call.function is not None:
+                if tool_call.function.name:
+                    builder.name = tool_call.function.name
+                if tool_call.function.arguments:
+                    builder.arguments.append(tool_call.function.arguments)
+            self._output_deltas += 1
+            if self.first_token_at is None:
+                self.first_token_at = now
+
+    def message(self) -> ChatCompletionAssistantMessageParam:
+        """The completion as a message of the chat history."""
+        message = ChatCompletionAssistantMessageParam(role="assistant", content="".join(self._content))
+        if self._tool_calls:
+            message["tool_calls"] = [
+                ChatCompletionMessageToolCallParam(
+                    id=builder.id,
+                    type="function",
+                    function={"name": builder.name, "arguments": "".join(builder.arguments)},
+                )
+                for builder in self._tool_calls
+            ]
+        return message
+
+    def response(self) -> LLMResponse:
+        tool_calls = []
+        for builder in self._tool_calls:
+            arguments = "".join(builder.arguments)
+            tool_calls.append(
+                ToolCall(
+                    call_id=builder.id,
+                    name=builder.name,
+                    arguments=json.loads(arguments) if arguments else {},
+                    id=builder.id,
+                )
+            )
+
+        usage = None
+        if self.usage is not None:
+            prompt_details = self.usage.prompt_tokens_details
+            completion_details = self.usage.completion_tokens_details
+            usage = LLMUsage(
+                input_tokens=self.usage.prompt_tokens,
+                output_tokens=self.usage.completion_tokens,
+                cache_read_input_tokens=(prompt_details.cached_tokens or 0) if prompt_details else 0,
+                reasoning_tokens=(completion_details.reasoning_tokens or 0) if completion_details else 0,
+            )
+
+        return LLMResponse(
+            content="".join(self._content),
+            usage=usage,
+            model=self.model,
+            finish_reason=self.finish_reason,
+            tool_calls=tool_calls or None,
+            timing=self.timing(),
+        )
+
+    def timing(self) -> LLMTiming | None:
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        return LLMTiming(
+            time_to_first_token=self.first_token_at - self.started_at,
+            total_time=self.finished_at - self.started_at,
+            output_tokens=self.usage.completion_tokens if self.usage else self._output_deltas,
+        )
+
 
 class AsyncOpenAIClient():
     """OpenAI client wrapper with tool schema generation."""
@@ -45,6 +195,10 @@ class AsyncOpenAIClient():
         self.client: openai.AsyncOpenAI = openai.AsyncOpenAI(api_key=self.api_key, base_url="https://api.deepseek.com")
         self.message_history: list[ChatCompletionMessageParam] = []
         self.model_parameters: ModelParameters = model_parameters
+        # schemas of recent toolsets, keyed by the identity of their tools
+        self._tool_schemas: OrderedDict[
+            tuple[int, ...], tuple[list[Tool | MCPTool], list[ChatCompletionToolParam]]
+        ] = OrderedDict()
 
     @override
     def set_chat_history(self, messages: list[LLMMessage]) -> None:
@@ -52,6 +206,49 @@ class AsyncOpenAIClient():
         self.message_history = self.parse_messages(messages)
 
  
+    def get_tool_schemas(
+        self,
+        local_tools: list[Tool],
+        mcp_tools: list[MCPTool],
+        mcp_tool_schemas: list[ChatCompletionToolParam] | None = None,
+    ) -> list[ChatCompletionToolParam]:
+        """Get the schemas of a toolset, built once and reused across requests.
+
+        Tools are matched by identity, so a changed toolset, e.g. a refreshed MCP
+        tool list, gets new schemas. The returned list must not be modified.
+
+        :param mcp_tool_schemas: Schemas of `mcp_tools` built beforehand, e.g. by
+            the MCP tool catalog
+        """
+        tools: list[Tool | MCPTool] = [*local_tools, *mcp_tools]
+        key = tuple(id(tool) for tool in tools)
+        cached = self._tool_schemas.get(key)
+        if cached is not None:
+            self._tool_schemas.move_to_end(key)
+            return cached[1]
+
+        schemas = [
+            ChatCompletionToolParam(
+                type="function",
+                function=FunctionDefinition(
+                    name=tool.name,
+                    description=tool.description,
+                    parameters=tool.get_input_schema(),
+                    strict=True
+                )
+            )
+            for tool in local_tools
+        ] + (
+            mcp_tool_schemas
+            if mcp_tool_schemas is not None
+            else [mcp_tool_schema(tool) for tool in mcp_tools]
+        )
+        # the tools are kept alive with their schemas so that their ids are not reused
+        self._tool_schemas[key] = (tools, schemas)
+        if len(self._tool_schemas) > TOOL_SCHEMA_CACHE_SIZE:
+            self._tool_schemas.popitem(last=False)
+        return schemas
+
     @override
     async def a_chat(
         self,
@@ -61,50 +258,27 @@ class AsyncOpenAIClient():
         mcp_tools: list[MCPTool] | None = None,
         reuse_history: bool = True,
         log_to_history: bool = True,
-        printer: StreamPrinter = None
+        printer: StreamPrinter = None,
+        mcp_tool_schemas: list[ChatCompletionToolParam] | None = None,
     ) -> LLMResponse:
         """Send chat messages to OpenAI with optional tool support."""
         model_parameters: ModelParameters = self.model_parameters
         openai_messages: list[ChatCompletionMessageParam] = self.parse_messages(messages)
 
-        tool_schemas = None
-        if local_tools:
-            tool_schemas = [
-                ChatCompletionToolParam(
-                    type="function",
-                    function=FunctionDefinition(
-                        name=tool.name,
-                        description=tool.description,
-                        parameters=tool.get_input_schema(),
-                        strict=True
-                    )
-                )
-                for tool in local_tools
-            ]
-        if mcp_tools:
-            tool_schemas.extend([
-                ChatCompletionToolParam(
-                    type="function",
-                    function=FunctionDefinition(
-                        name=tool.name,
-                        description=tool.description,
-                        parameters=tool.inputSchema,
-                        strict=True
-                    )
-                )
-                for tool in mcp_tools
-            ])
+        tool_schemas = self.get_tool_schemas(
+            local_tools or [], mcp_tools or [], mcp_tool_schemas
+        ) or None
 
         api_call_input: list[ChatCompletionMessageParam] = []
         if reuse_history:
             api_call_input.extend(self.message_history)
         api_call_input.extend(openai_messages)
 
-        response = None
+        accumulator = None
         error_message = ""
         for i in range(model_parameters.max_retries):
             try:
-                response = await self.get_full_completion_stream(
+                accumulator = await self.stream_completion(
                     messages=api_call_input,
                     tools=tool_schemas,
                     model_parameters=model_parameters,
@@ -113,68 +287,29 @@ class AsyncOpenAIClient():
                 break
             except Exception as e:
                 error_message += f"Error {i + 1}: {str(e)}\n"
-                # Randomly sleep for 3-30 seconds
-                time.sleep(random.randint(3, 5))
-                continue
+                if i + 1 < model_parameters.max_retries:
+                    await asyncio.sleep(retry_delay(i))
 
-        if response is None:
+        if accumulator is None:
             raise ValueError(
                 f"Failed to get response from OpenAI after max retries: {error_message}"
             )
 
         if log_to_history:
             self.message_history = api_call_input.copy()
-        self.message_history.append(response.choices[0].message)
-
-        tool_calls: list[ToolCall] = []
-        content = response.choices[0].message.content
-        if response.choices[0].message.tool_calls:
-            for tool_call in response.choices[0].message.tool_calls:
-                tool_calls.append(
-                    ToolCall(
-                        call_id=tool_call.id,
-                        name=tool_call.function.name,
-                        arguments=json.loads(tool_call.function.arguments)
-                        if tool_call.function.arguments
-                        else {},
-                        id=tool_call.id,
-                    )
-                )
+        self.message_history.append(accumulator.message())
 
-        usage = None
-        if response.usage:
-            usage = LLMUsage(
-                input_tokens=response.usage.prompt_tokens,
-                output_tokens=response.usage.completion_tokens,
-                cache_read_input_tokens=response.usage.prompt_tokens_details.cached_tokens,
-                reasoning_tokens=response.usage.completion_tokens_details.reasoning_tokens if response.usage.completion_tokens_details else 0,
-            )
-
-        llm_response = LLMResponse(
-            content=content,
-            usage=usage,
-            model=response.model,
-            finish_reason=response.choices[0].finish_reason,
-            tool_calls=tool_calls if len(tool_calls) > 0 else None,
-        )
-
-        return llm_response
+        return accumulator.response()
 
-    async def get_full_completion_stream(
+    async def stream_completion(
         self,
         messages: list[ChatCompletionMessageParam],
         tools: list[ChatCompletionToolParam],
         model_parameters: ModelParameters,
         printer: StreamPrinter = None,
-    ) -> ChatCompletion:
-        """Send chat messages to OpenAI with optional tool support."""
-        completion_data = {
-            "id": None,
-            "created": None,
-            "model": None,
-            "choices": [{"index": 0, "message": {"role": "assistant", "content": "", "tool_calls": []}}],
-            "usage": None
-        }
+    ) -> "ChatCompletionAccumulator":
+        """Stream a completion, passing every chunk to `printer` as it arrives."""
+        accumulator = ChatCompletionAccumulator(time.monotonic())
         stream: AsyncGenerator[ChatCompletionChunk, None] = await self.client.chat.completions.create(
             messages=messages,
             model=model_parameters.model,
@@ -184,75 +319,17 @@ class AsyncOpenAIClient():
             else openai.NOT_GIVEN,
             top_p=model_parameters.top_p,
             stream=True,
+            # the usage is sent in a last chunk without choices
+            stream_options={"include_usage": True},
         )
 
-         # 处理流式响应
+        # 处理流式响应
         async for chunk in stream:
             # 如果需要，先行输出
             if printer:
                 await printer.print_chunk(chunk)
-
-            # 收集元数据 (只出现一次)
-            chunk: ChatCompletionChunk = chunk
-            if completion_data["id"] is None:
-                completion_data["id"] = chunk.id
-                completion_data["created"] = chunk.created
-                completion_data["model"] = chunk.model
-
-            # 处理内容增量
-            if chunk.choices:
-                choice = chunk.choices[0]
-                delta = choice.delta
-                
-                # 收集文本内容
-                if delta.content is not None:
-                    completion_data["choices"][0]["message"]["content"] += delta.content
-                
-                # 收集工具调用
-                if delta.tool_calls:
-                    for tool_call in delta.tool_calls:
-                        # 处理新工具调用
-                        if tool_call.index >= len(completion_data["choices"][0]["message"]["tool_calls"]):
-                            completion_data["choices"][0]["message"]["tool_calls"].append({
-                                "id": tool_call.id,
-                                "type": tool_call.type,
-                                "function": {
-                                    "name": tool_call.function.name,
-                                    "arguments": tool_call.function.arguments
-                                }
-                            })
-                        # 追加现有工具调用的参数
-                        else:
-                            current_tool = completion_data["choices"][0]["message"]["tool_calls"][tool_call.index]
-                            current_tool["function"]["arguments"] += tool_call.function.arguments
- 
-        # 重建 ChatCompletion 对象
-        return ChatCompletion(
-            id=completion_data["id"],
-            created=completion_data["created"],
-            model=completion_data["model"],
-            object="chat.completion",
-            choices=[
-                Choice(
-                    index=0,
-                    message=ChatCompletionMessage(
-                        role="assistant",
-                        content=completion_data["choices"][0]["message"]["content"],
-                        tool_calls=[
-                            ChatCompletionMessageToolCall(
-                                id=tool_call["id"],
-                                type=tool_call["type"],
-                                function=tool_call["function"]
-                            ) for tool_call in completion_data["choices"][0]["message"]["tool_calls"]
-                        ]
-                    ),
-                    finish_reason="stop"  # 流式结束时通常为stop
-                )
-            ],
-            usage=None  # 流式响应不包含usage数据
-        )
-                
-
+            accumulator.add(chunk)
+        return accumulator
 
     @override
     def supports_tool_calling(self, model_parameters: ModelParameters) -> bool:
@@ -0,0 +1,143 @@
+import json
+import re
+from typing import Dict, Iterable, List, Optional
+
+# the characters that end a run of plain characters in a JSON string
+_STRING_SPECIAL = re.compile(r'["\\]')
+# the characters that matter outside of strings
+_STRUCTURAL = re.compile(r'[{}\[\]:,"]')
+
+
+class JsonStringFieldDecoder:
+    """Decodes string fields of a JSON object that arrives in pieces.
+
+    `feed` takes the next piece of the text, e.g. the arguments of a streamed
+    tool call, and returns the characters of the watched fields that were
+    completed by it. Only the string values of the top level keys in `fields`
+    are decoded. Every character is looked at once, so decoding a whole
+    stream is linear in its length however it is split.
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = set(fields)
+        self._depth = 0
+        self._expect_key = False
+        self._key: Optional[str] = None
+        # the string that is being read, whether it is a key or a watched value
+        self._in_string = False
+        self._string_is_key = False
+        self._string_watched = False
+        self._key_parts: List[str] = []
+        # an escape sequence split between pieces, and a high surrogate waiting for its low half
+        self._escape = ""
+        self._high_surrogate = ""
+
+    def feed(self, text: str) -> Dict[str, str]:
+        """Read the next piece of text, return the new characters of each watched field."""
+        output: Dict[str, str] = {}
+        pos = 0
+        end = len(text)
+        while pos < end:
+            if self._in_string:
+                pos = self._read_string(text, pos, output)
+                continue
+            match = _STRUCTURAL.search(text, pos)
+            if match is None:
+                break
+            pos = match.end()
+            self._read_structural(match.group())
+        return output
+
+    def _read_structural(self, char: str) -> None:
+        if char in "{[":
+            self._depth += 1
+            self._expect_key = char == "{" and self._depth == 1
+        elif char in "}]":
+            self._depth -= 1
+        elif self._depth != 1:
+            if char == '"':
+                # a string in a nested value, read but never decoded
+                self._start_string(is_key=False, watched=False)
+        elif char == ",":
+            self._expect_key = True
+        elif char == ":":
+            self._expect_key = False
+        elif char == '"':
+            if self._expect_key:
+                self._key_parts = []
+                self._start_string(is_key=True, watched=False)
+            else:
+                self._start_string(is_key=False, watched=self._key in self.fields)
+
+    def _start_string(self, is_key: bool, watched: bool) -> None:
+        self._in_string = True
+        self._string_is_key = is_key
+        self._string_watched = watched
+
+    def _read_string(self, text: str, pos: int, output: Dict[str, str]) -> int:
+        """Read the string from `pos` up to its end or the end of `text`, return where it stopped."""
+        decoding = self._string_is_key or self._string_watched
+        parts: List[str] = []
+        end = len(text)
+        while pos < end:
+            if self._escape:
+                # finish the escape sequence started before
+                if len(self._escape) == 1:
+                    self._escape += text[pos]
+                    pos += 1
+                needed = 6 if self._escape[1] == "u" else 2
+                taken = text[pos : pos + needed - len(self._escape)]
+                self._escape += taken
+                pos += len(taken)
+                if len(self._escape) < needed:
+                    break
+                if decoding:
+                    parts.append(self._decode_escape(self._escape))
+                self._escape = ""
+                continue
+            match = _STRING_SPECIAL.search(text, pos)
+            stop = match.start() if match else end
+            if decoding and stop > pos:
+                parts.append(self._flush_surrogate() + text[pos:stop])
+            if match is None:
+                pos = end
+                break
+            if match.group() == '"':
+                pos = stop + 1
+                self._in_string = False
+                break
+            self._escape = "\\"
+            pos = stop + 1
+
+        decoded = "".join(parts)
+        if not self._in_string:
+            decoded += self._flush_surrogate()
+        if self._string_is_key:
+            self._key_parts.append(decoded)
+            if not self._in_string:
+                self._key = "".join(self._key_parts)
+        elif decoded:
+            output[self._key] = output.get(self._key, "") + decoded
+        return pos
+
+    def _decode_escape(self, escape: str) -> str:
+        try:
+            char = json.loads(f'"{escape}"')
+        except json.JSONDecodeError:
+            return self._flush_surrogate() + escape
+        if "\ud800" <= char <= "\udbff":
+            pending = self._flush_surrogate()
+            self._high_surrogate = escape
+            return pending
+        if "\udc00" <= char <= "\udfff":
+            if not self._high_surrogate:
+                return escape
+            pair = json.loads(f'"{self._high_surrogate}{escape}"')
+            self._high_surrogate = ""
+            return pair
+        return self._flush_surrogate() + char
+
+    def _flush_surrogate(self) -> str:
+        """A high surrogate not followed by a low one, kept as the text of its escape like a lone low one."""
+        pending, self._high_surrogate = self._high_surrogate, ""
+        return pending
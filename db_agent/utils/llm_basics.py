@@ -44,6 +44,21 @@ class LLMUsage:
         return f"LLMUsage(input_tokens={self.input_tokens}, output_tokens={self.output_tokens}, cache_creation_input_tokens={self.cache_creation_input_tokens}, cache_read_input_tokens={self.cache_read_input_tokens}, reasoning_tokens={self.reasoning_tokens})"
 
 
+@dataclass
+class LLMTiming:
+    """Timing of a streamed LLM response, in seconds."""
+
+    time_to_first_token: float
+    total_time: float
+    output_tokens: int
+
+    @property
+    def tokens_per_second(self) -> float:
+        """Output tokens per second, from the first token to the end of the response."""
+        generation_time = self.total_time - self.time_to_first_token
+        return self.output_tokens / generation_time if generation_time > 0 else 0.0
+
+
 @dataclass
 class LLMResponse:
     """Standard LLM response format."""
@@ -53,3 +68,4 @@ class LLMResponse:
     model: str | None = None
     finish_reason: str | None = None
     tool_calls: list[ToolCall] | None = None
+    timing: LLMTiming | None = None
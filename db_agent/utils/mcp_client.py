@@ -1,5 +1,7 @@
 import asyncio
-from typing import Any, Dict, List, Optional, Union
+import contextlib
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar, Union
 from click import command
 from fastmcp import Client as FastMCPClient
 from fastmcp.client.transports import (
@@ -10,6 +12,8 @@ from fastmcp.client.transports import (
 from mcp.types import Tool
 from fastmcp.client.client import CallToolResult
 
+T = TypeVar("T")
+
 class MCPClientBase:
     """Base class for MCP clients using fastmcp framework"""
     def __init__(self, server_source: Union[str, Dict], **kwargs):
@@ -136,7 +140,7 @@ class StreamableHttpClient(MCPClientBase):
 
 class StdioClient(MCPClientBase):
     """Client for STDIO transport (local scripts)"""
-    def __init__(self, command, args: [str], env: dict = {}, cwd: str = ".", keep_alive: bool = True):
+    def __init__(self, command, args: [str], env: dict = {}, cwd: str = ".", keep_alive: bool = True, **kwargs):
         """
         :param script_path: Path to server script (e.g., "./server.py")
         """
@@ -147,7 +151,7 @@ class StdioClient(MCPClientBase):
             cwd=cwd,
             keep_alive=keep_alive
         )
-        super().__init__(transport)
+        super().__init__(transport, **kwargs)
 
 
 class MemoryClient(MCPClientBase):
@@ -159,6 +163,144 @@ class MemoryClient(MCPClientBase):
         super().__init__(server_instance, **kwargs)
 
 
+class PooledMCPClient:
+    """A long-lived connection to an MCP server, shared by all conversations.
+
+    The connection is opened on first use and kept open between calls. It is
+    pinged before use when it has been idle for a while, and reopened when the
+    server went away. Idempotent requests such as `list_tools` are retried once
+    on a new connection; tool calls are not, since the server may already have
+    run them.
+    """
+    def __init__(
+        self,
+        factory: Callable[[], MCPClientBase],
+        health_check_interval: float = 30.0,
+    ):
+        """
+        :param factory: Creates a new, unconnected client for the server
+        :param health_check_interval: Seconds of inactivity after which the
+            connection is pinged before it is used again
+        """
+        self._factory = factory
+        self.health_check_interval = health_check_interval
+        self._client: Optional[MCPClientBase] = None
+        # the connection is entered and exited by this task, as the transport requires
+        self._holder: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._lock = asyncio.Lock()
+        self._last_checked = 0.0
+        self._in_flight = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def connected(self) -> bool:
+        return (
+            self._client is not None
+            and self._client.connected
+            and self._holder is not None
+            and not self._holder.done()
+        )
+
+    @property
+    def busy(self) -> bool:
+        """Whether a request is using the connection."""
+        return self._in_flight > 0
+
+    async def list_tools(self) -> List[Tool]:
+        return await self._request(lambda client: client.list_tools(), retry=True)
+
+    async def call_tool(self, tool_name: str, parameters: Dict[str, Any]) -> CallToolResult:
+        return await self._request(
+            lambda client: client.call_tool(tool_name, parameters), retry=False
+        )
+
+    async def ping(self) -> bool:
+        return await self._request(lambda client: client.ping(), retry=True)
+
+    async def close(self) -> None:
+        """Close the connection. It is reopened by the next request."""
+        async with self._lock:
+            await self._disconnect()
+
+    async def _request(
+        self, request: Callable[[MCPClientBase], Awaitable[T]], retry: bool
+    ) -> T:
+        self._in_flight += 1
+        try:
+            client = await self._connection()
+            try:
+                return await request(client)
+            except Exception:
+                if await self._alive(client):
+                    raise
+                # the server went away, the next request starts a new one
+                await self.close()
+                if not retry:
+                    raise
+            return await request(await self._connection())
+        finally:
+            self._in_flight -= 1
+            self.last_used = time.monotonic()
+
+    async def _connection(self) -> MCPClientBase:
+        async with self._lock:
+            now = time.monotonic()
+            if self.connected:
+                assert self._client is not None
+                if now - self._last_checked < self.health_check_interval:
+                    self._last_checked = now
+                    return self._client
+                if await self._alive(self._client):
+                    self._last_checked = time.monotonic()
+                    return self._client
+            await self._disconnect()
+            await self._connect()
+            assert self._client is not None
+            self._last_checked = time.monotonic()
+            return self._client
+
+    async def _alive(self, client: MCPClientBase) -> bool:
+        if client is not self._client or not self.connected:
+            return False
+        try:
+            return await client.ping()
+        except Exception:
+            return False
+
+    async def _connect(self) -> None:
+        client = self._factory()
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        stop = asyncio.Event()
+
+        async def hold() -> None:
+            try:
+                async with client:
+                    ready.set_result(None)
+                    await stop.wait()
+            except Exception as e:
+                if not ready.done():
+                    ready.set_exception(e)
+
+        holder = asyncio.create_task(hold())
+        try:
+            await ready
+        except BaseException:
+            holder.cancel()
+            raise
+        self._client, self._holder, self._stop = client, holder, stop
+
+    async def _disconnect(self) -> None:
+        holder, stop = self._holder, self._stop
+        self._client, self._holder, self._stop = None, None, None
+        if holder is None or stop is None:
+            return
+        stop.set()
+        # a server that does not shut down cleanly is abandoned either way
+        with contextlib.suppress(Exception):
+            await asyncio.wait_for(holder, timeout=5)
+
+
 async def test():
     # HTTP Client Example
     client = SSEClient("http://localhost:9000/sse")
@@ -1,4 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
+from collections import deque
 from fastapi import WebSocket
 from enum import Enum
 from openai import AsyncOpenAI
@@ -9,6 +11,7 @@ class MessageType(str, Enum):
     START = 'start'
     END = 'end'
     STATUS = 'status'
+    ERROR = 'error'
 
 class OutputMessage(ABC):
     def __init__(self, type: MessageType, content: str):
@@ -47,11 +50,44 @@ class OutputStream(ABC):
         pass
 
 class WebSocketOutputStream(OutputStream):
-    def __init__(self, websocket: WebSocket):
+    """Sends the output of conversations to a websocket.
+
+    Streamed chunks are buffered for up to `flush_interval` seconds or
+    `max_chunk_bytes` bytes and sent as a single CHUNK frame; START and END
+    frames flush the buffer first, so the framing is unchanged. Frames are sent
+    by a writer task. When `max_queued_frames` frames are waiting for a slow
+    client, producers wait instead of buffering more. Status updates never
+    wait: a status that is still the last queued frame is replaced by the
+    newer one, and a status is dropped when the queue is full.
+    """
+    def __init__(
+        self,
+        websocket: WebSocket,
+        flush_interval: float = 0.02,
+        max_chunk_bytes: int = 4096,
+        max_queued_frames: int = 64,
+    ):
         self.websocket = websocket
+        self.flush_interval = flush_interval
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_queued_frames = max_queued_frames
+        self._queue: deque[OutputMessage] = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        # set when every queued frame was sent
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._chunk: list[str] = []
+        self._chunk_bytes = 0
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._writer: asyncio.Task | None = None
+        # the error that stopped the writer, raised to the producers
+        self._error: BaseException | None = None
 
     async def send_message(self, output_message: OutputMessage) -> None:
-        await self.websocket.send_json(output_message.to_dict())
+        self._flush_chunk()
+        await self._put(output_message)
 
     async def send_text(self, text: str) -> None:
         await self.start_chunk()
@@ -59,15 +95,104 @@ class WebSocketOutputStream(OutputStream):
         await self.end_chunk()
 
     async def start_chunk(self) -> None:
-        await self.websocket.send_json(OutputMessage(MessageType.START, "").to_dict())
+        await self.send_message(OutputMessage(MessageType.START, ""))
 
     async def end_chunk(self) -> None:
-        await self.websocket.send_json(OutputMessage(MessageType.END, "").to_dict())
+        await self.send_message(OutputMessage(MessageType.END, ""))
 
     async def send_chunk(self, text: str) -> None:
-        message = OutputMessage(MessageType.CHUNK, text)
-        await self.websocket.send_json(message.to_dict())
+        if not text:
+            return
+        self._chunk.append(text)
+        self._chunk_bytes += len(text.encode())
+        if self._chunk_bytes >= self.max_chunk_bytes:
+            self._flush_chunk()
+            await self._wait_not_full()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._flush_chunk
+            )
 
     async def update_status(self, content: str) -> None:
+        self._raise_error()
+        self._flush_chunk()
         message = OutputMessage(MessageType.STATUS, content)
-        await self.websocket.send_json(message.to_dict())
\ No newline at end of file
+        if self._queue and self._queue[-1].type == MessageType.STATUS:
+            self._queue[-1] = message
+        elif len(self._queue) < self.max_queued_frames:
+            self._enqueue(message)
+
+    async def flush(self) -> None:
+        """Wait until everything written so far was sent."""
+        self._flush_chunk()
+        await self._drained.wait()
+        self._raise_error()
+
+    async def close(self) -> None:
+        """Stop the writer task, dropping the frames that were not sent yet."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self._error is None:
+            self._error = ConnectionError("the output stream is closed")
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        # the cancelled writer does not wake up the waiting producers, who raise the error
+        self._queue.clear()
+        self._not_full.set()
+        self._drained.set()
+
+    def _flush_chunk(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._chunk:
+            return
+        text = "".join(self._chunk)
+        self._chunk.clear()
+        self._chunk_bytes = 0
+        # may go over the limit by one frame, the producer waits right after
+        self._enqueue(OutputMessage(MessageType.CHUNK, text))
+
+    async def _put(self, message: OutputMessage) -> None:
+        await self._wait_not_full()
+        self._enqueue(message)
+
+    async def _wait_not_full(self) -> None:
+        self._raise_error()
+        while len(self._queue) >= self.max_queued_frames:
+            self._not_full.clear()
+            await self._not_full.wait()
+            self._raise_error()
+
+    def _enqueue(self, message: OutputMessage) -> None:
+        if self._error is not None:
+            # also called by the flush timer, the producers raise the error
+            return
+        self._queue.append(message)
+        self._not_empty.set()
+        self._drained.clear()
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write())
+
+    async def _write(self) -> None:
+        try:
+            while True:
+                await self._not_empty.wait()
+                while self._queue:
+                    message = self._queue.popleft()
+                    self._not_full.set()
+                    await self.websocket.send_json(message.to_dict())
+                self._not_empty.clear()
+                self._drained.set()
+        except Exception as e:
+            # e.g. the client disconnected, wake up the waiting producers
+            self._error = e
+            self._queue.clear()
+            self._not_full.set()
+            self._drained.set()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"failed to send output: {self._error}") from self._error
@@ -5,7 +5,10 @@ import argparse
 import json
 import shutil
 import subprocess
+import tarfile
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Any
 
@@ -32,6 +35,10 @@ def docker_exec(container, command: str):
     return return_code, output
 
 
+# exit status of coreutils `timeout` when the command timed out
+TIMEOUT_RETURN_CODE = 124
+
+
 class SWEBenchEvaluation:
     def __init__(
         self,
@@ -41,6 +48,7 @@ class SWEBenchEvaluation:
         docker_env_config: str = "",
         swebench_harness_path: str = "",
         run_id="trae-agent",
+        max_workers: int = 1,
     ):
         """
         Initialize the SWEBenchEvaluation class. The initialisation includes checking the existence of required Docker images and downloading missing images.
@@ -52,14 +60,20 @@ class SWEBenchEvaluation:
             docker_env_config: The path to the docker environment config file.
             swebench_harness_path: The path to the SWEBench harness.
             run_id: The run id.
+            max_workers: The maximum number of instances to run at the same time.
         """
         assert dataset in ["SWE-bench", "SWE-bench_Lite", "SWE-bench_Verified"], (
             f"Invalid dataset name: {dataset}"
         )
         self.dataset = load_dataset(f"princeton-nlp/{dataset}", split="test")
         self.dataset_name = dataset
+        self.instances: dict[str, dict[str, Any]] = {
+            item["instance_id"]: item for item in self.dataset
+        }
 
-        self.docker_client = from_env()
+        # every running instance holds a docker API connection for its whole run
+        self.max_workers = max_workers
+        self.docker_client = from_env(max_pool_size=max(10, max_workers + 1))
         self.image_status: dict[Any, Any] = {}
         self.working_dir = Path(working_dir)
         self.swebench_harness_path = swebench_harness_path
@@ -145,6 +159,7 @@ class SWEBenchEvaluation:
 
         if all_exist:
             print("Found built trae-agent and uv artifacts. Skipping building.")
+            self.extract_artifacts()
             return
 
         try:
@@ -204,6 +219,32 @@ class SWEBenchEvaluation:
         container.stop()
         container.remove()
 
+        self.extract_artifacts()
+
+    def extract_artifacts(self):
+        """
+        Extract the Trae agent and UV artifacts once in the workspace. Experiment containers mount the extracted files instead of extracting the archives themselves, which would race when several instances start at the same time.
+        """
+        targets = {
+            "trae-agent.tar": self.working_dir,
+            "uv.tar": self.working_dir / "uv_bin",
+            "uv_shared.tar": self.working_dir / "uv_shared",
+        }
+        marker = self.working_dir / ".artifacts_extracted"
+        if marker.exists() and all(
+            (self.working_dir / tar).stat().st_mtime <= marker.stat().st_mtime
+            for tar in targets
+        ):
+            return
+
+        for tar, target in targets.items():
+            target.mkdir(parents=True, exist_ok=True)
+            with tarfile.open(self.working_dir / tar) as f:
+                # the archives are built by `prepare_trae_agent` and contain absolute
+                # symlinks into the container (e.g. the venv python), keep them as is
+                f.extractall(target, filter="fully_trusted")
+        marker.touch()
+
     def prepare_experiment_container(self, instance):
         """
         Prepare an experiment Docker container for a given instance.
@@ -222,6 +263,7 @@ class SWEBenchEvaluation:
         with open(instance_dir / "problem_statement.txt", "w") as f:
             f.write(instance["problem_statement"])
 
+        workspace = self.working_dir.absolute()
         container = self.docker_client.containers.run(
             image_name,
             command="/bin/bash",
@@ -229,49 +271,49 @@ class SWEBenchEvaluation:
             tty=True,
             stdin_open=True,
             volumes={
-                self.working_dir.absolute(): {"bind": "/trae-workspace", "mode": "rw"}
+                workspace: {"bind": "/trae-workspace", "mode": "rw"},
+                workspace / "uv_bin" / "uv": {
+                    "bind": "/root/.local/bin/uv",
+                    "mode": "ro",
+                },
+                workspace / "uv_shared" / "uv": {
+                    "bind": "/root/.local/share/uv",
+                    "mode": "ro",
+                },
             },
             working_dir="/trae-workspace",
             environment=self.docker_env_config.get("experiment_env", None),
             stream=True,
         )
+        return container
 
-        commands = [
-            "tar xf trae-agent.tar",
-            "tar xf uv.tar",
-            "mkdir -p /root/.local/bin",
-            "mv uv /root/.local/bin/",
-            "tar xf uv_shared.tar",
-            "mkdir -p /root/.local/share",
-            "mv uv /root/.local/share/",
-        ]
+    def patch_path(self, instance_id: str) -> Path:
+        """
+        Get the path of the patch generated for an instance.
 
-        for command in commands:
-            try:
-                new_command = f'/bin/bash -c "{command}"'
-                return_code, output = docker_exec(container, new_command)
-                if return_code is not None and return_code != 0:
-                    print("Docker exec error. Error message: {}".format(output))
-            except Exception:
-                print(f"{command} failed.")
-                print(traceback.format_exc())
-                break
-        return container
+        Args:
+            instance_id: The instance id.
+
+        Returns:
+            The path of the patch file.
+        """
+        return self.working_dir / instance_id / f"{instance_id}.patch"
 
-    def run_one_instance(self, instance_id):
+    def run_one_instance(self, instance_id, timeout: float | None = None) -> str:
         """
         Run a single instance using the prepared experiment container.
 
         Args:
             instance_id: The ID of the instance to run.
+            timeout: Maximum number of seconds the agent may run. No limit if None.
+
+        Returns:
+            The status of the run: "completed", "failed", "timeout" or "not_found".
         """
-        instance = None
-        for inst in self.dataset:
-            if inst["instance_id"] == instance_id:
-                instance = inst
+        instance = self.instances.get(instance_id)
         if instance is None:
             print(f"Instance {instance_id} not found.")
-            return
+            return "not_found"
 
         container = self.prepare_experiment_container(instance)
         instance_dir = instance["instance_id"]
@@ -280,23 +322,88 @@ class SWEBenchEvaluation:
         traj_path = instance_dir + f"/{instance['instance_id']}.json"
         command = f'source trae-agent/.venv/bin/activate && trae-cli run {problem_statement_path} --working-dir="/testbed/" --config-file trae_config_local.json --max-steps 200 --must-patch --patch-path {patch_file_path} --trajectory-file {traj_path}'
         new_command = f"/bin/bash -c '{command}'"
+        if timeout is not None:
+            new_command = f"timeout --kill-after=30 {int(timeout)} {new_command}"
 
+        status = "completed"
         try:
             return_code, output = docker_exec(container, new_command)
-            if return_code is not None and return_code != 0:
+            if return_code == TIMEOUT_RETURN_CODE:
+                print(f"Instance {instance_id} timed out after {timeout} seconds.")
+                status = "timeout"
+            elif return_code is not None and return_code != 0:
                 print("Docker exec error. Error message: {}".format(output))
+                status = "failed"
         except Exception:
             print(f"{command} failed.")
             print(traceback.format_exc())
+            status = "failed"
+        finally:
+            container.stop()
 
-        container.stop()
+        return status
 
-    def run_all(self):
+    def run_all(
+        self,
+        instance_ids: list[str] | None = None,
+        timeout: float | None = None,
+        resume: bool = True,
+    ):
         """
-        Run all instances in the dataset.
+        Run instances on a pool of `max_workers` containers.
+
+        Args:
+            instance_ids: The instances to run. If None, all instances in the dataset will be run.
+            timeout: Maximum number of seconds per instance. No limit if None.
+            resume: Skip instances for which a patch has already been generated.
         """
-        for instance in tqdm(self.dataset, desc="Running all instances"):
-            self.run_one_instance(instance)
+        if not instance_ids:
+            instance_ids = list(self.instances)
+
+        pending = instance_ids
+        if resume:
+            pending = [
+                instance_id
+                for instance_id in instance_ids
+                if not self.patch_path(instance_id).exists()
+            ]
+        skipped = len(instance_ids) - len(pending)
+        if skipped:
+            print(f"Skipping {skipped} instances with an existing patch.")
+
+        counts: dict[str, int] = {}
+        start_time = time.monotonic()
+        with (
+            tqdm(total=len(pending), desc="Running instances") as progress,
+            ThreadPoolExecutor(max_workers=self.max_workers) as executor,
+        ):
+            futures = {
+                executor.submit(
+                    self.run_one_instance, instance_id, timeout
+                ): instance_id
+                for instance_id in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    status = future.result()
+                except Exception:
+                    print(f"Instance {futures[future]} failed.")
+                    print(traceback.format_exc())
+                    status = "failed"
+                counts[status] = counts.get(status, 0) + 1
+                hours = (time.monotonic() - start_time) / 3600
+                progress.set_postfix(
+                    counts, throughput=f"{sum(counts.values()) / hours:.1f} inst/h"
+                )
+                progress.update()
+
+        hours = (time.monotonic() - start_time) / 3600
+        throughput = len(pending) / hours if hours > 0 else 0.0
+        summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+        print(
+            f"Ran {len(pending)} instances ({summary or 'none'}), skipped {skipped}, "
+            f"in {hours:.2f} hours: {throughput:.1f} instances/hour with {self.max_workers} workers."
+        )
 
     def run_eval(self):
         """
@@ -387,6 +494,24 @@ def main():
         default="trae-agent",
         help="Run ID for SWE-bench evaluation.",
     )
+    argument_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of instances to run concurrently, each in its own container.",
+    )
+    argument_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Maximum number of seconds per instance. No limit by default.",
+    )
+    argument_parser.add_argument(
+        "--resume",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Skip instances whose patch already exists in the working directory.",
+    )
     # expr: only generate patches
     # eval: only evaluation patches
     # e2e: both expr and eval
@@ -406,6 +531,7 @@ def main():
         args.docker_env_config,
         args.swebench_harness_path,
         args.run_id,
+        args.workers,
     )
 
     if args.mode == "e2e" or args.mode == "expr":
@@ -413,11 +539,9 @@ def main():
 
         if args.instance_ids:
             print(f"Running instance {args.instance_ids}")
-            for instance_id in tqdm(args.instance_ids, desc="Running instances"):
-                evaluation.run_one_instance(instance_id)
         else:
             print("Running all instances")
-            evaluation.run_all()
+        evaluation.run_all(args.instance_ids, args.timeout, args.resume)
 
     if args.mode == "e2e" or args.mode == "eval":
         evaluation.get_all_preds(args.instance_ids)
@@ -0,0 +1,179 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+from openai.types.chat import ChatCompletionChunk
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+try:
+    from db_agent.utils import async_openai_client
+    from db_agent.utils.async_openai_client import (
+        RETRY_FIRST_DELAY,
+        RETRY_MAX_DELAY,
+        ChatCompletionAccumulator,
+        retry_delay,
+    )
+except ImportError:  # e.g. mcp, only needed by the database agent
+    ChatCompletionAccumulator = None
+
+
+def _chunk(
+    delta: dict | None = None,
+    finish_reason: str | None = None,
+    usage: dict | None = None,
+) -> ChatCompletionChunk:
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": "chunk",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "test-model",
+            "choices": []
+            if delta is None
+            else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            "usage": usage,
+        }
+    )
+
+
+def _tool_call_delta(
+    index: int, arguments: str, call_id: str | None = None, name: str | None = None
+) -> dict:
+    function = {"arguments": arguments}
+    if name is not None:
+        function["name"] = name
+    return {
+        "tool_calls": [
+            {"index": index, "id": call_id, "type": "function", "function": function}
+        ]
+    }
+
+
+@unittest.skipIf(
+    ChatCompletionAccumulator is None,
+    "the database agent dependencies are not installed",
+)
+class TestChatCompletionAccumulator(unittest.TestCase):
+    def accumulate(
+        self, chunks: list[ChatCompletionChunk], times: list[float]
+    ) -> "ChatCompletionAccumulator":
+        accumulator = ChatCompletionAccumulator(started_at=10.0)
+        with patch.object(async_openai_client.time, "monotonic", side_effect=times):
+            for chunk in chunks:
+                accumulator.add(chunk)
+        return accumulator
+
+    def test_interleaved_tool_calls(self):
+        chunks = [
+            _chunk({"role": "assistant", "content": "Let me "}),
+            _chunk({"content": "look."}),
+            _chunk(_tool_call_delta(0, "", "call_a", "query")),
+            _chunk(_tool_call_delta(1, '{"table"', "call_b", "describe")),
+            _chunk(_tool_call_delta(0, '{"sql": "SELECT')),
+            _chunk(_tool_call_delta(1, ': "t"}')),
+            _chunk(_tool_call_delta(0, ' 1"}')),
+            _chunk({}, finish_reason="tool_calls"),
+        ]
+        accumulator = self.accumulate(chunks, [10.0 + i for i in range(len(chunks))])
+
+        response = accumulator.response()
+        self.assertEqual(response.content, "Let me look.")
+        self.assertEqual(response.finish_reason, "tool_calls")
+        self.assertEqual(response.model, "test-model")
+        assert response.tool_calls is not None
+        self.assertEqual(
+            [(call.call_id, call.name, call.arguments) for call in response.tool_calls],
+            [
+                ("call_a", "query", {"sql": "SELECT 1"}),
+                ("call_b", "describe", {"table": "t"}),
+            ],
+        )
+        message = accumulator.message()
+        self.assertEqual(
+            [call["function"]["arguments"] for call in message["tool_calls"]],
+            ['{"sql": "SELECT 1"}', '{"table": "t"}'],
+        )
+
+    def test_usage_sent_in_a_last_chunk(self):
+        chunks = [
+            _chunk({"content": "one"}),
+            _chunk({"content": " two"}, finish_reason="stop"),
+            _chunk(
+                usage={
+                    "prompt_tokens": 100,
+                    "completion_tokens": 12,
+                    "total_tokens": 112,
+                    "prompt_tokens_details": {"cached_tokens": 64},
+                }
+            ),
+        ]
+        accumulator = self.accumulate(chunks, [10.5, 11.0, 12.5])
+
+        response = accumulator.response()
+        self.assertEqual(response.content, "one two")
+        self.assertEqual(response.finish_reason, "stop")
+        assert response.usage is not None
+        self.assertEqual(response.usage.input_tokens, 100)
+        self.assertEqual(response.usage.output_tokens, 12)
+        self.assertEqual(response.usage.cache_read_input_tokens, 64)
+        assert response.timing is not None
+        self.assertEqual(response.timing.time_to_first_token, 0.5)
+        self.assertEqual(response.timing.total_time, 2.5)
+        self.assertEqual(response.timing.output_tokens, 12)
+        self.assertEqual(response.timing.tokens_per_second, 6.0)
+
+    def test_output_deltas_are_counted_without_usage(self):
+        chunks = [
+            _chunk({"role": "assistant"}),
+            _chunk({"content": "a"}),
+            _chunk({"content": "b"}),
+            _chunk(_tool_call_delta(0, "{}", "call", "query")),
+            _chunk({}, finish_reason="stop"),
+        ]
+        accumulator = self.accumulate(chunks, [10.0, 11.0, 12.0, 13.0, 15.0])
+
+        response = accumulator.response()
+        self.assertIsNone(response.usage)
+        assert response.timing is not None
+        self.assertEqual(response.timing.time_to_first_token, 1.0)
+        self.assertEqual(response.timing.total_time, 5.0)
+        self.assertEqual(response.timing.output_tokens, 3)
+        self.assertEqual(response.timing.tokens_per_second, 0.75)
+
+    def test_no_timing_without_output(self):
+        accumulator = self.accumulate([_chunk({"role": "assistant"})], [11.0])
+        self.assertIsNone(accumulator.timing())
+        self.assertIsNone(ChatCompletionAccumulator(started_at=0.0).timing())
+
+
+@unittest.skipIf(
+    ChatCompletionAccumulator is None,
+    "the database agent dependencies are not installed",
+)
+class TestRetryDelay(unittest.TestCase):
+    def test_jitter_bounds(self):
+        for attempt in range(10):
+            delay = min(RETRY_MAX_DELAY, RETRY_FIRST_DELAY * 2**attempt)
+            with patch.object(
+                async_openai_client.random, "uniform", side_effect=lambda a, b: a
+            ):
+                self.assertEqual(retry_delay(attempt), delay / 2)
+            with patch.object(
+                async_openai_client.random, "uniform", side_effect=lambda a, b: b
+            ):
+                self.assertEqual(retry_delay(attempt), delay)
+            for _ in range(20):
+                self.assertTrue(delay / 2 <= retry_delay(attempt) <= delay)
+
+    def test_delays_grow_up_to_the_maximum(self):
+        with patch.object(
+            async_openai_client.random, "uniform", side_effect=lambda a, b: b
+        ):
+            delays = [retry_delay(attempt) for attempt in range(8)]
+        self.assertEqual(delays, [1.0, 2.0, 4.0, 8.0, 16.0, 30.0, 30.0, 30.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+try:
+    from db_agent.agent.execute_tools_node import is_read_only_sql
+except ImportError:  # e.g. mcp, only needed by the database agent
+    is_read_only_sql = None
+
+
+@unittest.skipIf(
+    is_read_only_sql is None, "the database agent dependencies are not installed"
+)
+class TestIsReadOnlySql(unittest.TestCase):
+    def test_read_only_statements(self):
+        for query in [
+            "SELECT * FROM t",
+            "select a from t;",
+            "SHOW TABLES",
+            "DESCRIBE t",
+            "SELECT 1 -- a comment; DROP TABLE t",
+            "SELECT 1 # a comment",
+            "/* a comment */ SELECT 1",
+            "SELECT * FROM t WHERE a = 'x; DROP TABLE t' AND b = \"#\"",
+            "SELECT 'it''s', 'into' FROM `for update`",
+            "EXPLAIN DELETE FROM t",
+            "EXPLAIN ANALYZE SELECT * FROM t",
+            "EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM t",
+        ]:
+            with self.subTest(query=query):
+                self.assertTrue(is_read_only_sql(query))
+
+    def test_other_statements(self):
+        for query in [
+            "",
+            "DELETE FROM t",
+            "SELECT 1; DROP TABLE t",
+            "SELECT '#'; DROP TABLE t",
+            'SELECT "--"; DROP TABLE t',
+            "SELECT 'a\\'; DROP TABLE t; -- '",
+            "SELECT 5--1; DROP TABLE t",
+            "SELECT 1 /* unterminated",
+            "SELECT 'unterminated",
+            "/*!50000 DROP TABLE t */ SELECT 1",
+            "SELECT * FROM t FOR UPDATE",
+            "SELECT a INTO OUTFILE '/tmp/a' FROM t",
+            "EXPLAIN ANALYZE DELETE FROM t",
+            "EXPLAIN ANALYZE FORMAT=TREE UPDATE t SET a = 1",
+            "EXPLAIN (ANALYZE, BUFFERS) INSERT INTO t VALUES (1)",
+            "explain analyse explain analyze delete from t",
+        ]:
+            with self.subTest(query=query):
+                self.assertFalse(is_read_only_sql(query))
+
+
+if __name__ == "__main__":
+    unittest.main()
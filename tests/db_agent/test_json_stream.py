@@ -0,0 +1,63 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from db_agent.utils.json_stream import JsonStringFieldDecoder
+
+# escapes, a surrogate pair, a key with an escape and a nested object with a
+# field of the same name, which is not decoded
+TEXT = (
+    '{"sql": "SELECT \\"a\\\\b\\"\\n\\t\\u00e9 \\ud83d\\ude00 é 😀 /\\/", '
+    '"n": 1, "nested": {"sql": "no"}, "list": ["sql", "\\""], '
+    '"k\\u0065y": "caf\\u00e9 \\ud83d\\ude00"}'
+)
+
+
+def _decode(chunks: list[str], fields: list[str]) -> dict[str, str]:
+    decoder = JsonStringFieldDecoder(fields)
+    output: dict[str, str] = {}
+    for chunk in chunks:
+        for field, text in decoder.feed(chunk).items():
+            output[field] = output.get(field, "") + text
+    return output
+
+
+class TestJsonStringFieldDecoder(unittest.TestCase):
+    def setUp(self):
+        value = json.loads(TEXT)
+        self.expected = {"sql": value["sql"], "key": value["key"]}
+
+    def test_whole_text(self):
+        self.assertEqual(_decode([TEXT], ["sql", "key"]), self.expected)
+        self.assertEqual(_decode([TEXT], ["n", "nested"]), {})
+
+    def test_split_at_every_position(self):
+        for i in range(len(TEXT) + 1):
+            chunks = [TEXT[:i], TEXT[i:]]
+            with self.subTest(chunks=chunks):
+                self.assertEqual(_decode(chunks, ["sql", "key"]), self.expected)
+
+    def test_split_at_every_two_positions(self):
+        for i in range(len(TEXT) + 1):
+            for j in range(i, len(TEXT) + 1):
+                chunks = [TEXT[:i], TEXT[i:j], TEXT[j:]]
+                self.assertEqual(
+                    _decode(chunks, ["sql", "key"]), self.expected, msg=chunks
+                )
+
+    def test_one_character_at_a_time(self):
+        self.assertEqual(_decode(list(TEXT), ["sql", "key"]), self.expected)
+
+    def test_characters_are_returned_as_they_arrive(self):
+        decoder = JsonStringFieldDecoder(["sql"])
+        self.assertEqual(decoder.feed('{"sql": "SEL'), {"sql": "SEL"})
+        self.assertEqual(decoder.feed("ECT \\u00"), {"sql": "ECT "})
+        self.assertEqual(decoder.feed("e9 \\ud83d"), {"sql": "é "})
+        self.assertEqual(decoder.feed('\\ude00"}'), {"sql": "😀"})
+
+
+if __name__ == "__main__":
+    unittest.main()
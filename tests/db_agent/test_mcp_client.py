@@ -0,0 +1,177 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+try:
+    from db_agent.utils.mcp_client import PooledMCPClient
+except ImportError:  # e.g. fastmcp, only needed by the database agent
+    PooledMCPClient = None
+
+
+class _FakeServer:
+    """Creates the connections to a fake MCP server, and kills them."""
+
+    def __init__(self):
+        self.connections: list[_FakeConnection] = []
+        self.connect_error: Exception | None = None
+        # set to make connecting hang
+        self.connecting: asyncio.Event | None = None
+
+    def connect(self) -> "_FakeConnection":
+        connection = _FakeConnection(self)
+        self.connections.append(connection)
+        return connection
+
+    def kill(self) -> None:
+        for connection in self.connections:
+            connection.dead = True
+
+
+class _FakeConnection:
+    """Stands for an MCPClientBase, counting its requests."""
+
+    def __init__(self, server: _FakeServer):
+        self.server = server
+        self.connected = False
+        self.dead = False
+        self.closed = False
+        self.cancelled = False
+        self.pings = 0
+        self.calls: list[str] = []
+
+    async def __aenter__(self):
+        if self.server.connect_error is not None:
+            raise self.server.connect_error
+        if self.server.connecting is not None:
+            self.server.connecting.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+        self.connected = True
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.connected = False
+        self.closed = True
+
+    def _check(self) -> None:
+        if self.dead:
+            raise ConnectionError("the server went away")
+
+    async def ping(self) -> bool:
+        self.pings += 1
+        self._check()
+        return True
+
+    async def list_tools(self) -> list[str]:
+        self.calls.append("list_tools")
+        self._check()
+        return ["query"]
+
+    async def call_tool(self, tool_name: str, parameters: dict) -> str:
+        self.calls.append(tool_name)
+        self._check()
+        return "done"
+
+
+@unittest.skipIf(
+    PooledMCPClient is None, "the database agent dependencies are not installed"
+)
+class TestPooledMCPClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = _FakeServer()
+
+    def client(self, health_check_interval: float = 60.0) -> "PooledMCPClient":
+        client = PooledMCPClient(
+            self.server.connect,  # type: ignore[arg-type]
+            health_check_interval=health_check_interval,
+        )
+        self.addAsyncCleanup(client.close)
+        return client
+
+    async def test_healthy_connection_is_reused(self):
+        client = self.client()
+        self.assertEqual(await client.list_tools(), ["query"])
+        self.assertEqual(await client.call_tool("query", {}), "done")
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertEqual(self.server.connections[0].pings, 0)
+        self.assertTrue(client.connected)
+        self.assertFalse(client.busy)
+
+    async def test_idle_connection_is_pinged(self):
+        client = self.client(health_check_interval=0)
+        _ = await client.list_tools()
+        _ = await client.list_tools()
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertEqual(self.server.connections[0].pings, 1)
+
+    async def test_dead_connection_is_reopened_for_an_idempotent_request(self):
+        client = self.client()
+        _ = await client.list_tools()
+        self.server.kill()
+
+        self.assertEqual(await client.list_tools(), ["query"])
+        first, second = self.server.connections
+        self.assertTrue(first.closed)
+        self.assertEqual(first.calls, ["list_tools", "list_tools"])
+        self.assertEqual(second.calls, ["list_tools"])
+
+    async def test_tool_call_is_not_retried(self):
+        client = self.client()
+        _ = await client.list_tools()
+        self.server.kill()
+
+        with self.assertRaises(ConnectionError):
+            await client.call_tool("query", {"sql": "DELETE FROM t"})
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertFalse(client.connected)
+        # the next request opens a new connection
+        self.assertEqual(await client.call_tool("query", {}), "done")
+        self.assertEqual(self.server.connections[1].calls, ["query"])
+
+    async def test_error_of_a_live_connection_is_raised(self):
+        client = self.client()
+        _ = await client.list_tools()
+        connection = self.server.connections[0]
+
+        async def failing(tool_name: str, parameters: dict) -> str:
+            raise ValueError("unknown tool")
+
+        connection.call_tool = failing  # type: ignore[method-assign]
+        with self.assertRaises(ValueError):
+            await client.call_tool("nope", {})
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertTrue(client.connected)
+
+    async def test_failed_connect_is_raised(self):
+        client = self.client()
+        self.server.connect_error = ConnectionRefusedError("refused")
+        with self.assertRaises(ConnectionRefusedError):
+            await client.list_tools()
+        self.assertFalse(client.connected)
+
+        self.server.connect_error = None
+        self.assertEqual(await client.list_tools(), ["query"])
+
+    async def test_cancelled_connect_cancels_its_holder(self):
+        client = self.client()
+        self.server.connecting = asyncio.Event()
+        request = asyncio.create_task(client.list_tools())
+        await self.server.connecting.wait()
+
+        request.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await request
+        await asyncio.sleep(0)
+        self.assertTrue(self.server.connections[0].cancelled)
+        self.assertFalse(client.connected)
+        self.assertFalse(client.busy)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+try:
+    from mcp.types import Tool as MCPTool
+
+    from db_agent.agent.mcp_client_manager import MCPClientManager, MCPToolCatalog
+except ImportError:  # e.g. mcp, only needed by the database agent
+    MCPToolCatalog = None
+
+
+def _tool(name: str) -> "MCPTool":
+    return MCPTool(name=name, description=f"the {name} tool", inputSchema={})
+
+
+class _FakeClient:
+    """Returns the next tool list, once `release` is set."""
+
+    def __init__(self, tool_lists: list[list[str]]):
+        self.tool_lists = iter(tool_lists)
+        self.calls = 0
+        self.fetching = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def list_tools(self):
+        self.calls += 1
+        self.fetching.set()
+        await self.release.wait()
+        return [_tool(name) for name in next(self.tool_lists)]
+
+
+@unittest.skipIf(
+    MCPToolCatalog is None, "the database agent dependencies are not installed"
+)
+class TestMCPToolCatalog(unittest.IsolatedAsyncioTestCase):
+    async def test_tools_are_fetched_once(self):
+        client = _FakeClient([["query"]])
+        client.release.set()
+        catalog = MCPToolCatalog(client)  # type: ignore[arg-type]
+
+        tools, schemas = await catalog.get_tools()
+        await catalog.get_tools()
+
+        self.assertEqual([tool.name for tool in tools], ["query"])
+        self.assertEqual(schemas[0]["function"]["name"], "query")
+        self.assertEqual(client.calls, 1)
+
+    async def test_change_notified_during_a_fetch_is_fetched(self):
+        client = _FakeClient([["query"], ["query", "explain"]])
+        catalog = MCPToolCatalog(client)  # type: ignore[arg-type]
+
+        fetch = asyncio.create_task(catalog.get_tools())
+        await client.fetching.wait()
+        # the server changed its tools after it started listing them
+        catalog.invalidate()
+        client.release.set()
+        await fetch
+
+        self.assertEqual(client.calls, 2)
+        self.assertFalse(catalog.outdated)
+        tools, _ = await catalog.get_tools()
+        self.assertEqual([tool.name for tool in tools], ["query", "explain"])
+        self.assertEqual(client.calls, 2)
+
+
+class _FakeConnection:
+    """Stands for the MCPClientBase of a server, whose list_tools waits for `release`."""
+
+    def __init__(self):
+        self.connected = False
+        self.closed = False
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __aenter__(self):
+        self.connected = True
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.connected = False
+        self.closed = True
+
+    async def ping(self) -> bool:
+        return True
+
+    async def list_tools(self):
+        await self.release.wait()
+        return [_tool("query")]
+
+
+@unittest.skipIf(
+    MCPToolCatalog is None, "the database agent dependencies are not installed"
+)
+class TestMCPClientManager(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.manager = MCPClientManager(max_clients=2, idle_timeout=60.0)
+        self.addAsyncCleanup(self.manager.close)
+        # a server per provider, with a connection per server
+        self.connections: dict[str, _FakeConnection] = {}
+        self.manager.get_server_config = lambda provider: {  # type: ignore[method-assign]
+            "transport": "sse",
+            "url": provider,
+        }
+
+        def create_client(server_config, message_handler=None):
+            connection = _FakeConnection()
+            self.connections[server_config["url"]] = connection
+            return connection
+
+        self.manager.create_client = create_client  # type: ignore[method-assign]
+
+    async def connect(self, provider: str):
+        client = await self.manager.get_client(provider)
+        _ = await client.list_tools()
+        return client
+
+    def providers(self) -> list[str]:
+        return [json.loads(key)["url"] for key in self.manager.clients]
+
+    async def test_least_recently_used_connection_is_closed(self):
+        for provider in ["a", "b", "c"]:
+            _ = await self.connect(provider)
+        self.assertEqual(self.providers(), ["b", "c"])
+        self.assertTrue(self.connections["a"].closed)
+
+        _ = await self.manager.get_client("b")
+        _ = await self.connect("d")
+        self.assertEqual(self.providers(), ["b", "d"])
+        self.assertTrue(self.connections["c"].closed)
+        self.assertFalse(self.connections["b"].closed)
+
+    async def test_busy_connections_are_kept(self):
+        _ = await self.connect("a")
+        self.connections["a"].release.clear()
+        client = await self.manager.get_client("a")
+        request = asyncio.create_task(client.list_tools())
+        await asyncio.sleep(0)
+
+        _ = await self.connect("b")
+        _ = await self.connect("c")
+        self.assertEqual(self.providers(), ["a", "c"])
+        self.connections["a"].release.set()
+        self.assertEqual([tool.name for tool in await request], ["query"])
+
+    async def test_tool_catalog_outlives_its_connection(self):
+        catalog = await self.manager.get_tool_catalog("a")
+        _ = await self.connect("b")
+        _ = await self.connect("c")
+        self.assertNotIn("a", self.providers())
+
+        self.assertIs(await self.manager.get_tool_catalog("a"), catalog)
+        self.assertIs(catalog.client, await self.manager.get_client("a"))
+
+    async def test_idle_connections_are_closed(self):
+        idle = await self.connect("a")
+        _ = await self.connect("b")
+        idle.last_used = time.monotonic() - 61
+
+        await self.manager.evict_idle()
+        self.assertEqual(self.providers(), ["b"])
+        self.assertTrue(self.connections["a"].closed)
+
+        # unless a request is using them
+        busy = await self.manager.get_client("b")
+        self.connections["b"].release.clear()
+        request = asyncio.create_task(busy.list_tools())
+        await asyncio.sleep(0)
+        busy.last_used = time.monotonic() - 61
+        await self.manager.evict_idle()
+        self.assertEqual(self.providers(), ["b"])
+        self.connections["b"].release.set()
+        _ = await request
+
+
+if __name__ == "__main__":
+    unittest.main()
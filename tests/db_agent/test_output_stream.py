@@ -0,0 +1,145 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+try:
+    from db_agent.utils.output_stream import (
+        MessageType,
+        OutputMessage,
+        WebSocketOutputStream,
+    )
+except ImportError:  # e.g. fastapi, only needed by the database agent
+    WebSocketOutputStream = None
+
+
+class _FakeWebSocket:
+    """Records the frames sent, each once `open` is set."""
+
+    def __init__(self):
+        self.frames: list[tuple[str, str]] = []
+        self.open = asyncio.Event()
+        self.open.set()
+
+    async def send_json(self, data: dict) -> None:
+        await self.open.wait()
+        self.frames.append((data["type"].value, data["content"]))
+
+
+@unittest.skipIf(
+    WebSocketOutputStream is None, "the database agent dependencies are not installed"
+)
+class TestWebSocketOutputStream(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.websocket = _FakeWebSocket()
+
+    def stream(self, **kwargs) -> "WebSocketOutputStream":
+        stream = WebSocketOutputStream(self.websocket, **kwargs)  # type: ignore[arg-type]
+        self.addAsyncCleanup(stream.close)
+        return stream
+
+    async def test_chunks_are_sent_as_one_frame(self):
+        stream = self.stream(flush_interval=0.05)
+        await stream.start_chunk()
+        for text in ["SEL", "ECT ", "", "1"]:
+            await stream.send_chunk(text)
+        await stream.end_chunk()
+        await stream.send_text("done")
+        await stream.flush()
+        self.assertEqual(
+            self.websocket.frames,
+            [
+                ("start", ""),
+                ("chunk", "SELECT 1"),
+                ("end", ""),
+                ("start", ""),
+                ("chunk", "done"),
+                ("end", ""),
+            ],
+        )
+
+    async def test_chunks_are_sent_after_the_flush_interval(self):
+        stream = self.stream(flush_interval=0.01)
+        await stream.send_chunk("a")
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.websocket.frames, [("chunk", "a")])
+        await stream.send_chunk("b")
+        await stream.send_chunk("c")
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.websocket.frames, [("chunk", "a"), ("chunk", "bc")])
+
+    async def test_large_chunks_are_sent_at_once(self):
+        stream = self.stream(flush_interval=10, max_chunk_bytes=4)
+        await stream.send_chunk("ab")
+        await stream.send_chunk("éé")
+        await stream.send_chunk("c")
+        await stream.flush()
+        self.assertEqual(self.websocket.frames, [("chunk", "abéé"), ("chunk", "c")])
+
+    async def test_queued_status_is_replaced(self):
+        stream = self.stream()
+        self.websocket.open.clear()
+        await stream.send_message(OutputMessage(MessageType.TEXT, "first"))
+        await asyncio.sleep(0)
+        # the first frame is being sent, the statuses wait behind it
+        await stream.update_status("Waiting")
+        await stream.update_status("Running")
+        await stream.send_message(OutputMessage(MessageType.TEXT, "second"))
+        await stream.update_status("Done")
+        self.websocket.open.set()
+        await stream.flush()
+        self.assertEqual(
+            self.websocket.frames,
+            [
+                ("text", "first"),
+                ("status", "Running"),
+                ("text", "second"),
+                ("status", "Done"),
+            ],
+        )
+
+    async def test_producers_wait_for_a_slow_client(self):
+        stream = self.stream(max_queued_frames=2)
+        self.websocket.open.clear()
+        for i in range(3):
+            await stream.send_message(OutputMessage(MessageType.TEXT, str(i)))
+        await asyncio.sleep(0)
+        # one frame is being sent and two are queued
+        producer = asyncio.create_task(
+            stream.send_message(OutputMessage(MessageType.TEXT, "3"))
+        )
+        await asyncio.sleep(0.01)
+        self.assertFalse(producer.done())
+        # a status does not wait, it is dropped
+        await stream.update_status("Running")
+
+        self.websocket.open.set()
+        await producer
+        await stream.flush()
+        self.assertEqual(self.websocket.frames, [("text", str(i)) for i in range(4)])
+
+    async def test_close_wakes_up_waiting_producers(self):
+        stream = self.stream(max_queued_frames=1)
+        self.websocket.open.clear()
+        for i in range(2):
+            await stream.send_message(OutputMessage(MessageType.TEXT, str(i)))
+        await asyncio.sleep(0)
+        producer = asyncio.create_task(
+            stream.send_message(OutputMessage(MessageType.TEXT, "2"))
+        )
+        flush = asyncio.create_task(stream.flush())
+        await asyncio.sleep(0.01)
+        self.assertFalse(producer.done())
+
+        await stream.close()
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(producer, timeout=1)
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(flush, timeout=1)
+        self.assertEqual(self.websocket.frames, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
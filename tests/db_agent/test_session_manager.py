@@ -0,0 +1,168 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from db_agent.agent.session_manager import Conversation, Session, SessionManager
+
+
+class _Run:
+    """A conversation that runs until `finish` is set, recording its progress."""
+
+    def __init__(self, error: Exception | None = None):
+        self.error = error
+        self.started = False
+        self.finish = asyncio.Event()
+        self.waited = False
+        self.errors: list[BaseException] = []
+
+    async def __call__(self) -> None:
+        self.started = True
+        await self.finish.wait()
+        if self.error is not None:
+            raise self.error
+
+    async def on_waiting(self) -> None:
+        self.waited = True
+
+    async def on_error(self, error: BaseException) -> None:
+        self.errors.append(error)
+
+
+class TestStartConversation(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.manager = SessionManager(max_running_conversations=2)
+        self.session = self.manager.new_session()
+
+    def start(self, run: _Run) -> asyncio.Task:
+        return self.manager.start_conversation(
+            self.session,
+            self.session.newConversation(),
+            run,
+            on_waiting=run.on_waiting,
+            on_error=run.on_error,
+        )
+
+    async def test_running_conversations_are_limited(self):
+        runs = [_Run() for _ in range(3)]
+        tasks = [self.start(run) for run in runs]
+        await asyncio.sleep(0.01)
+        self.assertEqual([run.started for run in runs], [True, True, False])
+        self.assertEqual([run.waited for run in runs], [False, False, True])
+        self.assertEqual(len(self.session.tasks), 3)
+
+        runs[0].finish.set()
+        await tasks[0]
+        await asyncio.sleep(0.01)
+        self.assertTrue(runs[2].started)
+
+        for run in runs[1:]:
+            run.finish.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual([run.errors for run in runs], [[], [], []])
+
+    async def test_cancelled_conversation_is_reported(self):
+        run = _Run()
+        task = self.start(run)
+        await asyncio.sleep(0)
+        self.assertTrue(self.session.running)
+
+        self.assertTrue(self.session.cancel())
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(len(run.errors), 1)
+        self.assertIsInstance(run.errors[0], asyncio.CancelledError)
+        self.assertFalse(self.session.cancel())
+
+    async def test_failed_conversation_is_reported(self):
+        run = _Run(error=ValueError("boom"))
+        run.finish.set()
+        task = self.start(run)
+        # reported, not raised
+        self.assertIsNone(await task)
+        self.assertEqual([str(error) for error in run.errors], ["boom"])
+
+    async def test_finished_conversations_are_forgotten(self):
+        run = _Run()
+        task = self.start(run)
+        self.assertEqual(list(self.session.tasks.values()), [task])
+
+        run.finish.set()
+        await task
+        await asyncio.sleep(0)
+        self.assertEqual(self.session.tasks, {})
+        self.assertFalse(self.session.running)
+        self.assertEqual(self.manager.metrics()["running_conversations"], 0)
+
+
+class TestSessionEviction(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.manager = SessionManager(
+            max_sessions=3, session_ttl=10.0, max_conversations_per_session=2
+        )
+        self.runs: list[_Run] = []
+
+    async def asyncTearDown(self):
+        for run in self.runs:
+            run.finish.set()
+        await asyncio.sleep(0)
+
+    def start(self, session: Session) -> Conversation:
+        run = _Run()
+        self.runs.append(run)
+        conversation = session.newConversation()
+        _ = self.manager.start_conversation(session, conversation, run)
+        return conversation
+
+    async def test_least_recently_used_idle_session_is_evicted(self):
+        sessions = [self.manager.new_session() for _ in range(3)]
+        _ = self.start(sessions[0])
+        self.manager.touch(sessions[1])
+
+        new = self.manager.new_session()
+        # sessions[0] is the oldest, but it is running
+        self.assertEqual(
+            list(self.manager.sessions), [sessions[0].id, sessions[1].id, new.id]
+        )
+        self.assertEqual(self.manager.evicted_sessions, 1)
+
+    async def test_expired_idle_sessions_are_evicted(self):
+        sessions = [self.manager.new_session() for _ in range(3)]
+        _ = self.start(sessions[1])
+        for session in sessions[:2]:
+            session.last_active = time.monotonic() - 11
+        self.assertEqual(self.manager.evict_expired(), 1)
+        self.assertCountEqual(self.manager.sessions, [sessions[1].id, sessions[2].id])
+
+    async def test_running_conversations_are_kept(self):
+        session = self.manager.new_session()
+        running = self.start(session)
+        conversations = [session.newConversation() for _ in range(3)]
+        self.assertEqual(
+            list(session.conversations), [running.id, conversations[-1].id]
+        )
+        self.assertIs(session.last_conversation, conversations[-1])
+
+    async def test_metrics(self):
+        sessions = [self.manager.new_session() for _ in range(4)]
+        _ = self.start(sessions[1])
+        idle = sessions[2].newConversation()
+        self.assertEqual(
+            self.manager.metrics(),
+            {
+                "live_sessions": 3,
+                "conversations": 2,
+                "running_conversations": 1,
+                "bytes_held": 0,
+                "evicted_sessions": 1,
+            },
+        )
+        idle.context["chat_history"] = [{"role": "user", "content": "hi"}]
+        self.assertGreater(self.manager.metrics()["bytes_held"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,21 @@
 import os
 import sys
+import tempfile
 import unittest
+from pathlib import Path
+from unittest.mock import patch
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
 from trae_agent.tools.base import ToolCallArguments
-from trae_agent.tools.bash_tool import BashTool
+from trae_agent.tools.bash_tool import (
+    BashResultCache,
+    BashTool,
+    _BashSession,
+    is_read_only_command,
+)
+from trae_agent.tools.edit_tool import TextEditorTool
+from trae_agent.tools.run import TRUNCATED_MESSAGE
 
 
 class TestBashTool(unittest.IsolatedAsyncioTestCase):
@@ -67,11 +77,189 @@ class TestBashTool(unittest.IsolatedAsyncioTestCase):
         self.assertIn("hello world", result.output)
         self.assertEqual(result.error, "")
 
+    async def test_exit_status_is_captured(self):
+        result = await self.tool.execute(
+            ToolCallArguments({"command": "exit_with() { return $1; }; exit_with 3"})
+        )
+        self.assertEqual(result.error_code, 3)
+
+        result = await self.tool.execute(ToolCallArguments({"command": "true"}))
+        self.assertEqual(result.error_code, 0)
+
+    async def test_output_without_trailing_newline(self):
+        result = await self.tool.execute(ToolCallArguments({"command": "printf abc"}))
+        self.assertEqual(result.output, "abc")
+
+    async def test_trailing_comment_and_heredoc(self):
+        result = await self.tool.execute(
+            ToolCallArguments({"command": "cat <<EOF\nline1\nline2\nEOF\n# a comment"})
+        )
+        self.assertEqual(result.output, "line1\nline2")
+        self.assertEqual(result.error_code, 0)
+
+    async def test_large_output_keeps_head_and_tail(self):
+        result = await self.tool.execute(ToolCallArguments({"command": "seq 1 200000"}))
+        self.assertEqual(result.error_code, 0)
+        self.assertTrue(result.output.startswith("1\n2\n3\n"))
+        self.assertTrue(result.output.endswith("199999\n200000"))
+        self.assertIn(TRUNCATED_MESSAGE, result.output)
+        self.assertIn("200000 lines", result.output)
+        self.assertLess(len(result.output), 20000)
+
+        # the session is still usable after a truncated command
+        result = await self.tool.execute(ToolCallArguments({"command": "echo done"}))
+        self.assertEqual(result.output, "done")
+
+    async def test_stderr_is_separated(self):
+        result = await self.tool.execute(
+            ToolCallArguments({"command": "echo out; echo err >&2"})
+        )
+        self.assertEqual(result.output, "out")
+        self.assertEqual(result.error, "err")
+
+    async def test_timed_out_command_is_killed(self):
+        with patch.object(_BashSession, "_timeout", 0.3):
+            result = await self.tool.execute(
+                ToolCallArguments({"command": "cd /tmp; sleep 30"})
+            )
+        self.assertIn("timed out", result.error)
+        self.assertEqual(result.error_code, -1)
+
+        # the next command runs in a new shell, without a restart
+        result = await self.tool.execute(ToolCallArguments({"command": "echo hi"}))
+        self.assertEqual(result.output, "hi")
+        self.assertEqual(result.error_code, 0)
+
     async def test_missing_command_handling(self):
         result = await self.tool.execute(ToolCallArguments({}))
         self.assertIn("no command provided", result.error.lower())
         self.assertEqual(result.error_code, -1)
 
 
+class TestBashResultCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tool = BashTool()
+        self.cache = BashResultCache()
+        self.tool.result_cache = self.cache
+        self.dir = tempfile.TemporaryDirectory()
+        self.file = Path(self.dir.name) / "a.txt"
+        self.write(self.file, "one\n")
+        os.utime(self.dir.name, ns=(1_000_000_000, 1_000_000_000))
+
+    def write(self, path: Path, content: str) -> None:
+        _ = path.write_text(content)
+        # not modified just now, so its results may be kept
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+    async def asyncTearDown(self):
+        if self.tool._session:
+            self.tool._session.stop()
+        self.dir.cleanup()
+
+    async def run_command(self, command: str) -> str:
+        result = await self.tool.execute(ToolCallArguments({"command": command}))
+        return result.output or ""
+
+    def test_read_only_commands(self):
+        for command in [
+            "grep -rn foo /testbed",
+            "find . -name '*.py' | head -20",
+            "cat a.py 2>/dev/null && ls -la",
+            "sed -n 10,25p a.py",
+            "git diff HEAD",
+        ]:
+            self.assertTrue(is_read_only_command(command), command)
+        for command in [
+            "grep foo a.py > out",
+            "find . -name '*.pyc' -delete",
+            "cat $(ls)",
+            "cat a.py\nrm a.py",
+            "sed -i s/a/b/ a.py",
+            "cd /tmp",
+            "git checkout .",
+        ]:
+            self.assertFalse(is_read_only_command(command), command)
+
+    def test_commands_whose_output_changes_are_not_read_only(self):
+        for command in [
+            "date",
+            "head -c 16 /dev/urandom",
+            "tail -f log",
+            "tail -n 20 -F log",
+            "tail -20f log",
+            "tail --follow=name log",
+            "cat /proc/meminfo",
+            "ls /sys",
+            "grep -r foo . --exclude-dir=/proc",
+        ]:
+            self.assertFalse(is_read_only_command(command), command)
+        for command in ["tail -n 20 log", "cat /device.txt", "ls /system"]:
+            self.assertTrue(is_read_only_command(command), command)
+
+    async def test_results_are_reused_until_a_write(self):
+        _ = await self.run_command(f"cd {self.dir.name}")
+        self.assertEqual(await self.run_command("cat a.txt"), "one")
+        self.assertEqual(await self.run_command("cat a.txt"), "one")
+        self.assertEqual(self.cache.hits, 1)
+
+        _ = await self.run_command("echo two >> a.txt")
+        self.assertEqual(self.cache.invalidations, 1)
+        self.assertEqual(await self.run_command("cat a.txt"), "one\ntwo")
+
+    async def test_changed_files_are_read_again(self):
+        _ = await self.run_command(f"cd {self.dir.name}")
+        for command in ["cat a.txt", "cat *.txt", f"ls -l {self.dir.name}"]:
+            self.write(self.file, "one\n")
+            before = await self.run_command(command)
+            self.assertEqual(await self.run_command(command), before)
+            # written behind the back of the tools, e.g. by a background job
+            self.write(self.file, f"changed by {command}\n")
+            self.assertNotEqual(await self.run_command(command), before, command)
+        self.assertEqual(self.cache.hits, 3)
+
+        # a new file matching a pattern
+        self.write(self.file, "one\n")
+        _ = await self.run_command("cat *.txt")
+        self.write(Path(self.dir.name) / "b.txt", "two\n")
+        self.assertEqual(await self.run_command("cat *.txt"), "one\ntwo")
+
+    async def test_results_that_may_change_unnoticed_are_not_kept(self):
+        _ = await self.run_command(f"cd {self.dir.name}")
+        for command in ["grep -rn one .", "ls -R", "git status"]:
+            _ = await self.run_command(command)
+            _ = await self.run_command(command)
+        # modified too recently for a change of the same size to be noticed
+        _ = self.file.write_text("new\n")
+        _ = await self.run_command("cat a.txt")
+        _ = self.file.write_text("old\n")
+        self.assertEqual(await self.run_command("cat a.txt"), "old")
+        self.assertEqual(self.cache.hits, 0)
+
+    async def test_results_are_not_reused_after_an_edit(self):
+        editor = TextEditorTool()
+        editor.write_listeners.append(self.cache.invalidate)
+        command = f"cat {self.file}"
+        _ = await self.run_command(command)
+        _ = await editor.execute(
+            ToolCallArguments(
+                {
+                    "command": "str_replace",
+                    "path": str(self.file),
+                    "old_str": "one",
+                    "new_str": "edited",
+                }
+            )
+        )
+        self.assertEqual(await self.run_command(command), "edited")
+        self.assertEqual(self.cache.stats()["hits"], 0)
+
+    async def test_results_are_not_reused_when_a_named_path_changed(self):
+        command = f"cat {self.file}"
+        _ = await self.run_command(command)
+        # written behind the back of the tools
+        _ = self.file.write_text("changed size\n")
+        self.assertEqual(await self.run_command(command), "changed size")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
@@ -7,8 +8,9 @@ import unittest
 from pathlib import Path
 from unittest.mock import patch
 
-from trae_agent.tools.base import ToolCallArguments, ToolError
+from trae_agent.tools.base import ToolCallArguments, ToolError, ToolExecResult
 from trae_agent.tools.edit_tool import TextEditorTool
+from trae_agent.tools.file_cache import CachedFile
 
 
 class TestTextEditorTool(unittest.IsolatedAsyncioTestCase):
@@ -36,6 +38,11 @@ class TestTextEditorTool(unittest.IsolatedAsyncioTestCase):
         self.mock_write = patcher.start()
         self.addCleanup(patcher.stop)
 
+        # files are written to a temporary file renamed over them
+        patcher = patch("pathlib.Path.replace")
+        self.mock_replace = patcher.start()
+        self.addCleanup(patcher.stop)
+
     async def test_create_file(self):
         self.mock_file_system(exists=False)
         result = await self.tool.execute(
@@ -131,5 +138,330 @@ class TestTextEditorTool(unittest.IsolatedAsyncioTestCase):
         self.assertIn("No path provided", result.error)
 
 
+class TestFileCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tool = TextEditorTool()
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.file = Path(self.dir.name) / "file.py"
+        self.write("a\n\tb\nc\nd")
+
+    def write(self, content: str, mtime: int = 1_000_000_000):
+        _ = self.file.write_text(content)
+        # an old mtime, recently modified files are not cached
+        os.utime(self.file, ns=(mtime, mtime))
+
+    async def view(self, view_range: list[int] | None = None) -> str:
+        arguments = {"command": "view", "path": str(self.file)}
+        if view_range is not None:
+            arguments["view_range"] = view_range
+        result = await self.tool.execute(ToolCallArguments(arguments))
+        return result.output or ""
+
+    def test_lines(self):
+        for content in ["", "a", "a\n", "a\nb\n\nc", "\n\n"]:
+            file = CachedFile(content)
+            lines = content.split("\n")
+            self.assertEqual(file.num_lines, len(lines))
+            for first in range(1, len(lines) + 1):
+                self.assertEqual(file.lines(first), "\n".join(lines[first - 1 :]))
+                for last in range(first, len(lines) + 1):
+                    self.assertEqual(
+                        file.lines(first, last), "\n".join(lines[first - 1 : last])
+                    )
+
+    async def test_unchanged_file_is_read_once(self):
+        with patch.object(
+            Path, "read_text", autospec=True, side_effect=Path.read_text
+        ) as read:
+            first = await self.view()
+            self.assertEqual(await self.view(), first)
+            self.assertRegex(await self.view([2, 3]), r":\n\s+2\t        b\n\s+3\tc\n$")
+            self.assertEqual(read.call_count, 1)
+
+    async def test_changed_file_is_read_again(self):
+        _ = await self.view()
+        self.write("a\nb\nc\nd", mtime=2_000_000_000)
+        self.assertIn("     2\tb\n", await self.view())
+
+    async def test_written_content_is_cached(self):
+        _ = await self.tool.execute(
+            ToolCallArguments(
+                {
+                    "command": "str_replace",
+                    "path": str(self.file),
+                    "old_str": "c",
+                    "new_str": "replaced",
+                }
+            )
+        )
+        with patch.object(
+            Path, "read_text", autospec=True, side_effect=Path.read_text
+        ) as read:
+            self.assertIn("     3\treplaced\n", await self.view())
+            self.assertEqual(read.call_count, 0)
+        self.assertEqual(self.file.read_text(), "a\n        b\nreplaced\nd")
+
+
+class TestLargeFile(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tool = TextEditorTool()
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.file = Path(self.dir.name) / "large.log"
+        _ = self.file.write_bytes(
+            "".join(f"line {i} ü\n" for i in range(1, 1001)).encode()
+        )
+        os.utime(self.file, ns=(1_000_000_000, 1_000_000_000))
+        # every file is large
+        patcher = patch("trae_agent.tools.edit_tool.LARGE_FILE_BYTES", 1)
+        _ = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def execute(self, **arguments) -> ToolExecResult:
+        return await self.tool.execute(
+            ToolCallArguments({"path": str(self.file), **arguments})
+        )
+
+    async def test_view_range_is_not_read(self):
+        with patch.object(Path, "read_text") as read:
+            result = await self.execute(command="view", view_range=[500, 502])
+            read.assert_not_called()
+        self.assertRegex(
+            result.output,
+            r":\n\s+500\tline 500 ü\n\s+501\tline 501 ü\n\s+502\tline 502 ü\n$",
+        )
+        result = await self.execute(command="view", view_range=[1000, -1])
+        self.assertRegex(result.output, r"\s+1000\tline 1000 ü\n\s+1001\t\n$")
+        result = await self.execute(command="view", view_range=[1, 1002])
+        self.assertIn("`1001`", result.error)
+
+    async def test_windows_line_endings(self):
+        _ = self.file.write_bytes(b"a\r\nb\r\nc")
+        result = await self.execute(command="view", view_range=[2, 3])
+        self.assertRegex(result.output, r":\n\s+2\tb\n\s+3\tc\n$")
+
+    async def test_occurrences_are_reported_with_their_lines(self):
+        result = await self.execute(
+            command="str_replace", old_str="99 ü\nline", new_str="x"
+        )
+        self.assertIn(f"lines {list(range(99, 1000, 100))}", result.error)
+        result = await self.execute(
+            command="str_replace", old_str="absent", new_str="x"
+        )
+        self.assertIn("did not appear verbatim", result.error)
+
+        result = await self.execute(
+            command="str_replace", old_str="line 999 ü", new_str="replaced"
+        )
+        self.assertIn("has been edited", result.output)
+        self.assertIn("replaced\n", self.file.read_text())
+
+    async def test_cached_content_is_not_checked_again(self):
+        result = await self.execute(
+            command="str_replace", old_str="line 999 ü", new_str="replaced"
+        )
+        self.assertIn("has been edited", result.output)
+        # the written content is cached, the file is neither mapped nor read
+        with (
+            patch.object(TextEditorTool, "map_large_file") as map_large_file,
+            patch.object(Path, "read_text") as read,
+        ):
+            result = await self.execute(
+                command="str_replace", old_str="line 998 ü", new_str="again"
+            )
+            map_large_file.assert_not_called()
+            read.assert_not_called()
+        self.assertIn("has been edited", result.output)
+        self.assertIn("again\nreplaced\n", self.file.read_text())
+
+
+class TestMultiEdit(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tool = TextEditorTool()
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.first = Path(self.dir.name) / "first.py"
+        self.second = Path(self.dir.name) / "second.py"
+        _ = self.first.write_text("".join(f"x{i} = {i}\n" for i in range(30)))
+        _ = self.second.write_text("def f():\n    return 1\n")
+
+    async def multi_edit(self, edits: list[dict[str, str]]) -> ToolExecResult:
+        return await self.tool.execute(
+            ToolCallArguments(
+                {"command": "multi_edit", "path": str(self.first), "edits": edits}
+            )
+        )
+
+    async def test_edits_are_applied_in_order(self):
+        result = await self.multi_edit(
+            [
+                {"old_str": "x2 = 2", "new_str": "x2 = 20"},
+                {"old_str": "x2 = 20\nx3", "new_str": "x2 = 200\nx3"},
+                {"old_str": "x25 = 25", "new_str": "x25 = 25\nx25b = 26"},
+                {
+                    "path": str(self.second),
+                    "old_str": "return 1",
+                    "new_str": "return 2",
+                },
+            ]
+        )
+        self.assertEqual(result.error_code, 0, result.error)
+        first = self.first.read_text().split("\n")
+        self.assertEqual(first[2], "x2 = 200")
+        self.assertEqual(first[25:27], ["x25 = 25", "x25b = 26"])
+        self.assertEqual(self.second.read_text(), "def f():\n    return 2\n")
+        # one snippet per group of nearby edits
+        self.assertEqual(result.output.count("a snippet of"), 3)
+        self.assertRegex(result.output, r"\s+3\tx2 = 200\n")
+        self.assertRegex(result.output, r"\s+27\tx25b = 26\n")
+
+    async def test_nothing_is_written_if_an_edit_fails(self):
+        for old_str in ["missing", "x1"]:
+            result = await self.multi_edit(
+                [
+                    {"path": str(self.second), "old_str": "return 1", "new_str": "x"},
+                    {"old_str": old_str, "new_str": "y"},
+                ]
+            )
+            self.assertIn("No edit was performed", result.error)
+            self.assertIn("edit 2", result.error)
+            self.assertEqual(self.second.read_text(), "def f():\n    return 1\n")
+
+    async def test_edits_of_a_file_reached_by_several_paths(self):
+        link = Path(self.dir.name) / "link.py"
+        link.symlink_to(self.first)
+        (Path(self.dir.name) / "sub").mkdir()
+        result = await self.multi_edit(
+            [
+                {"old_str": "x1 = 1", "new_str": "x1 = 10"},
+                {"path": str(link), "old_str": "x2 = 2", "new_str": "x2 = 20"},
+                {
+                    "path": f"{self.dir.name}/sub/../first.py",
+                    "old_str": "x3 = 3",
+                    "new_str": "x3 = 30",
+                },
+            ]
+        )
+        self.assertEqual(result.error_code, 0, result.error)
+        self.assertEqual(
+            self.first.read_text().split("\n")[1:4], ["x1 = 10", "x2 = 20", "x3 = 30"]
+        )
+        self.assertTrue(link.is_symlink())
+
+    async def test_written_files_are_restored_if_a_write_fails(self):
+        original = self.first.read_text()
+        write_file = self.tool.write_file
+
+        def failing_write(path: Path, file: str):
+            if path == self.second:
+                raise ToolError("disk full")
+            write_file(path, file)
+
+        with patch.object(self.tool, "write_file", side_effect=failing_write):
+            result = await self.multi_edit(
+                [
+                    {"old_str": "x1 = 1", "new_str": "x1 = 10"},
+                    {"path": str(self.second), "old_str": "return 1", "new_str": "x"},
+                ]
+            )
+        self.assertIn("disk full. No file was changed.", result.error)
+        self.assertEqual(self.first.read_text(), original)
+
+
+class TestAtomicWrite(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tool = TextEditorTool()
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.file = Path(self.dir.name) / "file.py"
+        _ = self.file.write_text("a = 1\n")
+        self.file.chmod(0o750)
+
+    async def execute(self, arguments: dict[str, object]) -> ToolExecResult:
+        return await self.tool.execute(ToolCallArguments(arguments))
+
+    async def str_replace(self, old_str: str, new_str: str) -> ToolExecResult:
+        return await self.execute(
+            {
+                "command": "str_replace",
+                "path": str(self.file),
+                "old_str": old_str,
+                "new_str": new_str,
+            }
+        )
+
+    async def test_file_is_replaced(self):
+        inode = self.file.stat().st_ino
+        result = await self.str_replace("a = 1", "a = 2")
+        self.assertEqual(result.error_code, 0, result.error)
+        self.assertEqual(self.file.read_text(), "a = 2\n")
+        self.assertNotEqual(self.file.stat().st_ino, inode)
+        self.assertEqual(self.file.stat().st_mode & 0o777, 0o750)
+        self.assertEqual(os.listdir(self.dir.name), ["file.py"])
+
+    async def test_failed_write_keeps_the_file(self):
+        with patch("pathlib.Path.replace", side_effect=OSError("disk full")):
+            result = await self.str_replace("a = 1", "a = 2")
+        self.assertIn("disk full", result.error)
+        self.assertEqual(self.file.read_text(), "a = 1\n")
+        self.assertEqual(os.listdir(self.dir.name), ["file.py"])
+
+    async def test_symlink_is_kept(self):
+        link = Path(self.dir.name) / "link.py"
+        link.symlink_to(self.file)
+        self.tool.write_file(link, "a = 2\n")
+        self.assertTrue(link.is_symlink())
+        self.assertEqual(self.file.read_text(), "a = 2\n")
+
+    async def test_fsync_is_deferred_to_the_end_of_the_step(self):
+        with patch("os.fsync") as fsync:
+            _ = await self.str_replace("a = 1", "a = 2")
+            self.assertFalse(fsync.called)
+            self.tool.end_step()
+            # the file and its directory
+            self.assertEqual(fsync.call_count, 2)
+            self.tool.end_step()
+            self.assertEqual(fsync.call_count, 2)
+
+        self.tool.defer_fsync = False
+        with patch("os.fsync") as fsync:
+            _ = await self.str_replace("a = 2", "a = 3")
+            self.assertEqual(fsync.call_count, 2)
+
+    async def test_undo_reverts_the_last_step(self):
+        new_file = Path(self.dir.name) / "new.py"
+        _ = await self.str_replace("a = 1", "a = 2")
+        self.tool.end_step()
+        _ = await self.str_replace("a = 2", "a = 3")
+        _ = await self.str_replace("a = 3", "a = 4")
+        _ = await self.execute(
+            {"command": "create", "path": str(new_file), "file_text": "b = 1\n"}
+        )
+        self.tool.end_step()
+        self.assertEqual(self.tool.read_file(self.file), "a = 4\n")
+
+        result = await self.execute({"command": "undo_edit", "path": str(self.file)})
+        self.assertEqual(result.error_code, 0, result.error)
+        self.assertEqual(self.tool.read_file(self.file), "a = 2\n")
+        self.assertFalse(new_file.exists())
+
+        _ = await self.execute({"command": "undo_edit", "path": str(self.file)})
+        self.assertEqual(self.file.read_text(), "a = 1\n")
+        self.assertEqual(self.file.stat().st_mode & 0o777, 0o750)
+
+        result = await self.execute({"command": "undo_edit", "path": str(self.file)})
+        self.assertEqual(result.error, "There are no edits to undo.")
+
+    async def test_undo_is_limited_to_the_last_steps(self):
+        self.tool.undo_journal.max_steps = 2
+        for i in range(1, 5):
+            _ = await self.str_replace(f"a = {i}", f"a = {i + 1}")
+            self.tool.end_step()
+        for _ in range(3):
+            _ = await self.execute({"command": "undo_edit", "path": str(self.file)})
+        self.assertEqual(self.file.read_text(), "a = 3\n")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from trae_agent.tools.run import TRUNCATED_MESSAGE, OutputCapture, maybe_truncate, run
+
+
+class TestOutputCapture(unittest.TestCase):
+    def _capture(self, data: bytes, head_size: int, tail_size: int = 0, chunk: int = 7):
+        capture = OutputCapture(head_size, tail_size)
+        for i in range(0, len(data), chunk):
+            capture.write(data[i : i + chunk])
+        return capture
+
+    def test_short_output_is_unchanged(self):
+        capture = self._capture(b"hello\nworld\n", head_size=100, tail_size=10)
+        self.assertEqual(capture.getvalue(), "hello\nworld\n")
+        self.assertEqual(capture.total_bytes, 12)
+        self.assertEqual(capture.total_lines, 2)
+
+    def test_head_only_matches_maybe_truncate(self):
+        for text in ["x" * 50, "x" * 500, "é" * 30 + "a" * 100, "€" * 300]:
+            capture = self._capture(text.encode(), head_size=100)
+            self.assertEqual(capture.getvalue(), maybe_truncate(text, 100))
+
+    def test_head_and_tail_are_kept(self):
+        data = "".join(f"{i}\n" for i in range(1, 100001)).encode()
+        capture = self._capture(data, head_size=20, tail_size=20, chunk=4096)
+
+        output = capture.getvalue()
+        self.assertTrue(output.startswith("1\n2\n3\n"))
+        self.assertTrue(output.endswith("99999\n100000\n"))
+        self.assertIn(TRUNCATED_MESSAGE, output)
+        self.assertIn(f"{len(data)} bytes", output)
+        self.assertIn("100000 lines", output)
+        self.assertLess(capture.total_bytes - capture.dropped_bytes, 200)
+
+    def test_tail_does_not_start_with_a_split_character(self):
+        data = ("a" * 100 + "€" * 100).encode()
+        output = self._capture(data, head_size=10, tail_size=5).getvalue()
+        self.assertTrue(output.endswith("€" * 5))
+        self.assertNotIn("�", output)
+
+    def test_unbounded(self):
+        data = b"y" * 100000
+        self.assertEqual(self._capture(data, head_size=None).getvalue(), "y" * 100000)
+
+
+class TestRun(unittest.IsolatedAsyncioTestCase):
+    async def test_run(self):
+        returncode, stdout, stderr = await run("echo out; echo err >&2; exit 2")
+        self.assertEqual(returncode, 2)
+        self.assertEqual(stdout, "out\n")
+        self.assertEqual(stderr, "err\n")
+
+    async def test_run_truncates(self):
+        _, stdout, _ = await run("seq 1 100000", truncate_after=100, keep_tail=20)
+        self.assertTrue(stdout.startswith("1\n2\n"))
+        self.assertTrue(stdout.endswith("99999\n100000\n"))
+        self.assertIn(TRUNCATED_MESSAGE, stdout)
+
+    async def test_run_timeout(self):
+        with self.assertRaises(TimeoutError):
+            _ = await run("sleep 5", timeout=0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
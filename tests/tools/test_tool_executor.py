@@ -0,0 +1,267 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from trae_agent.tools.base import (
+    Tool,
+    ToolAccess,
+    ToolCall,
+    ToolCallArguments,
+    ToolExecResult,
+    ToolExecutor,
+    ToolLimits,
+    ToolParameter,
+)
+from trae_agent.tools.bash_tool import BashTool
+from trae_agent.tools.edit_tool import TextEditorTool
+
+
+class _SleepTool(Tool):
+    """Sleeps for `seconds`, counting the calls running at once."""
+
+    def __init__(self, limits: ToolLimits | None = None):
+        super().__init__()
+        if limits is not None:
+            self.limits = limits
+        self.running = 0
+        self.max_running = 0
+
+    def get_name(self) -> str:
+        return "sleep"
+
+    def get_description(self) -> str:
+        return "Sleep."
+
+    def get_parameters(self) -> list[ToolParameter]:
+        return [ToolParameter(name="seconds", type="number", description="Seconds.")]
+
+    def get_access(self, arguments: ToolCallArguments) -> ToolAccess:
+        return ToolAccess(read_only=True)
+
+    async def execute(self, arguments: ToolCallArguments) -> ToolExecResult:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(float(arguments["seconds"]))  # pyright: ignore[reportArgumentType]
+        finally:
+            self.running -= 1
+        return ToolExecResult(output=f"slept {arguments['seconds']}")
+
+
+class _FileTool(_SleepTool):
+    """Reads or writes `path`, recording the order of the calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.events: list[str] = []
+
+    def get_name(self) -> str:
+        return "file"
+
+    def get_access(self, arguments: ToolCallArguments) -> ToolAccess:
+        return ToolAccess(
+            read_only=arguments["mode"] == "read", paths=(str(arguments["path"]),)
+        )
+
+    async def execute(self, arguments: ToolCallArguments) -> ToolExecResult:
+        event = f"{arguments['mode']} {arguments['path']}"
+        self.events.append(f"start {event}")
+        result = await super().execute(arguments)
+        self.events.append(f"end {event}")
+        return result
+
+
+def _calls(name: str, arguments: list[ToolCallArguments]) -> list[ToolCall]:
+    return [
+        ToolCall(name=name, call_id=f"call_{i}", arguments=args)
+        for i, args in enumerate(arguments)
+    ]
+
+
+class TestToolExecutor(unittest.IsolatedAsyncioTestCase):
+    async def test_wall_time_is_recorded(self):
+        executor = ToolExecutor([_SleepTool()])
+        result = await executor.execute_tool_call(
+            ToolCall(name="sleep", call_id="call", arguments={"seconds": 0.05})
+        )
+        self.assertTrue(result.success)
+        assert result.wall_time is not None
+        self.assertGreaterEqual(result.wall_time, 0.05)
+
+    async def test_call_is_cancelled_after_its_timeout(self):
+        executor = ToolExecutor([_SleepTool(ToolLimits(timeout=0.05))])
+        results = await executor.parallel_tool_call(
+            _calls("sleep", [{"seconds": 10}, {"seconds": 0}])
+        )
+        self.assertFalse(results[0].success)
+        self.assertIn("did not finish in 0.05 seconds", results[0].error or "")
+        assert results[0].wall_time is not None
+        self.assertLess(results[0].wall_time, 1)
+        self.assertEqual(results[1].result, "slept 0")
+
+    async def test_executor_limits_override_those_of_the_tool(self):
+        tool = _SleepTool(ToolLimits(timeout=0.01, max_concurrency=2))
+        executor = ToolExecutor([tool], limits={"sleep": ToolLimits(timeout=5)})
+        self.assertEqual(
+            executor.get_limits(tool), ToolLimits(timeout=5, max_concurrency=2)
+        )
+        results = await executor.parallel_tool_call(
+            _calls("sleep", [{"seconds": 0.02}] * 6)
+        )
+        self.assertTrue(all(result.success for result in results))
+        self.assertEqual(tool.max_running, 2)
+
+    async def test_parallel_calls_are_limited(self):
+        tool = _SleepTool()
+        executor = ToolExecutor([tool], max_parallel_calls=3)
+        results = await executor.parallel_tool_call(
+            _calls("sleep", [{"seconds": 0.02}] * 8)
+        )
+        self.assertEqual(
+            [result.call_id for result in results], [f"call_{i}" for i in range(8)]
+        )
+        self.assertEqual(tool.max_running, 3)
+
+    @unittest.skipIf(os.name == "nt", "process groups are not used on Windows")
+    async def test_cancelled_bash_command_is_killed(self):
+        tool = BashTool()
+        executor = ToolExecutor([tool], limits={"bash": ToolLimits(timeout=0.5)})
+        with tempfile.TemporaryDirectory() as directory:
+            pid_file = Path(directory) / "pid"
+            result = await executor.execute_tool_call(
+                ToolCall(
+                    name="bash",
+                    call_id="call",
+                    arguments={
+                        "command": f"sh -c 'echo $$ > {pid_file}; exec sleep 30'"
+                    },
+                )
+            )
+            self.assertIn("was cancelled", result.error or "")
+            pid = int(pid_file.read_text())
+
+        # killed with the shell, at most a zombie is left
+        await asyncio.sleep(0.1)
+        try:
+            state = Path(f"/proc/{pid}/stat").read_text().split()[2]
+        except FileNotFoundError:
+            state = None
+        self.assertIn(state, (None, "Z"))
+
+        # the next command runs in a new shell
+        result = await executor.execute_tool_call(
+            ToolCall(name="bash", call_id="call", arguments={"command": "echo hi"})
+        )
+        self.assertEqual(result.result, "hi")
+        if tool._session:
+            tool._session.stop()
+
+
+class TestToolScheduling(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tool = _FileTool()
+        self.executor = ToolExecutor([self.tool])
+
+    async def test_reads_run_at_once(self):
+        results = await self.executor.parallel_tool_call(
+            _calls(
+                "file",
+                [
+                    {"mode": "read", "path": f"/repo/{i}", "seconds": 0.02}
+                    for i in range(4)
+                ]
+                + [{"mode": "read", "path": "/repo/0", "seconds": 0.02}],
+            )
+        )
+        self.assertEqual(self.tool.max_running, 5)
+        self.assertEqual(
+            [result.call_id for result in results], [f"call_{i}" for i in range(5)]
+        )
+
+    async def test_writes_to_a_path_keep_their_order(self):
+        _ = await self.executor.parallel_tool_call(
+            _calls(
+                "file",
+                [
+                    {"mode": "write", "path": "/repo/a", "seconds": 0.03},
+                    {"mode": "write", "path": "/repo/b", "seconds": 0.01},
+                    {"mode": "read", "path": "/repo/a", "seconds": 0},
+                    {"mode": "write", "path": "/repo/a", "seconds": 0},
+                ],
+            )
+        )
+        events = self.tool.events
+        # the write to another path does not wait
+        self.assertLess(
+            events.index("end write /repo/b"), events.index("end write /repo/a")
+        )
+        self.assertEqual(
+            [event for event in events if "/repo/a" in event],
+            [
+                "start write /repo/a",
+                "end write /repo/a",
+                "start read /repo/a",
+                "end read /repo/a",
+                "start write /repo/a",
+                "end write /repo/a",
+            ],
+        )
+
+    async def test_directory_covers_its_files(self):
+        _ = await self.executor.parallel_tool_call(
+            _calls(
+                "file",
+                [
+                    {"mode": "write", "path": "/repo/src/a.py", "seconds": 0.02},
+                    {"mode": "read", "path": "/repo/src", "seconds": 0},
+                    {"mode": "read", "path": "/repo/srcs", "seconds": 0},
+                ],
+            )
+        )
+        self.assertEqual(
+            self.tool.events,
+            [
+                "start write /repo/src/a.py",
+                "start read /repo/srcs",
+                "end read /repo/srcs",
+                "end write /repo/src/a.py",
+                "start read /repo/src",
+                "end read /repo/src",
+            ],
+        )
+
+    def test_access_of_the_tools(self):
+        edit_tool = TextEditorTool()
+        self.assertEqual(
+            edit_tool.get_access({"command": "view", "path": "/repo/a.py"}),
+            ToolAccess(read_only=True, paths=(os.path.realpath("/repo/a.py"),)),
+        )
+        access = edit_tool.get_access(
+            {
+                "command": "multi_edit",
+                "path": "/repo/a.py",
+                "edits": [{"path": "/repo/b.py", "old_str": "a", "new_str": "b"}],
+            }
+        )
+        self.assertFalse(access.read_only)
+        self.assertEqual(len(access.paths or ()), 2)
+        self.assertIsNone(edit_tool.get_access({"command": "undo_edit"}).paths)
+        self.assertIsNone(
+            edit_tool.get_access({"command": "create", "path": "a.py"}).paths
+        )
+
+        bash_tool = BashTool()
+        self.assertTrue(
+            bash_tool.get_access({"command": "grep -rn foo /repo"}).read_only
+        )
+        self.assertFalse(bash_tool.get_access({"command": "rm -rf /repo"}).read_only)
+        self.assertFalse(bash_tool.get_access({"restart": True}).read_only)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+import anthropic
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from trae_agent.tools.base import ToolCall, ToolResult
+from trae_agent.utils.anthropic_client import CACHE_CONTROL, AnthropicClient
+from trae_agent.utils.config import ModelParameters
+from trae_agent.utils.llm_basics import LLMMessage
+
+
+def _model_parameters() -> ModelParameters:
+    return ModelParameters(
+        model="claude-sonnet-4-20250514",
+        api_key="test-key",
+        max_tokens=100,
+        temperature=0.5,
+        top_p=1,
+        top_k=0,
+        parallel_tool_calls=False,
+        max_retries=3,
+    )
+
+
+def _tool(name: str) -> MagicMock:
+    tool = MagicMock()
+    tool.name = name
+    tool.description = f"the {name} tool"
+    tool.get_input_schema.return_value = {"type": "object", "properties": {}}
+    return tool
+
+
+class TestPromptCaching(unittest.TestCase):
+    def setUp(self):
+        self.model_parameters = _model_parameters()
+        self.client = AnthropicClient(self.model_parameters)
+
+    def test_system_prompt_and_tools_are_cached(self):
+        request = self.client._prepare_request(
+            [
+                LLMMessage(role="system", content="you are an agent"),
+                LLMMessage(role="user", content="fix the bug"),
+            ],
+            self.model_parameters,
+            [_tool("task_done"), _tool("sequentialthinking")],
+            reuse_history=True,
+        )
+
+        self.assertEqual(
+            request["system"],
+            [
+                {
+                    "type": "text",
+                    "text": "you are an agent",
+                    "cache_control": CACHE_CONTROL,
+                }
+            ],
+        )
+        self.assertNotIn("cache_control", request["tools"][0])
+        self.assertEqual(request["tools"][-1]["cache_control"], CACHE_CONTROL)
+        self.assertEqual(
+            request["messages"][-1]["content"],
+            [{"type": "text", "text": "fix the bug", "cache_control": CACHE_CONTROL}],
+        )
+
+    def test_breakpoint_moves_without_changing_history(self):
+        self.client._prepare_request(
+            [LLMMessage(role="user", content="fix the bug")],
+            self.model_parameters,
+            None,
+            reuse_history=True,
+        )
+        self.client.message_history.append(
+            {
+                "role": "assistant",
+                "content": [
+                    self.client.parse_tool_call(
+                        ToolCall(
+                            name="bash", call_id="call_1", arguments={"command": "ls"}
+                        )
+                    )
+                ],
+            }
+        )
+        request = self.client._prepare_request(
+            [
+                LLMMessage(
+                    role="user",
+                    tool_result=ToolResult(
+                        call_id="call_1", name="bash", success=True, result="a.py"
+                    ),
+                )
+            ],
+            self.model_parameters,
+            None,
+            reuse_history=True,
+        )
+
+        messages = request["messages"]
+        self.assertEqual(len(messages), 3)
+        # the previous breakpoint is kept, so the cached prefix is found again
+        self.assertEqual(messages[0]["content"][-1]["cache_control"], CACHE_CONTROL)
+        self.assertNotIn("cache_control", messages[1]["content"][-1])
+        self.assertEqual(messages[2]["content"][-1]["cache_control"], CACHE_CONTROL)
+        for message in self.client.message_history:
+            self.assertNotIn("cache_control", str(message))
+
+    def test_system_prompt_is_not_kept_for_a_new_conversation(self):
+        request = self.client._prepare_request(
+            [
+                LLMMessage(role="system", content="you are a tagger"),
+                LLMMessage(role="user", content="tag the step"),
+            ],
+            self.model_parameters,
+            None,
+            reuse_history=False,
+        )
+        self.assertEqual(request["system"][0]["text"], "you are a tagger")
+
+        request = self.client._prepare_request(
+            [LLMMessage(role="user", content="describe the step")],
+            self.model_parameters,
+            None,
+            reuse_history=False,
+        )
+        self.assertIs(request["system"], anthropic.NOT_GIVEN)
+
+    def test_cached_tokens_count_as_input_tokens(self):
+        response = MagicMock()
+        response.content = []
+        response.model = "claude-sonnet-4-20250514"
+        response.stop_reason = "end_turn"
+        response.usage.input_tokens = 10
+        response.usage.output_tokens = 5
+        response.usage.cache_creation_input_tokens = 30
+        response.usage.cache_read_input_tokens = 60
+
+        llm_response = self.client._process_response(
+            response, [], self.model_parameters, None
+        )
+
+        assert llm_response.usage is not None
+        self.assertEqual(llm_response.usage.input_tokens, 100)
+        self.assertEqual(llm_response.usage.cache_hit_ratio, 0.6)
+
+
+if __name__ == "__main__":
+    unittest.main()
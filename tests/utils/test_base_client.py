@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+import openai
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from trae_agent.utils.base_client import (
+    TOOL_SCHEMA_CACHE_SIZE,
+    BaseLLMClient,
+    get_async_http_client,
+)
+from trae_agent.utils.config import ModelParameters
+from trae_agent.utils.doubao_client import DoubaoClient
+from trae_agent.utils.llm_basics import LLMMessage
+
+
+def _model_parameters() -> ModelParameters:
+    return ModelParameters(
+        model="test-model",
+        api_key="test-key",
+        max_tokens=100,
+        temperature=0.5,
+        top_p=1,
+        top_k=0,
+        parallel_tool_calls=False,
+        max_retries=3,
+        base_url="http://llm.test/v1",
+    )
+
+
+class TestRetries(unittest.IsolatedAsyncioTestCase):
+    def test_call_with_retries(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 2:
+                raise RuntimeError("boom")
+            return "ok"
+
+        with patch("trae_agent.utils.base_client.time.sleep") as sleep:
+            self.assertEqual(BaseLLMClient.call_with_retries(flaky, 3, "Test"), "ok")
+        self.assertEqual(len(attempts), 2)
+        sleep.assert_called_once()
+
+    async def test_acall_with_retries_does_not_block(self):
+        async def failing():
+            raise RuntimeError("boom")
+
+        with (
+            patch("trae_agent.utils.base_client.asyncio.sleep") as sleep,
+            patch("trae_agent.utils.base_client.time.sleep") as blocking_sleep,
+            self.assertRaises(ValueError) as cm,
+        ):
+            await BaseLLMClient.acall_with_retries(failing, 2, "Test")
+        self.assertIn("Failed to get response from Test", str(cm.exception))
+        self.assertIn("Error 2: boom", str(cm.exception))
+        # no sleep after the last attempt, and never a blocking one
+        sleep.assert_called_once()
+        blocking_sleep.assert_not_called()
+
+    async def test_http_client_is_shared_within_a_loop(self):
+        self.assertIs(get_async_http_client(), get_async_http_client())
+
+    def test_http_client_is_per_loop(self):
+        async def get():
+            return get_async_http_client()
+
+        first = asyncio.run(get())
+        second = asyncio.run(get())
+        self.assertIsNot(first, second)
+
+
+class TestToolSchemas(unittest.TestCase):
+    def test_schemas_are_reused_for_the_same_toolset(self):
+        client = DoubaoClient(_model_parameters())
+        tools = [MagicMock(), MagicMock()]
+        built = []
+
+        def build(tool):
+            built.append(tool)
+            return {"name": str(id(tool))}
+
+        first = client.get_tool_schemas(tools, build)
+        self.assertIs(client.get_tool_schemas(list(tools), build), first)
+        self.assertEqual(len(built), 2)
+
+        # a changed toolset gets new schemas
+        changed = client.get_tool_schemas([tools[0], MagicMock()], build)
+        self.assertEqual(len(built), 4)
+        self.assertEqual(changed[0], first[0])
+
+    def test_cache_is_bounded(self):
+        client = DoubaoClient(_model_parameters())
+        for _ in range(TOOL_SCHEMA_CACHE_SIZE + 5):
+            client.get_tool_schemas([MagicMock()], lambda tool: {})
+        self.assertEqual(len(client._tool_schemas), TOOL_SCHEMA_CACHE_SIZE)
+
+
+class TestAchat(unittest.IsolatedAsyncioTestCase):
+    async def test_achat(self):
+        requests: list[dict] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(
+                200,
+                json={
+                    "id": "1",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": "test-model",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": "hi there"},
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": 3,
+                        "completion_tokens": 2,
+                        "total_tokens": 5,
+                        "prompt_tokens_details": {"cached_tokens": 2},
+                    },
+                },
+            )
+
+        model_parameters = _model_parameters()
+        client = DoubaoClient(model_parameters)
+        client._async_clients[asyncio.get_running_loop()] = openai.AsyncOpenAI(
+            api_key="test-key",
+            base_url="http://llm.test/v1",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+
+        response = await client.achat(
+            [LLMMessage(role="user", content="hello")], model_parameters
+        )
+
+        self.assertEqual(response.content, "hi there")
+        self.assertEqual(response.usage.input_tokens, 3)
+        self.assertEqual(response.usage.cache_read_input_tokens, 2)
+        self.assertEqual(
+            requests[0]["messages"], [{"role": "user", "content": "hello"}]
+        )
+        self.assertEqual(
+            client.message_history[-1], {"role": "assistant", "content": "hi there"}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,216 @@
+import asyncio
+import os
+import sys
+import unittest
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
+
+import anthropic
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from trae_agent.agent.agent_basics import AgentState, AgentStep
+from trae_agent.utils.anthropic_client import AnthropicClient
+from trae_agent.utils.config import Config
+from trae_agent.utils.lake_view import TAGGER_PROMPT, LakeView
+from trae_agent.utils.llm_basics import LLMMessage, LLMResponse
+
+
+class _FakeLLMClient:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests: list[list[LLMMessage]] = []
+
+    async def achat(self, messages, model_parameters, tools=None, reuse_history=True):
+        self.requests.append(messages)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if messages[-1].content.endswith("<tags>"):
+            return LLMResponse(content="EXAMINE_CODE</tags>")
+        return LLMResponse(content=" is reading.</task><details>foo.py</details>")
+
+
+def _config(max_concurrency: int) -> Config:
+    return Config(
+        {
+            "default_provider": "anthropic",
+            "model_providers": {
+                "anthropic": {"api_key": "test-key", "model": "test-model"}
+            },
+            "lakeview_config": {
+                "model_provider": "anthropic",
+                "model_name": "test-model",
+                "max_concurrency": max_concurrency,
+                "tagger_recent_steps": 2,
+                "tagger_summary_chars": 2_000,
+            },
+        }
+    )
+
+
+def _tagger_requests(client: _FakeLLMClient) -> list[list[LLMMessage]]:
+    return [r for r in client.requests if r[0].content == TAGGER_PROMPT]
+
+
+def _step(step_number: int) -> AgentStep:
+    return AgentStep(
+        step_number=step_number,
+        state=AgentState.COMPLETED,
+        llm_response=LLMResponse(content=f"step {step_number}"),
+    )
+
+
+class TestLakeView(unittest.IsolatedAsyncioTestCase):
+    def lake_view(self, max_concurrency: int) -> tuple[LakeView, _FakeLLMClient]:
+        """A LakeView whose clients, however many it creates, are one fake client."""
+        client = _FakeLLMClient()
+        _ = self.enterContext(
+            patch("trae_agent.utils.lake_view.LLMClient", return_value=client)
+        )
+        return LakeView(_config(max_concurrency)), client
+
+    async def test_steps_are_recorded_in_order(self):
+        lake_view, client = self.lake_view(max_concurrency=4)
+
+        results = await asyncio.gather(
+            *(lake_view.create_lakeview_step(_step(i)) for i in range(1, 5))
+        )
+
+        self.assertEqual(lake_view.steps, ["step 1", "step 2", "step 3", "step 4"])
+        for result in results:
+            assert result is not None
+            self.assertEqual(result.desc_details, "[italic]foo.py[/italic]")
+            self.assertIn("EXAMINE_CODE", result.tags_emoji)
+
+        # the tagger of the last step only sees the steps before it
+        tagger_request = _tagger_requests(client)[-1]
+        self.assertIn("1. step 1", tagger_request[2].content)
+        self.assertNotIn('<step id="1">', tagger_request[2].content)
+        self.assertIn('<step id="3">', tagger_request[2].content)
+        self.assertNotIn('<step id="4">', tagger_request[2].content)
+        self.assertIn("<current_step>step 4</current_step>", tagger_request[2].content)
+
+    async def test_concurrency_is_bounded(self):
+        lake_view, client = self.lake_view(max_concurrency=2)
+
+        await asyncio.gather(
+            *(lake_view.create_lakeview_step(_step(i)) for i in range(1, 6))
+        )
+
+        self.assertEqual(client.max_in_flight, 2)
+        self.assertEqual(len(client.requests), 10)
+
+    async def test_requests_in_flight_have_clients_of_their_own(self):
+        clients: list[_FakeLLMClient] = []
+
+        def new_client(*args: Any) -> _FakeLLMClient:
+            clients.append(_FakeLLMClient())
+            return clients[-1]
+
+        with patch("trae_agent.utils.lake_view.LLMClient", side_effect=new_client):
+            lake_view = LakeView(_config(max_concurrency=3))
+            await asyncio.gather(
+                *(lake_view.create_lakeview_step(_step(i)) for i in range(1, 5))
+            )
+
+        # a client keeps its message history, it is never shared by two requests
+        self.assertEqual(len(clients), 3)
+        self.assertEqual([client.max_in_flight for client in clients], [1, 1, 1])
+        self.assertEqual(sum(len(client.requests) for client in clients), 8)
+
+    async def test_tagger_context_is_bounded(self):
+        lake_view, client = self.lake_view(max_concurrency=4)
+        lake_view.tagger_summary_chars = 6_000
+
+        for i in range(1, 201):
+            step = _step(i)
+            assert step.llm_response is not None
+            step.llm_response.content = f"step {i}: " + "x" * 1000
+            await lake_view.create_lakeview_step(step)
+
+        contexts = [r[2].content for r in _tagger_requests(client)]
+        self.assertEqual(len(contexts), 200)
+        self.assertLess(max(len(c) for c in contexts), 6_000 + 4_000)
+        self.assertIn('<step id="199">', contexts[-1])
+        self.assertIn("omitted", contexts[-1])
+
+        # the summaries sent for a step are a prefix of those sent for the next one
+        extended = sum(
+            b.startswith(a[: a.index("\n</summary>")])
+            for a, b in zip(contexts, contexts[1:], strict=False)
+        )
+        self.assertGreater(extended, 180)
+
+    async def test_malformed_tags_are_retried(self):
+        lake_view, client = self.lake_view(max_concurrency=1)
+        responses = iter(["no tags here", "THINK</tags>"])
+
+        async def achat(messages, model_parameters, tools=None, reuse_history=True):
+            return LLMResponse(content=next(responses))
+
+        client.achat = achat  # type: ignore[method-assign]
+        self.assertEqual(await lake_view.extract_tag_in_step("step"), ["THINK"])
+
+
+class TestSharedClient(unittest.IsolatedAsyncioTestCase):
+    async def test_tagger_and_extractor_prompts_stay_apart(self):
+        lake_view = LakeView(
+            Config(
+                {
+                    "default_provider": "anthropic",
+                    "model_providers": {
+                        "anthropic": {"api_key": "test-key", "model": "test-model"}
+                    },
+                    "lakeview_config": {
+                        "model_provider": "anthropic",
+                        "model_name": "test-model",
+                        "max_concurrency": 1,
+                    },
+                }
+            )
+        )
+        requests: list[dict[str, Any]] = []
+
+        async def create(**request: Any) -> anthropic.types.Message:
+            requests.append(request)
+            return anthropic.types.Message(
+                id="msg",
+                type="message",
+                role="assistant",
+                model="test-model",
+                content=[
+                    anthropic.types.TextBlock(
+                        type="text",
+                        text="EXAMINE_CODE</tags> is reading.</task><details>foo.py</details>",
+                    )
+                ],
+                stop_reason="end_turn",
+                stop_sequence=None,
+                usage=anthropic.types.Usage(input_tokens=1, output_tokens=1),
+            )
+
+        async_client = MagicMock()
+        async_client.messages.create = AsyncMock(side_effect=create)
+        with patch.object(
+            AnthropicClient,
+            "async_client",
+            new_callable=PropertyMock,
+            return_value=async_client,
+        ):
+            for i in range(1, 4):
+                _ = await lake_view.create_lakeview_step(_step(i))
+
+        # the requests of the tagger and the extractor alternate on one client
+        is_tagger = [
+            "The tags are" in str(request["messages"][-1]) for request in requests
+        ]
+        self.assertEqual(is_tagger, [False, True] * 3)
+        for request in requests:
+            self.assertIs(request["system"], anthropic.NOT_GIVEN)
+
+
+if __name__ == "__main__":
+    unittest.main()
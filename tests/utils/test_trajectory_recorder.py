@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from trae_agent.tools.base import ToolCall, ToolResult
+from trae_agent.utils.llm_basics import LLMMessage, LLMResponse, LLMUsage
+from trae_agent.utils.trajectory_recorder import (
+    TrajectoryRecorder,
+    convert_trajectory,
+    load_trajectory,
+)
+
+
+def _record_run(recorder: TrajectoryRecorder, steps: int = 3) -> None:
+    recorder.start_recording("fix the bug", "anthropic", "claude", 10)
+    messages = [LLMMessage(role="system", content="you are an agent")]
+    for i in range(steps):
+        messages = messages + [LLMMessage(role="user", content=f"step {i}")]
+        tool_call = ToolCall(name="bash", call_id=f"call_{i}", arguments={"i": i})
+        response = LLMResponse(
+            content=f"response {i}",
+            usage=LLMUsage(input_tokens=10, output_tokens=5, cache_read_input_tokens=8),
+            model="claude",
+            finish_reason="tool_use",
+            tool_calls=[tool_call],
+        )
+        recorder.record_llm_interaction(messages, response, "anthropic", "claude")
+        recorder.record_agent_step(
+            step_number=i + 1,
+            state="calling_tool",
+            llm_messages=messages,
+            llm_response=response,
+            tool_calls=[tool_call],
+            tool_results=[
+                ToolResult(call_id=f"call_{i}", name="bash", success=True, result="ok")
+            ],
+        )
+    recorder.finalize_recording(True, "done")
+
+
+class TestTrajectoryRecorder(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.dir = Path(self.tmp_dir.name)
+
+    def test_json_format(self):
+        recorder = TrajectoryRecorder(str(self.dir / "trajectory.json"))
+        _record_run(recorder)
+
+        with open(self.dir / "trajectory.json") as f:
+            self.assertEqual(json.load(f), recorder.trajectory_data)
+        self.assertEqual(
+            load_trajectory(self.dir / "trajectory.json"), recorder.trajectory_data
+        )
+
+    def test_total_usage(self):
+        recorder = TrajectoryRecorder(str(self.dir / "trajectory.jsonl"))
+        _record_run(recorder, steps=4)
+
+        total_usage = load_trajectory(self.dir / "trajectory.jsonl")["total_usage"]
+        self.assertEqual(total_usage["input_tokens"], 40)
+        self.assertEqual(total_usage["cache_read_input_tokens"], 32)
+        self.assertEqual(total_usage["cache_hit_ratio"], 0.8)
+
+    def test_jsonl_format_is_append_only(self):
+        path = self.dir / "trajectory.jsonl"
+        recorder = TrajectoryRecorder(str(path))
+        _record_run(recorder)
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        self.assertEqual(
+            [record["type"] for record in records if record["type"] != "message"],
+            ["start"] + ["llm_interaction", "agent_step"] * 3 + ["finalize"],
+        )
+        self.assertEqual(load_trajectory(path), recorder.trajectory_data)
+
+    def test_messages_are_stored_once(self):
+        path = self.dir / "trajectory.jsonl"
+        recorder = TrajectoryRecorder(str(path))
+        _record_run(recorder, steps=20)
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        # the system prompt and one user message per step
+        message_records = [r for r in records if r["type"] == "message"]
+        self.assertEqual(len(message_records), 21)
+
+        interactions = [r for r in records if r["type"] == "llm_interaction"]
+        self.assertEqual(
+            interactions[0]["input_messages"],
+            {"prefix": 0, "ids": [r["id"] for r in message_records[:2]]},
+        )
+        # every later interaction extends the previous message list by one
+        for i, interaction in enumerate(interactions[1:], start=2):
+            self.assertEqual(interaction["input_messages"]["prefix"], i)
+            self.assertEqual(len(interaction["input_messages"]["ids"]), 1)
+
+        self.assertEqual(load_trajectory(path), recorder.trajectory_data)
+
+    def test_restart_replaces_recording(self):
+        path = self.dir / "trajectory.jsonl"
+        recorder = TrajectoryRecorder(str(path))
+        _record_run(recorder, steps=2)
+        _record_run(recorder, steps=1)
+
+        trajectory = load_trajectory(path)
+        self.assertEqual(len(trajectory["llm_interactions"]), 1)
+        self.assertEqual(trajectory, recorder.trajectory_data)
+
+    def test_truncated_record_is_ignored(self):
+        path = self.dir / "trajectory.jsonl"
+        recorder = TrajectoryRecorder(str(path))
+        _record_run(recorder)
+        with open(path, "a") as f:
+            f.write('{"type": "agent_step", "step_num')
+
+        self.assertEqual(load_trajectory(path), recorder.trajectory_data)
+
+    def test_convert_trajectory(self):
+        recorder = TrajectoryRecorder(str(self.dir / "trajectory.jsonl"))
+        _record_run(recorder)
+
+        convert_trajectory(self.dir / "trajectory.jsonl", self.dir / "out.json")
+        with open(self.dir / "out.json") as f:
+            self.assertEqual(json.load(f), recorder.trajectory_data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -79,7 +79,7 @@ class Agent(ABC):
                     if self.cli_console:
                         self.cli_console.update_status(step)
 
-                    llm_response = self.llm_client.chat(
+                    llm_response = await self.llm_client.achat(
                         messages, self.model_parameters, self.tools
                     )
                     step.llm_response = llm_response
@@ -150,6 +150,8 @@ class Agent(ABC):
                                     )
                                 )
                             step.tool_results = tool_results
+                            # e.g. make the files written by the tools durable
+                            self.tool_caller.end_step()
 
                             # Display tool results
                             if self.cli_console:
@@ -233,6 +235,8 @@ class Agent(ABC):
         except Exception as e:
             execution.final_result = f"Agent execution failed: {str(e)}"
 
+        # for the tool calls of a step that failed
+        self.tool_caller.end_step()
         execution.execution_time = time.time() - start_time
 
         # Display final summary
@@ -9,7 +9,9 @@ import subprocess
 from typing import override
 
 from ..tools import tools_registry
-from ..tools.base import Tool, ToolExecutor, ToolResult
+from ..tools.base import Tool, ToolExecutor, ToolLimits, ToolResult
+from ..tools.bash_tool import BashResultCache, BashTool
+from ..tools.edit_tool import TextEditorTool
 from ..utils.config import Config
 from ..utils.llm_basics import LLMMessage, LLMResponse
 from .agent_basics import AgentError, AgentExecution
@@ -31,6 +33,11 @@ class TraeAgent(Agent):
         self.base_commit: str | None = None
         self.must_patch: str = "false"
         self.patch_path: str | None = None
+        self.bash_result_cache: BashResultCache | None = (
+            BashResultCache() if config.enable_bash_cache else None
+        )
+        self.tool_limits: dict[str, ToolLimits] = config.tool_limits
+        self.max_parallel_tool_calls: int | None = config.max_parallel_tool_calls
         super().__init__(config)
 
     def setup_trajectory_recording(self, trajectory_path: str | None = None) -> str:
@@ -77,7 +84,13 @@ class TraeAgent(Agent):
             tools_registry[tool_name](model_provider=provider)
             for tool_name in tool_names
         ]
-        self.tool_caller: ToolExecutor = ToolExecutor(self.tools)
+        self.tool_caller: ToolExecutor = ToolExecutor(
+            self.tools,
+            limits=self.tool_limits,
+            max_parallel_calls=self.max_parallel_tool_calls,
+        )
+        if self.bash_result_cache is not None:
+            self._share_bash_result_cache(self.bash_result_cache)
 
         self.initial_messages: list[LLMMessage] = []
         self.initial_messages.append(
@@ -124,7 +137,11 @@ class TraeAgent(Agent):
         # Finalize trajectory recording if recorder is available
         if self.trajectory_recorder:
             self.trajectory_recorder.finalize_recording(
-                success=execution.success, final_result=execution.final_result
+                success=execution.success,
+                final_result=execution.final_result,
+                bash_cache_stats=self.bash_result_cache.stats()
+                if self.bash_result_cache
+                else None,
             )
 
         if self.patch_path is not None:
@@ -133,6 +150,15 @@ class TraeAgent(Agent):
 
         return execution
 
+    def _share_bash_result_cache(self, cache: BashResultCache) -> None:
+        """Let the bash tool reuse results, and every write of the editor drop them."""
+        cache.invalidate()
+        for tool in self.tools:
+            if isinstance(tool, BashTool):
+                tool.result_cache = cache
+            elif isinstance(tool, TextEditorTool):
+                tool.write_listeners.append(cache.invalidate)
+
     def get_system_prompt(self) -> str:
         """Get the system prompt for TraeAgent."""
         return """You are an expert AI software engineering agent.
@@ -409,6 +409,21 @@ def tools():
     console.print(tools_table)
 
 
+@cli.command()
+@click.argument("trajectory_file")
+@click.argument("output_file")
+def convert_trajectory(trajectory_file: str, output_file: str):
+    """Convert an append-only (.jsonl) trajectory file to a JSON trajectory file."""
+    from .utils.trajectory_recorder import convert_trajectory as convert
+
+    try:
+        convert(trajectory_file, output_file)
+    except Exception as e:
+        console.print(f"[red]Error converting trajectory: {e}[/red]")
+        sys.exit(1)
+    console.print(f"[green]Trajectory saved to: {output_file}[/green]")
+
+
 def main():
     """Main entry point for the CLI."""
     cli()
@@ -5,7 +5,7 @@
 
 from typing import Type
 
-from .base import Tool, ToolCall, ToolExecutor, ToolResult
+from .base import Tool, ToolAccess, ToolCall, ToolExecutor, ToolLimits, ToolResult
 from .bash_tool import BashTool
 from .edit_tool import TextEditorTool
 from .sequential_thinking_tool import SequentialThinkingTool
@@ -13,9 +13,11 @@ from .task_done_tool import TaskDoneTool
 
 __all__ = [
     "Tool",
+    "ToolAccess",
     "ToolResult",
     "ToolCall",
     "ToolExecutor",
+    "ToolLimits",
     "BashTool",
     "TextEditorTool",
     "SequentialThinkingTool",
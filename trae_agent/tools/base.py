@@ -4,6 +4,9 @@
 """Base classes for tools and tool calling."""
 
 import asyncio
+import contextlib
+import os
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from functools import cached_property
@@ -37,6 +40,7 @@ class ToolResult:
     result: str | None = None
     error: str | None = None
     id: str | None = None  # OpenAI-specific field
+    wall_time: float | None = None  # seconds the tool ran, None if it did not run
 
 
 ToolCallArguments = dict[
@@ -58,6 +62,51 @@ class ToolCall:
         return f"ToolCall(name={self.name}, arguments={self.arguments}, call_id={self.call_id}, id={self.id})"
 
 
+@dataclass(frozen=True)
+class ToolLimits:
+    """Limits of the calls of a tool, None for no limit."""
+
+    timeout: float | None = None  # seconds after which a call is cancelled
+    max_concurrency: int | None = None  # calls of the tool running at once
+
+    def override(self, other: "ToolLimits") -> "ToolLimits":
+        """These limits, replaced by those that are set in `other`."""
+        return ToolLimits(
+            timeout=other.timeout if other.timeout is not None else self.timeout,
+            max_concurrency=other.max_concurrency
+            if other.max_concurrency is not None
+            else self.max_concurrency,
+        )
+
+
+@dataclass(frozen=True)
+class ToolAccess:
+    """What a tool call reads or writes, for running calls that do not conflict at once.
+
+    `paths` are absolute paths, a directory covering the files below it, and
+    None when the call may access anything. Two calls conflict unless both are
+    read only or their paths do not overlap.
+    """
+
+    read_only: bool = False
+    paths: tuple[str, ...] | None = None
+
+    def conflicts_with(self, other: "ToolAccess") -> bool:
+        if self.read_only and other.read_only:
+            return False
+        if self.paths is None or other.paths is None:
+            return True
+        return any(
+            _contains(path, other_path) or _contains(other_path, path)
+            for path in self.paths
+            for other_path in other.paths
+        )
+
+
+def _contains(directory: str, path: str) -> bool:
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
 @dataclass
 class ToolParameter:
     """Tool parameter definition."""
@@ -73,6 +122,9 @@ class ToolParameter:
 class Tool(ABC):
     """Base class for all tools."""
 
+    # the limits of the tool when the executor does not set others
+    limits: ToolLimits = ToolLimits()
+
     def __init__(self, model_provider: str | None = None):
         self._model_provider = model_provider
 
@@ -116,6 +168,14 @@ class Tool(ABC):
         """Execute the tool with given parameters."""
         pass
 
+    def get_access(self, arguments: ToolCallArguments) -> ToolAccess:
+        """What a call with `arguments` reads or writes, by default anything."""
+        return ToolAccess()
+
+    def end_step(self) -> None:  # noqa: B027
+        """Called once the tool calls of an agent step were executed."""
+        pass
+
     def json_definition(self) -> dict[str, object]:
         return {
             "name": self.name,
@@ -160,11 +220,27 @@ class Tool(ABC):
 
 
 class ToolExecutor:
-    """Tool executor that manages tool execution."""
-
-    def __init__(self, tools: list[Tool]):
+    """Tool executor that manages tool execution.
+
+    A call that runs longer than the timeout of its tool is cancelled, and
+    fails. Calls wait while `max_concurrency` calls of their tool, or
+    `max_parallel_calls` calls in total, are running. The limits of a tool are
+    its own `limits`, overridden by those given by name in `limits`.
+    """
+
+    def __init__(
+        self,
+        tools: list[Tool],
+        limits: dict[str, ToolLimits] | None = None,
+        max_parallel_calls: int | None = None,
+    ):
         self._tools = tools
         self._tool_map: dict[str, Tool] | None = None
+        self._limits = limits or {}
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._parallel_calls: asyncio.Semaphore | None = (
+            asyncio.Semaphore(max_parallel_calls) if max_parallel_calls else None
+        )
 
     @property
     def tools(self) -> dict[str, Tool]:
@@ -184,34 +260,94 @@ class ToolExecutor:
             )
 
         tool = self.tools[tool_call.name]
-
+        limits = self.get_limits(tool)
+
+        async with (
+            self._get_semaphore(tool, limits) or contextlib.nullcontext(),
+            self._parallel_calls or contextlib.nullcontext(),
+        ):
+            start_time = time.perf_counter()
+            timeout = asyncio.timeout(limits.timeout)
+            try:
+                async with timeout:
+                    tool_exec_result = await tool.execute(tool_call.arguments)
+                result = ToolResult(
+                    name=tool_call.name,
+                    success=tool_exec_result.error_code == 0,
+                    result=tool_exec_result.output,
+                    error=tool_exec_result.error,
+                    call_id=tool_call.call_id,
+                    id=tool_call.id,
+                )
+            except Exception as e:
+                result = ToolResult(
+                    name=tool_call.name,
+                    success=False,
+                    error=f"Tool '{tool_call.name}' did not finish in {limits.timeout} seconds and was cancelled"
+                    if timeout.expired()
+                    else f"Error executing tool '{tool_call.name}': {str(e)}",
+                    call_id=tool_call.call_id,
+                    id=tool_call.id,
+                )
+            result.wall_time = time.perf_counter() - start_time
+            return result
+
+    def get_limits(self, tool: Tool) -> ToolLimits:
+        """The limits of the calls of `tool`."""
+        limits = self._limits.get(tool.name)
+        return tool.limits if limits is None else tool.limits.override(limits)
+
+    def _get_semaphore(
+        self, tool: Tool, limits: ToolLimits
+    ) -> asyncio.Semaphore | None:
+        if limits.max_concurrency is None:
+            return None
+        if tool.name not in self._semaphores:
+            self._semaphores[tool.name] = asyncio.Semaphore(limits.max_concurrency)
+        return self._semaphores[tool.name]
+
+    def get_access(self, tool_call: ToolCall) -> ToolAccess:
+        """What `tool_call` reads or writes."""
+        tool = self.tools.get(tool_call.name)
+        if tool is None:
+            return ToolAccess()
         try:
-            tool_exec_result = await tool.execute(tool_call.arguments)
-            return ToolResult(
-                name=tool_call.name,
-                success=tool_exec_result.error_code == 0,
-                result=tool_exec_result.output,
-                error=tool_exec_result.error,
-                call_id=tool_call.call_id,
-                id=tool_call.id,
-            )
-        except Exception as e:
-            return ToolResult(
-                name=tool_call.name,
-                success=False,
-                error=f"Error executing tool '{tool_call.name}': {str(e)}",
-                call_id=tool_call.call_id,
-                id=tool_call.id,
-            )
+            return tool.get_access(tool_call.arguments)
+        except Exception:
+            # e.g. invalid arguments, the call fails anyway
+            return ToolAccess()
 
     async def parallel_tool_call(self, tool_calls: list[ToolCall]) -> list[ToolResult]:
-        """Execute tool calls in parallel"""
-        return await asyncio.gather(
-            *[self.execute_tool_call(call) for call in tool_calls]
-        )
+        """Execute tool calls in parallel.
+
+        A call only starts once the earlier calls it conflicts with are done,
+        so reads run at once while the writes to a path, and the reads around
+        them, keep the order of the calls. The results are in the same order
+        as the calls.
+        """
+        accesses = [self.get_access(call) for call in tool_calls]
+        tasks: list[asyncio.Task[ToolResult]] = []
+        for i, call in enumerate(tool_calls):
+            dependencies = [
+                tasks[j] for j in range(i) if accesses[j].conflicts_with(accesses[i])
+            ]
+            tasks.append(asyncio.ensure_future(self._execute_after(call, dependencies)))
+        return await asyncio.gather(*tasks)
+
+    async def _execute_after(
+        self, tool_call: ToolCall, dependencies: list[asyncio.Task[ToolResult]]
+    ) -> ToolResult:
+        if dependencies:
+            _ = await asyncio.wait(dependencies)
+        return await self.execute_tool_call(tool_call)
 
     async def sequential_tool_call(
         self, tool_calls: list[ToolCall]
     ) -> list[ToolResult]:
         """Execute tool calls in sequential"""
         return [await self.execute_tool_call(call) for call in tool_calls]
+
+    def end_step(self) -> None:
+        """Tell the tools that the tool calls of the agent step were executed."""
+        for tool in self._tools:
+            tool.end_step()
@@ -10,10 +10,30 @@
 # This modified file is released under the same license.
 
 import asyncio
+import contextlib
+import dataclasses
+import glob
 import os
+import re
+import shlex
+import signal
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
 from typing import override
 
-from .base import Tool, ToolCallArguments, ToolError, ToolExecResult, ToolParameter
+from .base import (
+    Tool,
+    ToolAccess,
+    ToolCallArguments,
+    ToolError,
+    ToolExecResult,
+    ToolLimits,
+    ToolParameter,
+)
+from .file_cache import RACY_MTIME_NS
+from .run import MAX_RESPONSE_LEN, OutputCapture
 
 
 class _BashSession:
@@ -23,14 +43,19 @@ class _BashSession:
     _timed_out: bool
 
     command: str = "/bin/bash"
-    _output_delay: float = 0.2  # seconds
     _timeout: float = 120.0  # seconds
-    _sentinel: str = "<<exit>>"
+    _read_size: int = 64 * 1024  # bytes
+    _sentinel_prefix: str = "<<exit-"
+    # characters kept from the start and the end of the output of a command
+    _output_head: int = MAX_RESPONSE_LEN
+    _output_tail: int = 2000
 
     def __init__(self) -> None:
         self._started = False
         self._timed_out = False
         self._process: asyncio.subprocess.Process | None = None
+        # the working directory of the shell after the last command, None if unknown
+        self.cwd: str | None = None
 
     async def start(self) -> None:
         if self._started:
@@ -59,6 +84,7 @@ class _BashSession:
             )
 
         self._started = True
+        self.cwd = os.getcwd()
 
     def stop(self) -> None:
         """Terminate the bash shell."""
@@ -70,6 +96,21 @@ class _BashSession:
             return
         self._process.terminate()
 
+    @property
+    def timed_out(self) -> bool:
+        return self._timed_out
+
+    def kill(self) -> None:
+        """Kill the bash shell and every process started by it, e.g. a command that hangs."""
+        if self._process is None or self._process.returncode is not None:
+            return
+        if os.name != "nt":
+            # the shell leads its own process group, see `start`
+            with contextlib.suppress(ProcessLookupError):
+                os.killpg(self._process.pid, signal.SIGKILL)
+        else:
+            self._process.kill()
+
     async def run(self, command: str) -> ToolExecResult:
         """Execute a command in the bash shell."""
         if not self._started or self._process is None:
@@ -89,46 +130,378 @@ class _BashSession:
         assert self._process.stdout
         assert self._process.stderr
 
-        # send command to the process
+        # every call gets its own sentinel so that output of a previous command
+        # (e.g. a background job) can never be mistaken for the end of this one
+        sentinel = f"{self._sentinel_prefix}{uuid.uuid4().hex}>>"
+
+        # send command to the process. The sentinel is echoed on its own line so
+        # that heredocs and trailing comments in `command` are left intact, and
+        # `$?` still refers to the exit status of the command itself, followed by
+        # the working directory the command left.
         self._process.stdin.write(
-            command.encode() + f"; echo '{self._sentinel}'\n".encode()
+            command.encode()
+            + f"\necho '{sentinel}'$?\" $PWD\"; echo '{sentinel}' >&2\n".encode()
         )
         await self._process.stdin.drain()
 
-        # read output from the process, until the sentinel is found
+        # read output from the process, until the sentinel is found on both streams
+        stdout = OutputCapture(self._output_head, self._output_tail)
+        stderr = OutputCapture(self._output_head, self._output_tail)
         try:
             async with asyncio.timeout(self._timeout):
-                while True:
-                    await asyncio.sleep(self._output_delay)
-                    # if we read directly from stdout/stderr, it will wait forever for
-                    # EOF. use the StreamReader buffer directly instead.
-                    output: str = self._process.stdout._buffer.decode()  # type: ignore[attr-defined]
-                    if self._sentinel in output:
-                        # strip the sentinel and break
-                        output = output[: output.index(self._sentinel)]
-                        break
+                exit_status, _ = await asyncio.gather(
+                    self._read_until_sentinel(self._process.stdout, sentinel, stdout),
+                    self._read_until_sentinel(self._process.stderr, sentinel, stderr),
+                )
+        except asyncio.CancelledError:
+            # the command is never finished, it would block the next ones
+            self.kill()
+            raise
         except asyncio.TimeoutError:
             self._timed_out = True
+            self.kill()
             raise ToolError(
-                f"timed out: bash has not returned in {self._timeout} seconds and must be restarted",
+                f"timed out: bash has not returned in {self._timeout} seconds and was killed, the next command runs in a new shell",
             ) from None
+        except EOFError:
+            returncode = await self._process.wait()
+            return ToolExecResult(
+                error=f"bash has exited with returncode {returncode}. tool must be restarted.",
+                error_code=-1,
+            )
 
+        output = stdout.getvalue()
         if output.endswith("\n"):
             output = output[:-1]
 
-        error: str = self._process.stderr._buffer.decode()  # type: ignore[attr-defined]
+        error = stderr.getvalue()
         if error.endswith("\n"):
             error = error[:-1]
 
-        error_code = (
-            self._process.returncode if self._process.returncode is not None else 0
+        exit_status, _, cwd = exit_status.decode(errors="replace").partition(" ")
+        self.cwd = cwd or None
+        try:
+            error_code = int(exit_status)
+        except ValueError:
+            error_code = 0
+
+        return ToolExecResult(output=output, error=error, error_code=error_code)
+
+    async def _read_until_sentinel(
+        self, stream: asyncio.StreamReader, sentinel: str, capture: OutputCapture
+    ) -> bytes:
+        """Stream `stream` into `capture` until a line starting with `sentinel`.
+
+        The reader wakes up as soon as new bytes are available. Only a window
+        that may hold a partially received sentinel is kept back, everything
+        before it is handed to `capture`, so memory use does not grow with the
+        size of the output.
+
+        Returns:
+            The rest of the sentinel line (the exit status for stdout, empty for
+            stderr).
+        """
+        marker = sentinel.encode()
+        pending = bytearray()
+        while True:
+            chunk = await stream.read(self._read_size)
+            if not chunk:
+                raise EOFError("bash closed its output stream")
+            pending += chunk
+
+            index = pending.find(marker)
+            if index == -1:
+                # the marker may straddle the boundary with the next chunk
+                keep = len(marker) - 1
+                if len(pending) > keep:
+                    capture.write(bytes(pending[:-keep]))
+                    del pending[:-keep]
+                continue
+
+            capture.write(bytes(pending[:index]))
+            del pending[:index]
+            line_end = pending.find(b"\n", len(marker))
+            if line_end == -1:
+                # wait for the rest of the sentinel line
+                continue
+
+            # anything after the sentinel line is late output of background jobs,
+            # which is dropped just like the previous implementation did
+            return bytes(pending[len(marker) : line_end])
+
+
+# programs whose output only depends on their arguments and the files they read,
+# which leaves out e.g. `date`
+READ_ONLY_PROGRAMS = frozenset(
+    {
+        "cat",
+        "cut",
+        "diff",
+        "du",
+        "egrep",
+        "fgrep",
+        "find",
+        "grep",
+        "head",
+        "ls",
+        "nl",
+        "pwd",
+        "stat",
+        "tail",
+        "wc",
+    }
+)
+READ_ONLY_GIT_COMMANDS = frozenset(
+    {"blame", "diff", "grep", "log", "ls-files", "rev-parse", "show", "status"}
+)
+# options of find that run or write something
+_FIND_WRITE_OPTIONS = frozenset(
+    {
+        "-delete",
+        "-exec",
+        "-execdir",
+        "-ok",
+        "-okdir",
+        "-fprint",
+        "-fprint0",
+        "-fprintf",
+        "-fls",
+    }
+)
+# options of tail that keep it running, including the `tail -10f` of old
+_TAIL_FOLLOW_OPTION = re.compile(r"^(-[^-]*[fF]|--follow(=.*)?)$")
+# devices and kernel state, whose content changes without their mtime
+_VOLATILE_PATHS = re.compile(r"^(.*=)?/(dev|proc|sys)(/|$)")
+_SED_PRINT_SCRIPT = re.compile(r"^(\d+|\$)(,(\d+|\$))?p$")
+_COMMAND_SEPARATORS = frozenset({"|", "||", "&&", ";"})
+
+
+def _split_command(command: str) -> list[str] | None:
+    """Split a command into words and operators, None when it can not be split safely."""
+    # command substitutions run anything, and newlines separate commands that
+    # shlex would join into one
+    if "\n" in command or "`" in command or "$(" in command:
+        return None
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        return list(lexer)
+    except ValueError:
+        return None
+
+
+def _is_read_only_program(words: list[str]) -> bool:
+    if not words:
+        return False
+    program, args = os.path.basename(words[0]), words[1:]
+    if any(_VOLATILE_PATHS.match(arg) for arg in args):
+        return False
+    if program == "tail":
+        return not any(_TAIL_FOLLOW_OPTION.match(arg) for arg in args)
+    if program == "git":
+        return (
+            bool(args)
+            and args[0] in READ_ONLY_GIT_COMMANDS
+            and not any(arg.startswith("--output") for arg in args)
         )
+    if program == "find":
+        return not _FIND_WRITE_OPTIONS.intersection(args)
+    if program == "sed":
+        # only the `sed -n 10,25p file` recommended by the tool description
+        return (
+            len(args) >= 2
+            and args[0] == "-n"
+            and bool(_SED_PRINT_SCRIPT.match(args[1]))
+        )
+    return program in READ_ONLY_PROGRAMS
 
-        # clear the buffers so that the next output can be read correctly
-        self._process.stdout._buffer.clear()  # type: ignore[attr-defined]
-        self._process.stderr._buffer.clear()  # type: ignore[attr-defined]
 
-        return ToolExecResult(output=output, error=error, error_code=error_code)
+def is_read_only_command(command: str) -> bool:
+    """Whether every command of a pipeline or list is known not to change anything.
+
+    Output may only be redirected to /dev/null or another output stream.
+    """
+    tokens = _split_command(command)
+    if not tokens:
+        return False
+    words: list[str] = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in _COMMAND_SEPARATORS:
+            if not _is_read_only_program(words):
+                return False
+            words = []
+        elif token in (">", ">>", "&>"):
+            if tokens[i + 1 : i + 2] != ["/dev/null"]:
+                return False
+            i += 1
+        elif token == ">&":
+            if not tokens[i + 1 : i + 2] or not tokens[i + 1].isdigit():
+                return False
+            i += 1
+        elif token[0] in "();<>|&":
+            # subshells, input redirections, background jobs
+            return False
+        else:
+            words.append(token)
+        i += 1
+    return _is_read_only_program(words)
+
+
+# the (path, mtime, inode, size) of a file, or the path of a missing one
+_Fingerprint = tuple[tuple[str, int, int, int] | str, ...]
+
+
+def _reads_tree(program: str, args: list[str]) -> bool:
+    """Whether a program reads whole directory trees, e.g. `grep -r`."""
+    if program in ("du", "find", "git"):
+        return True
+    short = "".join(arg[1:] for arg in args if re.match(r"-[^-]", arg))
+    long = [arg.split("=")[0] for arg in args if arg.startswith("--")]
+    if program in ("egrep", "fgrep", "grep"):
+        return (
+            "r" in short
+            or "R" in short
+            or "--recursive" in long
+            or "--dereference-recursive" in long
+        )
+    if program == "ls":
+        return "R" in short or "--recursive" in long
+    if program == "diff":
+        return "r" in short or "--recursive" in long
+    return False
+
+
+def _stat_path(path: str, fingerprint: list[tuple[str, int, int, int] | str]) -> None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        fingerprint.append(path)
+        return
+    fingerprint.append((path, stat.st_mtime_ns, stat.st_ino, stat.st_size))
+    if not os.path.isdir(path):
+        return
+    # the mtime of a directory does not change when one of its files does
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                stat = entry.stat(follow_symlinks=False)
+                fingerprint.append(
+                    (entry.path, stat.st_mtime_ns, stat.st_ino, stat.st_size)
+                )
+    except OSError:
+        pass
+
+
+def _fingerprint(command: str, cwd: str | None) -> _Fingerprint | None:
+    """The working directory and the (mtime, inode, size) of the paths a command reads.
+
+    Relative paths are taken from `cwd`, and glob patterns are expanded like
+    the shell would. None when the files read can not be known, so the result
+    of the command can not be reused: the command reads whole directory trees,
+    or names a path relative to an unknown working directory, or a path with a
+    variable in it.
+    """
+    tokens = _split_command(command)
+    if tokens is None:
+        return None
+    fingerprint: list[tuple[str, int, int, int] | str] = [cwd or ""]
+    segments: list[list[str]] = [[]]
+    redirected = False
+    for token in tokens:
+        if token in _COMMAND_SEPARATORS:
+            segments.append([])
+        elif token[0] in "<>&":
+            # the target of a redirection is written, not read
+            redirected = True
+        elif redirected:
+            redirected = False
+        else:
+            segments[-1].append(token)
+    for words in segments:
+        if not words:
+            continue
+        program, args = os.path.basename(words[0]), words[1:]
+        if _reads_tree(program, args):
+            return None
+        paths = [arg for arg in args if not arg.startswith("-")]
+        if program == "ls" and not paths:
+            paths = ["."]
+        for path in paths:
+            if "$" in path:
+                return None
+            path = os.path.expanduser(path)
+            if not os.path.isabs(path):
+                if cwd is None:
+                    return None
+                path = os.path.join(cwd, path)
+            if glob.has_magic(path):
+                fingerprint.append(path)
+                for match in sorted(glob.glob(path)):
+                    _stat_path(match, fingerprint)
+            else:
+                _stat_path(path, fingerprint)
+    return tuple(fingerprint)
+
+
+class BashResultCache:
+    """Results of read-only commands, reused until the files may have changed.
+
+    Every command that is not read-only and every write of the file editor
+    calls `invalidate`, which drops all results. A result is also not reused
+    once one of the paths named by its command changed, e.g. a file written by
+    a background job, or the files of a named directory. The results of
+    commands reading whole directory trees are not kept, nor those of commands
+    reading a file modified so recently that a change could go unnoticed.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[_Fingerprint, ToolExecResult]] = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, command: str, cwd: str | None) -> ToolExecResult | None:
+        """The result of `command` run in `cwd`, if none of the files it reads changed since."""
+        entry = self._entries.get(command)
+        if entry is not None and entry[0] == _fingerprint(command, cwd):
+            self._entries.move_to_end(command)
+            self.hits += 1
+            return dataclasses.replace(entry[1])
+        self.misses += 1
+        return None
+
+    def put(self, command: str, result: ToolExecResult, cwd: str | None) -> None:
+        fingerprint = _fingerprint(command, cwd)
+        if fingerprint is None:
+            return
+        # mtimes are coarse, a file modified just now could change again unnoticed
+        racy = time.time_ns() - RACY_MTIME_NS
+        if any(isinstance(file, tuple) and file[1] > racy for file in fingerprint):
+            return
+        self._entries[command] = (fingerprint, dataclasses.replace(result))
+        self._entries.move_to_end(command)
+        if len(self._entries) > self.max_entries:
+            _ = self._entries.popitem(last=False)
+
+    def invalidate(self, path: Path | None = None) -> None:
+        """Drop all results, e.g. after `path` was written."""
+        if self._entries:
+            self.invalidations += 1
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
 
 
 class BashTool(Tool):
@@ -137,9 +510,14 @@ class BashTool(Tool):
     The tool parameters are defined by Anthropic and are not editable.
     """
 
+    # the commands run one after another in a single shell
+    limits = ToolLimits(max_concurrency=1)
+
     def __init__(self, model_provider: str | None = None):
         super().__init__(model_provider)
         self._session: _BashSession | None = None
+        # results of read-only commands, off unless set
+        self.result_cache: BashResultCache | None = None
 
     @override
     def get_model_provider(self) -> str | None:
@@ -181,6 +559,16 @@ class BashTool(Tool):
             ),
         ]
 
+    @override
+    def get_access(self, arguments: ToolCallArguments) -> ToolAccess:
+        """Any file may be accessed, a command only reads them if it is read only."""
+        command = arguments.get("command")
+        return ToolAccess(
+            read_only=not arguments.get("restart")
+            and isinstance(command, str)
+            and is_read_only_command(command)
+        )
+
     @override
     async def execute(self, arguments: ToolCallArguments) -> ToolExecResult:
         if arguments.get("restart"):
@@ -188,6 +576,8 @@ class BashTool(Tool):
                 self._session.stop()
             self._session = _BashSession()
             await self._session.start()
+            if self.result_cache is not None:
+                self.result_cache.invalidate()
 
             return ToolExecResult(output="tool has been restarted.")
 
@@ -206,9 +596,32 @@ class BashTool(Tool):
                 error=f"No command provided for the {self.get_name()} tool",
                 error_code=-1,
             )
+        cache = self.result_cache
+        if cache is not None:
+            if not is_read_only_command(command):
+                cache.invalidate()
+                cache = None
+            elif (cached := cache.get(command, self._session.cwd)) is not None:
+                return cached
+        session = self._session
         try:
-            return await self._session.run(command)
+            result = await session.run(command)
+        except asyncio.CancelledError:
+            self._discard_session()
+            raise
         except Exception as e:
+            if session.timed_out:
+                self._discard_session()
             return ToolExecResult(
                 error=f"Error running bash command: {e}", error_code=-1
             )
+        # not the results of a broken session, e.g. a restart is required
+        if cache is not None and result.error_code != -1:
+            cache.put(command, result, session.cwd)
+        return result
+
+    def _discard_session(self) -> None:
+        """Forget a killed shell, the next command starts a new one."""
+        self._session = None
+        if self.result_cache is not None:
+            self.result_cache.invalidate()
@@ -0,0 +1,132 @@
+# Copyright (c) 2025 ByteDance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""Crash-safe writes of edited files, and the journal to undo them."""
+
+import contextlib
+import os
+import shutil
+import stat
+import tempfile
+import uuid
+import weakref
+from collections.abc import Iterable
+from pathlib import Path
+
+
+def atomic_write(path: Path, content: str, sync: bool = True) -> None:
+    """Replace the file at `path` with `content`, so it has either its old or its new content.
+
+    The content is written to a temporary file next to `path`, which is then
+    renamed over it, keeping the permissions of the replaced file. Unless
+    `sync` is false, the file and its directory are flushed to disk before
+    returning, otherwise `sync_files` has to be called to make the write
+    durable.
+    """
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        _ = tmp.write_text(content)
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = None
+        if mode is not None:
+            os.chmod(tmp, mode)
+        if sync:
+            _fsync(tmp)
+        _ = tmp.replace(path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if sync:
+        _fsync(path.parent)
+
+
+def sync_files(paths: Iterable[Path]) -> None:
+    """Flush the files at `paths` and their directories to disk."""
+    paths = set(paths)
+    for path in [*paths, *{path.parent for path in paths}]:
+        # removed since it was written
+        with contextlib.suppress(FileNotFoundError):
+            _fsync(path)
+
+
+def _fsync(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class UndoJournal:
+    """The original files of the edits of the last `max_steps` agent steps.
+
+    Before a file is changed for the first time in a step, its original is
+    kept in a temporary directory: as files are replaced and never written in
+    place, a hard link to the original is enough, and the original is only
+    copied when it is on another file system. Undoing a step renames the
+    originals back, or removes the files the step created.
+    """
+
+    def __init__(self, max_steps: int = 8):
+        self.max_steps = max_steps
+        # path -> its original, None if the file did not exist
+        self._step: dict[Path, Path | None] = {}
+        self._steps: list[dict[Path, Path | None]] = []
+        self._directory: str | None = None
+
+    def record(self, path: Path) -> None:
+        """Keep the original of `path`, unless it was kept already in this step."""
+        if path in self._step:
+            return
+        backup = Path(self._get_directory()) / uuid.uuid4().hex
+        try:
+            os.link(path, backup)
+        except FileNotFoundError:
+            self._step[path] = None
+            return
+        except OSError:
+            _ = shutil.copy2(path, backup)
+        self._step[path] = backup
+
+    def end_step(self) -> None:
+        """Close the current step, forgetting the oldest one when there are too many."""
+        if not self._step:
+            return
+        self._steps.append(self._step)
+        self._step = {}
+        while len(self._steps) > self.max_steps:
+            self._discard(self._steps.pop(0))
+
+    def undo(self) -> list[Path]:
+        """Restore the files changed in the last step with edits, return their paths."""
+        if self._step:
+            step, self._step = self._step, {}
+        elif self._steps:
+            step = self._steps.pop()
+        else:
+            return []
+        for path, backup in step.items():
+            if backup is None:
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                os.replace(backup, path)
+            except OSError:
+                # the journal is on another file system
+                _ = shutil.move(backup, path)
+        return list(step)
+
+    def _discard(self, step: dict[Path, Path | None]) -> None:
+        for backup in step.values():
+            if backup is not None:
+                backup.unlink(missing_ok=True)
+
+    def _get_directory(self) -> str:
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="trae-undo-")
+            _ = weakref.finalize(
+                self, shutil.rmtree, self._directory, ignore_errors=True
+            )
+        return self._directory
@@ -9,19 +9,40 @@
 #
 # This modified file is released under the same license.
 
+import os
+from collections.abc import Callable
 from pathlib import Path
 from typing import override
 
-from .base import Tool, ToolCallArguments, ToolError, ToolExecResult, ToolParameter
-from .run import maybe_truncate, run
+from .base import (
+    Tool,
+    ToolAccess,
+    ToolCallArguments,
+    ToolError,
+    ToolExecResult,
+    ToolParameter,
+)
+from .edit_journal import UndoJournal, atomic_write, sync_files
+from .file_cache import (
+    LARGE_FILE_BYTES,
+    CachedFile,
+    FileCache,
+    MappedFile,
+    file_key,
+)
+from .run import MAX_RESPONSE_LEN, maybe_truncate, run
 
 EditToolSubCommands = [
     "view",
     "create",
     "str_replace",
     "insert",
+    "multi_edit",
+    "undo_edit",
 ]
 SNIPPET_LINES: int = 4
+# bytes of a large file decoded for a view, enough for the characters that are shown
+MAPPED_VIEW_BYTES: int = 4 * MAX_RESPONSE_LEN + 4
 
 
 class TextEditorTool(Tool):
@@ -29,6 +50,13 @@ class TextEditorTool(Tool):
 
     def __init__(self, model_provider: str | None = None) -> None:
         super().__init__(model_provider)
+        # called with the path of every written file, e.g. to invalidate cached command results
+        self.write_listeners: list[Callable[[Path], None]] = []
+        self.file_cache: FileCache = FileCache()
+        # written files are flushed to disk at the end of the agent step, not after every write
+        self.defer_fsync: bool = True
+        self._unsynced: set[Path] = set()
+        self.undo_journal: UndoJournal = UndoJournal()
 
     @override
     def get_model_provider(self) -> str | None:
@@ -50,11 +78,40 @@ Notes for using the `str_replace` command:
 * The `old_str` parameter should match EXACTLY one or more consecutive lines from the original file. Be mindful of whitespaces!
 * If the `old_str` parameter is not unique in the file, the replacement will not be performed. Make sure to include enough context in `old_str` to make it unique
 * The `new_str` parameter should contain the edited lines that should replace the `old_str`
+
+Notes for using the `multi_edit` command:
+* Use it instead of several `str_replace` commands: `edits` is a list of `old_str`/`new_str` replacements, applied in order, each to the result of the previous ones
+* An edit may have its own `path` to edit another file, otherwise it applies to `path`
+* Either all edits are performed, or none of them if any `old_str` is missing or not unique
+
+Notes for using the `undo_edit` command:
+* It reverts all the files changed by the edits of the last step that made edits, and can be repeated to go further back
 """
 
     @override
     def get_parameters(self) -> list[ToolParameter]:
         """Get the parameters for the str_replace_based_edit_tool."""
+        edit_schema: dict[str, object] = {
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "Absolute path to the file, `path` if not given.",
+                },
+                "old_str": {
+                    "type": "string",
+                    "description": "The string to replace, which must appear exactly once.",
+                },
+                "new_str": {
+                    "type": "string",
+                    "description": "The string replacing `old_str`.",
+                },
+            },
+            "required": ["old_str", "new_str"],
+        }
+        # For OpenAI, extra properties are not allowed, for Gemini this field is not allowed
+        if self.model_provider == "openai":
+            edit_schema["additionalProperties"] = False
         return [
             ToolParameter(
                 name="command",
@@ -63,6 +120,12 @@ Notes for using the `str_replace` command:
                 required=True,
                 enum=EditToolSubCommands,
             ),
+            ToolParameter(
+                name="edits",
+                type="array",
+                description="Required parameter of `multi_edit` command, with the replacements to perform, e.g. [{'old_str': 'a = 1', 'new_str': 'a = 2'}, {'path': '/repo/other.py', 'old_str': 'b', 'new_str': 'c'}].",
+                items=edit_schema,
+            ),
             ToolParameter(
                 name="file_text",
                 type="string",
@@ -106,6 +169,8 @@ Notes for using the `str_replace` command:
                 error=f"No command provided for the {self.get_name()} tool",
                 error_code=-1,
             )
+        if command == "undo_edit":
+            return self.undo_edit()
         path = str(arguments["path"]) if "path" in arguments else None
         if path is None:
             return ToolExecResult(
@@ -172,6 +237,14 @@ Notes for using the `str_replace` command:
                         error_code=-1,
                     )
                 return self.insert(_path, insert_line, new_str_to_insert)
+            elif command == "multi_edit":
+                edits = arguments.get("edits") if "edits" in arguments else None
+                if not isinstance(edits, list) or not edits:
+                    return ToolExecResult(
+                        error="Parameter `edits` is required and should be a non-empty list for command: multi_edit",
+                        error_code=-1,
+                    )
+                return self.multi_edit(_path, edits)
             else:
                 return ToolExecResult(
                     error=f"Unrecognized command {command}. The allowed commands for the {self.name} tool are: {', '.join(EditToolSubCommands)}",
@@ -180,6 +253,29 @@ Notes for using the `str_replace` command:
         except ToolError as e:
             return ToolExecResult(error=str(e), error_code=-1)
 
+    @override
+    def get_access(self, arguments: ToolCallArguments) -> ToolAccess:
+        """A view reads its path, the other commands write theirs."""
+        command = arguments.get("command")
+        paths = [arguments.get("path")]
+        edits = arguments.get("edits")
+        if command == "multi_edit" and isinstance(edits, list):
+            paths += [
+                edit["path"]
+                for edit in edits
+                if isinstance(edit, dict) and "path" in edit
+            ]
+        if command == "undo_edit" or not all(
+            isinstance(path, str) and os.path.isabs(path) for path in paths
+        ):
+            # the files of the last step, or a call that fails
+            return ToolAccess()
+        return ToolAccess(
+            read_only=command == "view",
+            # files are written through symbolic links, see `write_file`
+            paths=tuple(os.path.realpath(str(path)) for path in paths),
+        )
+
     def validate_path(self, command: str, path: Path):
         """Validate the path for the str_replace_editor tool."""
         if not path.is_absolute():
@@ -219,15 +315,16 @@ Notes for using the `str_replace` command:
                 stdout = f"Here's the files and directories up to 2 levels deep in {path}, excluding hidden items:\n{stdout}\n"
             return ToolExecResult(error_code=return_code, output=stdout, error=stderr)
 
-        file_content = self.read_file(path)
-        init_line = 1
+        # a large file is not read, only the lines that are shown are decoded
+        mapped = self.map_large_file(path)
+        file = mapped or self.read_cached_file(path)
+        init_line, final_line = 1, -1
         if view_range:
             if len(view_range) != 2 or not all(isinstance(i, int) for i in view_range):  # pyright: ignore[reportUnnecessaryIsInstance]
                 raise ToolError(
                     "Invalid `view_range`. It should be a list of two integers."
                 )
-            file_lines = file_content.split("\n")
-            n_lines_file = len(file_lines)
+            n_lines_file = file.num_lines
             init_line, final_line = view_range
             if init_line < 1 or init_line > n_lines_file:
                 raise ToolError(
@@ -242,10 +339,10 @@ Notes for using the `str_replace` command:
                     f"Invalid `view_range`: {view_range}. Its second element `{final_line}` should be larger or equal than its first `{init_line}`"
                 )
 
-            if final_line == -1:
-                file_content = "\n".join(file_lines[init_line - 1 :])
-            else:
-                file_content = "\n".join(file_lines[init_line - 1 : final_line])
+        if mapped is not None:
+            file_content = mapped.lines(init_line, final_line, MAPPED_VIEW_BYTES)
+        else:
+            file_content = file.lines(init_line, final_line)
 
         return ToolExecResult(
             output=self._make_output(file_content, str(path), init_line=init_line)
@@ -255,27 +352,31 @@ Notes for using the `str_replace` command:
         self, path: Path, old_str: str, new_str: str | None
     ) -> ToolExecResult:
         """Implement the str_replace command, which replaces old_str with new_str in the file content"""
-        # Read the file content
-        file_content = self.read_file(path).expandtabs()
         old_str = old_str.expandtabs()
         new_str = new_str.expandtabs() if new_str is not None else ""
 
+        # check a large file for a unique occurrence before reading it, unless
+        # its content is cached and there is nothing to read
+        if not self.is_file_cached(path):
+            mapped = self.map_large_file(path)
+            if mapped is not None and mapped.plain:
+                lines = mapped.find_all(old_str)
+                self._check_unique(path, old_str, len(lines), lines)
+
+        # Read the file content
+        file_content = self.read_cached_file(path).expanded
+
         # Check if old_str is unique in the file
         occurrences = file_content.count(old_str)
-        if occurrences == 0:
-            raise ToolError(
-                f"No replacement was performed, old_str `{old_str}` did not appear verbatim in {path}."
-            )
-        elif occurrences > 1:
+        lines: list[int] = []
+        if occurrences > 1:
             file_content_lines = file_content.split("\n")
             lines = [
                 idx + 1
                 for idx, line in enumerate(file_content_lines)
                 if old_str in line
             ]
-            raise ToolError(
-                f"No replacement was performed. Multiple occurrences of old_str `{old_str}` in lines {lines}. Please ensure it is unique"
-            )
+        self._check_unique(path, old_str, occurrences, lines)
 
         # Replace old_str with new_str
         new_file_content = file_content.replace(old_str, new_str)
@@ -302,7 +403,7 @@ Notes for using the `str_replace` command:
 
     def insert(self, path: Path, insert_line: int, new_str: str) -> ToolExecResult:
         """Implement the insert command, which inserts new_str at the specified line in the file content."""
-        file_text = self.read_file(path).expandtabs()
+        file_text = self.read_cached_file(path).expanded
         new_str = new_str.expandtabs()
         file_text_lines = file_text.split("\n")
         n_lines_file = len(file_text_lines)
@@ -340,21 +441,230 @@ Notes for using the `str_replace` command:
             output=success_msg,
         )
 
-    # Note: undo_edit method is not implemented in this version as it was removed
+    def multi_edit(self, default_path: Path, edits: list[object]) -> ToolExecResult:
+        """Implement the multi_edit command, which performs all the replacements of `edits` or none of them"""
+        file_edits: dict[Path, list[tuple[int, str, str]]] = {}
+        paths: dict[str, Path] = {}
+        for number, edit in enumerate(edits, start=1):
+            if not isinstance(edit, dict):
+                raise ToolError(
+                    f"Edit {number} should be an object with `old_str` and `new_str`."
+                )
+            path = edit.get("path", str(default_path))  # pyright: ignore[reportUnknownMemberType]
+            old_str = edit.get("old_str")  # pyright: ignore[reportUnknownMemberType]
+            new_str = edit.get("new_str")  # pyright: ignore[reportUnknownMemberType]
+            if not isinstance(path, str):
+                raise ToolError(f"The `path` of edit {number} should be a string.")
+            if not isinstance(old_str, str):
+                raise ToolError(
+                    f"The `old_str` of edit {number} is required and should be a string."
+                )
+            if not (new_str is None or isinstance(new_str, str)):
+                raise ToolError(
+                    f"The `new_str` of edit {number} should be a string or null."
+                )
+            self.validate_path("str_replace", Path(path))
+            # the edits of a file reached by several paths, e.g. through a symbolic
+            # link, apply to the same content, under the first of these paths
+            file_path = paths.setdefault(os.path.realpath(path), Path(path))
+            file_edits.setdefault(file_path, []).append(
+                (number, old_str.expandtabs(), (new_str or "").expandtabs())
+            )
+
+        # perform all the replacements in memory, nothing is written if one fails
+        original_contents: dict[Path, str] = {}
+        new_contents: dict[Path, str] = {}
+        edited_spans: dict[Path, list[tuple[int, int]]] = {}
+        for path, replacements in file_edits.items():
+            file = self.read_cached_file(path)
+            content = file.expanded
+            spans: list[tuple[int, int]] = []
+            for number, old_str, new_str in replacements:
+                occurrences = content.count(old_str)
+                if occurrences != 1:
+                    raise ToolError(
+                        f"No edit was performed. The `old_str` of edit {number} `{old_str}` "
+                        + (
+                            f"did not appear verbatim in {path}."
+                            if occurrences == 0
+                            else f"appeared {occurrences} times in {path}. Please ensure it is unique"
+                        )
+                    )
+                start = content.index(old_str)
+                old_end = start + len(old_str)
+                content = content[:start] + new_str + content[old_end:]
+                # move the spans of the previous edits after this one
+                shift = len(new_str) - len(old_str)
+                spans = [
+                    (s + shift if s >= old_end else s, e + shift if e >= old_end else e)
+                    for s, e in spans
+                ]
+                spans.append((start, start + len(new_str)))
+            original_contents[path] = file.content
+            new_contents[path] = content
+            edited_spans[path] = spans
+
+        written: list[Path] = []
+        try:
+            for path, content in new_contents.items():
+                self.write_file(path, content)
+                written.append(path)
+        except ToolError as e:
+            for path in written:
+                try:
+                    self.write_file(path, original_contents[path])
+                except ToolError as rollback_error:
+                    raise ToolError(
+                        f"{e.message}. Restoring the edited files failed, {rollback_error.message}"
+                    ) from None
+            raise ToolError(f"{e.message}. No file was changed.") from None
+
+        success_msg = f"{len(edits)} edits were performed in {', '.join(str(path) for path in new_contents)}. "
+        for path, content in new_contents.items():
+            success_msg += self._make_snippets(path, content, edited_spans[path])
+        success_msg += "Review the changes and make sure they are as expected. Edit the files again if necessary."
+        return ToolExecResult(output=success_msg)
+
+    def _make_snippets(
+        self, path: Path, content: str, spans: list[tuple[int, int]]
+    ) -> str:
+        """Snippets of `content` around the edited `spans`, the overlapping ones merged."""
+        ranges: list[list[int]] = []
+        for start, end in sorted(spans):
+            first = max(0, content.count("\n", 0, start) - SNIPPET_LINES)
+            last = content.count("\n", 0, end) + SNIPPET_LINES
+            if ranges and first <= ranges[-1][1] + 1:
+                ranges[-1][1] = max(ranges[-1][1], last)
+            else:
+                ranges.append([first, last])
+
+        lines = content.split("\n")
+        return "".join(
+            self._make_output(
+                "\n".join(lines[first : last + 1]), f"a snippet of {path}", first + 1
+            )
+            for first, last in ranges
+        )
+
+    def undo_edit(self) -> ToolExecResult:
+        """Implement the undo_edit command, reverting the edits of the last step."""
+        try:
+            paths = self.undo_journal.undo()
+        except OSError as e:
+            return ToolExecResult(
+                error=f"Ran into {e} while trying to undo the last edits", error_code=-1
+            )
+        if not paths:
+            return ToolExecResult(error="There are no edits to undo.", error_code=-1)
+        for path in paths:
+            self.file_cache.discard(path)
+            for listener in self.write_listeners:
+                listener(path)
+        if self.defer_fsync:
+            self._unsynced.update(paths)
+        else:
+            sync_files(paths)
+        return ToolExecResult(
+            output=f"The last edits of {', '.join(str(path) for path in paths)} were undone."
+        )
+
+    @override
+    def end_step(self) -> None:
+        """Flush the files written in the step to disk, and close its undo journal."""
+        unsynced, self._unsynced = self._unsynced, set()
+        sync_files(unsynced)
+        self.undo_journal.end_step()
+
+    def _check_unique(
+        self, path: Path, old_str: str, occurrences: int, lines: list[int]
+    ) -> None:
+        """Raise a ToolError unless `old_str` occurs once; `lines` are those of the occurrences."""
+        if occurrences == 0:
+            raise ToolError(
+                f"No replacement was performed, old_str `{old_str}` did not appear verbatim in {path}."
+            )
+        if occurrences > 1:
+            raise ToolError(
+                f"No replacement was performed. Multiple occurrences of old_str `{old_str}` in lines {lines}. Please ensure it is unique"
+            )
+
+    def map_large_file(self, path: Path) -> MappedFile | None:
+        """Map `path` if it is a large file, reusing the mapping while the file is unchanged."""
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if stat.st_size < LARGE_FILE_BYTES:
+            return None
+        key = file_key(stat)
+        if (cached := self.file_cache.get_mapped(path, key)) is not None:
+            return cached
+        try:
+            file = MappedFile(path)
+        except (OSError, ValueError) as e:
+            raise ToolError(f"Ran into {e} while trying to read {path}") from None
+        # not kept when the file was just modified, it is unmapped once unused
+        self.file_cache.put_mapped(path, key, file)
+        return file
 
     def read_file(self, path: Path):
         """Read the content of a file from a given path; raise a ToolError if an error occurs."""
+        return self.read_cached_file(path).content
+
+    def is_file_cached(self, path: Path) -> bool:
+        """Whether the content of `path` is cached, and the file unchanged since."""
+        try:
+            key = file_key(path.stat())
+        except OSError:
+            return False
+        return self.file_cache.get(path, key) is not None
+
+    def read_cached_file(self, path: Path) -> CachedFile:
+        """Read a file, reusing its content while the file is unchanged; raise a ToolError if an error occurs."""
+        try:
+            key = file_key(path.stat())
+        except OSError:
+            key = None
+        if key is not None and (cached := self.file_cache.get(path, key)):
+            return cached
+
         try:
-            return path.read_text()
+            file = CachedFile(path.read_text())
         except Exception as e:
             raise ToolError(f"Ran into {e} while trying to read {path}") from None
+        # stat before reading, a file changed in between is read again next time
+        if key is not None:
+            self.file_cache.put(path, key, file)
+        return file
 
     def write_file(self, path: Path, file: str):
         """Write the content of a file to a given path; raise a ToolError if an error occurs."""
+        self.file_cache.discard(path)
+        # a symbolic link is kept, the file it points to is replaced
+        target = Path(os.path.realpath(path))
         try:
-            _ = path.write_text(file)
+            self.undo_journal.record(target)
+            atomic_write(target, file, sync=not self.defer_fsync)
+            if self.defer_fsync:
+                self._unsynced.add(target)
         except Exception as e:
             raise ToolError(f"Ran into {e} while trying to write to {path}") from None
+        else:
+            self._cache_written_file(path, file)
+        finally:
+            # a failed write may still have changed the file
+            for listener in self.write_listeners:
+                listener(path)
+
+    def _cache_written_file(self, path: Path, file: str) -> None:
+        try:
+            key = file_key(path.stat())
+        except OSError:
+            return
+        if "\r" in file:
+            # the content read back has universal newlines
+            file = file.replace("\r\n", "\n").replace("\r", "\n")
+        self.file_cache.put(path, key, CachedFile(file), written=True)
 
     def _make_output(
         self,
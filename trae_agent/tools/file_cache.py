@@ -0,0 +1,201 @@
+# Copyright (c) 2025 ByteDance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""Decoded file contents kept between tool calls."""
+
+import mmap
+import os
+import re
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+
+# (st_mtime_ns, st_size, st_ino) of the file a content was read from
+FileKey = tuple[int, int, int]
+# files read less than this after they were modified are not cached: mtimes are
+# coarse, so the file could still change without its mtime changing
+RACY_MTIME_NS = 1_000_000_000
+# files at least this large are mapped, only the lines that are used are decoded
+LARGE_FILE_BYTES = 8 * 1024 * 1024
+_NEWLINE = re.compile(b"\n")
+
+
+def file_key(stat: os.stat_result) -> FileKey:
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class CachedFile:
+    """The content of a file, with the offsets of its lines computed once."""
+
+    def __init__(self, content: str):
+        self.content: str = content
+        self._line_starts: list[int] | None = None
+        self._expanded: str | None = None
+
+    @property
+    def line_starts(self) -> list[int]:
+        """The offset of every line, the lines being those of `content.split("\\n")`."""
+        if self._line_starts is None:
+            starts = [0]
+            content = self.content
+            index = content.find("\n")
+            while index != -1:
+                starts.append(index + 1)
+                index = content.find("\n", index + 1)
+            self._line_starts = starts
+        return self._line_starts
+
+    @property
+    def num_lines(self) -> int:
+        return len(self.line_starts)
+
+    @property
+    def expanded(self) -> str:
+        """The content with its tabs expanded."""
+        if self._expanded is None:
+            self._expanded = self.content.expandtabs()
+        return self._expanded
+
+    def lines(self, first: int, last: int = -1) -> str:
+        """Lines `first` to `last` (from 1, inclusive, -1 for the end) joined by newlines."""
+        starts = self.line_starts
+        start = starts[first - 1]
+        if last == -1 or last >= len(starts):
+            return self.content[start:]
+        return self.content[start : starts[last] - 1]
+
+
+class MappedFile:
+    """A large file mapped into memory, with the offsets of its lines.
+
+    The offsets are found once, in a pass over the mapping that does not
+    decode it, and take 8 bytes per line. Lines are decoded as UTF-8 when they
+    are used, with Windows line endings turned into newlines like `read_text`.
+    """
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._map: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.line_starts: array[int] = array("q", [0])
+        self.line_starts.extend(match.end() for match in _NEWLINE.finditer(self._map))
+        self._plain: bool | None = None
+
+    @property
+    def num_lines(self) -> int:
+        return len(self.line_starts)
+
+    @property
+    def plain(self) -> bool:
+        """Whether the bytes are the text, with no tabs to expand and no line endings to convert."""
+        # a mapping is only reused while the file is unchanged
+        if self._plain is None:
+            self._plain = self._map.find(b"\t") == -1 and self._map.find(b"\r") == -1
+        return self._plain
+
+    def lines(self, first: int, last: int = -1, max_bytes: int | None = None) -> str:
+        """Lines `first` to `last` (from 1, inclusive, -1 for the end), at most `max_bytes` of them."""
+        starts = self.line_starts
+        start = starts[first - 1]
+        end = len(self._map) if last == -1 or last >= len(starts) else starts[last] - 1
+        if max_bytes is not None:
+            end = min(end, start + max_bytes)
+        return self._decode(start, end)
+
+    def find_all(self, text: str) -> list[int]:
+        """The line number of every occurrence of `text`, found in a single pass."""
+        needle = text.encode()
+        lines: list[int] = []
+        if not needle:
+            return lines
+        index = self._map.find(needle)
+        while index != -1:
+            lines.append(bisect_right(self.line_starts, index))
+            index = self._map.find(needle, index + len(needle))
+        return lines
+
+    def close(self) -> None:
+        self._map.close()
+
+    def _decode(self, start: int, end: int) -> str:
+        text = self._map[start:end].decode(errors="replace")
+        return text.replace("\r\n", "\n") if "\r" in text else text
+
+
+class FileCache:
+    """The most recently used file contents, reused while the file is unchanged.
+
+    A content is only returned while the (mtime, size, inode) of the file are
+    those it was read or written with, so changes made by other processes are
+    noticed. A file read within a second of being modified is not cached,
+    unless the content is the one just written. At most `max_files` contents
+    with `max_chars` characters in total are kept, and at most
+    `max_mapped_files` large files stay mapped.
+    """
+
+    def __init__(
+        self,
+        max_files: int = 32,
+        max_chars: int = 32 * 1024 * 1024,
+        max_mapped_files: int = 4,
+    ):
+        self.max_files = max_files
+        self.max_chars = max_chars
+        self.max_mapped_files = max_mapped_files
+        self._files: OrderedDict[str, tuple[FileKey, CachedFile]] = OrderedDict()
+        self._chars = 0
+        self._mapped: OrderedDict[str, tuple[FileKey, MappedFile]] = OrderedDict()
+
+    def get(self, path: Path, key: FileKey) -> CachedFile | None:
+        entry = self._files.get(str(path))
+        if entry is None:
+            return None
+        if entry[0] != key:
+            self.discard(path)
+            return None
+        self._files.move_to_end(str(path))
+        return entry[1]
+
+    def put(
+        self, path: Path, key: FileKey, file: CachedFile, written: bool = False
+    ) -> None:
+        """Cache the content of a file, read or `written` by the caller."""
+        self.discard(path)
+        if len(file.content) > self.max_chars:
+            return
+        if not written and time.time_ns() - key[0] < RACY_MTIME_NS:
+            return
+        self._files[str(path)] = (key, file)
+        self._chars += len(file.content)
+        while len(self._files) > self.max_files or self._chars > self.max_chars:
+            _, (_, evicted) = self._files.popitem(last=False)
+            self._chars -= len(evicted.content)
+
+    def get_mapped(self, path: Path, key: FileKey) -> MappedFile | None:
+        entry = self._mapped.get(str(path))
+        if entry is None:
+            return None
+        if entry[0] != key:
+            self.discard(path)
+            return None
+        self._mapped.move_to_end(str(path))
+        return entry[1]
+
+    def put_mapped(self, path: Path, key: FileKey, file: MappedFile) -> None:
+        """Keep a large file mapped."""
+        self.discard(path)
+        if time.time_ns() - key[0] < RACY_MTIME_NS:
+            return
+        self._mapped[str(path)] = (key, file)
+        while len(self._mapped) > self.max_mapped_files:
+            _, (_, evicted) = self._mapped.popitem(last=False)
+            evicted.close()
+
+    def discard(self, path: Path) -> None:
+        entry = self._files.pop(str(path), None)
+        if entry is not None:
+            self._chars -= len(entry[1].content)
+        mapped = self._mapped.pop(str(path), None)
+        if mapped is not None:
+            mapped[1].close()
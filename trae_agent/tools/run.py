@@ -17,6 +17,10 @@ import contextlib
 TRUNCATED_MESSAGE: str = "<response clipped><NOTE>To save on context only part of this file has been shown to you. You should retry this tool after you have searched inside the file with `grep -n` in order to find the line numbers of what you are looking for.</NOTE>"
 MAX_RESPONSE_LEN: int = 16000
 
+# an utf-8 encoded character takes at most this many bytes
+_MAX_CHAR_BYTES: int = 4
+_READ_SIZE: int = 64 * 1024
+
 
 def maybe_truncate(content: str, truncate_after: int | None = MAX_RESPONSE_LEN):
     """Truncate content and append a notice if content exceeds the specified length."""
@@ -27,22 +31,123 @@ def maybe_truncate(content: str, truncate_after: int | None = MAX_RESPONSE_LEN):
     )
 
 
+class OutputCapture:
+    """Bounded-memory capture of a byte stream.
+
+    Only the first `head_size` and the last `tail_size` characters of the stream
+    are retained, together with byte and line counters, so memory use does not
+    depend on how much output is produced. With `tail_size=0` the rendered text
+    is the same as `maybe_truncate(stream.decode(), head_size)`.
+    """
+
+    def __init__(
+        self, head_size: int | None = MAX_RESPONSE_LEN, tail_size: int = 0
+    ) -> None:
+        self.head_size: int | None = head_size
+        self.tail_size: int = tail_size if head_size else 0
+        self.total_bytes: int = 0
+        self.total_lines: int = 0
+        self._head: bytearray = bytearray()
+        self._tail: bytearray = bytearray()
+        # limits are in bytes, large enough to hold the requested number of characters
+        self._head_limit: int | None = (
+            head_size * _MAX_CHAR_BYTES if head_size else None
+        )
+        self._tail_limit: int = self.tail_size * _MAX_CHAR_BYTES
+
+    @property
+    def dropped_bytes(self) -> int:
+        """Number of bytes that were not retained."""
+        return self.total_bytes - len(self._head) - len(self._tail)
+
+    def write(self, data: bytes) -> None:
+        """Append a chunk of the stream."""
+        self.total_bytes += len(data)
+        self.total_lines += data.count(b"\n")
+
+        if self._head_limit is None:
+            self._head += data
+            return
+
+        room = self._head_limit - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if data and self._tail_limit:
+            self._tail += data
+            excess = len(self._tail) - self._tail_limit
+            if excess > 0:
+                del self._tail[:excess]
+
+    def getvalue(self) -> str:
+        """Decode the retained output, with a clipped notice if it was truncated."""
+        if self.dropped_bytes == 0:
+            text = (self._head + self._tail).decode(errors="replace")
+            if not self.head_size or len(text) <= self.head_size + self.tail_size:
+                return text
+            head = text[: self.head_size]
+            tail = text[len(text) - self.tail_size :] if self.tail_size else ""
+        else:
+            head = self._head.decode(errors="replace")[: self.head_size]
+            tail = _decode_tail(self._tail)[-self.tail_size :] if self.tail_size else ""
+
+        if not tail:
+            return head + TRUNCATED_MESSAGE
+
+        omitted_lines = self.total_lines - head.count("\n") - tail.count("\n")
+        return (
+            head
+            + TRUNCATED_MESSAGE
+            + f"\n<NOTE>{omitted_lines} lines omitted, the output had {self.total_lines} lines and {self.total_bytes} bytes in total. The end of the output follows.</NOTE>\n"
+            + tail
+        )
+
+
+def _decode_tail(data: bytearray) -> str:
+    """Decode the tail of a stream, skipping a character cut off at its start."""
+    start = 0
+    while start < min(len(data), _MAX_CHAR_BYTES - 1) and data[start] & 0xC0 == 0x80:
+        start += 1
+    return data[start:].decode(errors="replace")
+
+
+async def _read_into(stream: asyncio.StreamReader, capture: OutputCapture) -> None:
+    """Read `stream` until EOF into `capture`."""
+    while chunk := await stream.read(_READ_SIZE):
+        capture.write(chunk)
+
+
 async def run(
     cmd: str,
     timeout: float | None = 120.0,  # seconds
     truncate_after: int | None = MAX_RESPONSE_LEN,
+    keep_tail: int = 0,
 ):
-    """Run a shell command asynchronously with a timeout."""
+    """Run a shell command asynchronously with a timeout.
+
+    The output is streamed into bounded captures, so only the first
+    `truncate_after` and the last `keep_tail` characters are kept in memory.
+    """
     process = await asyncio.create_subprocess_shell(
         cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
     )
+    assert process.stdout and process.stderr
 
+    stdout = OutputCapture(truncate_after, keep_tail)
+    stderr = OutputCapture(truncate_after, keep_tail)
     try:
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        _ = await asyncio.wait_for(
+            asyncio.gather(
+                _read_into(process.stdout, stdout),
+                _read_into(process.stderr, stderr),
+                process.wait(),
+            ),
+            timeout=timeout,
+        )
         return (
             process.returncode or 0,
-            maybe_truncate(stdout.decode(), truncate_after=truncate_after),
-            maybe_truncate(stderr.decode(), truncate_after=truncate_after),
+            stdout.getvalue(),
+            stderr.getvalue(),
         )
     except asyncio.TimeoutError as exc:
         with contextlib.suppress(ProcessLookupError):
@@ -5,9 +5,7 @@
 
 import json
 import os
-import random
-import time
-from typing import override
+from typing import Any, override
 
 import anthropic
 from anthropic.types.tool_union_param import TextEditor20250429
@@ -17,6 +15,8 @@ from ..utils.config import ModelParameters
 from ..utils.llm_basics import LLMMessage, LLMResponse, LLMUsage
 from .base_client import BaseLLMClient
 
+CACHE_CONTROL = anthropic.types.CacheControlEphemeralParam(type="ephemeral")
+
 
 class AnthropicClient(BaseLLMClient):
     """Anthropic client wrapper with tool schema generation."""
@@ -35,6 +35,8 @@ class AnthropicClient(BaseLLMClient):
         self.client: anthropic.Anthropic = anthropic.Anthropic(api_key=self.api_key)
         self.message_history: list[anthropic.types.MessageParam] = []
         self.system_message: str | anthropic.NotGiven = anthropic.NOT_GIVEN
+        # index of the message that carried the moving cache breakpoint last time
+        self._cache_breakpoint: int | None = None
 
     @override
     def set_chat_history(self, messages: list[LLMMessage]) -> None:
@@ -50,6 +52,56 @@ class AnthropicClient(BaseLLMClient):
         reuse_history: bool = True,
     ) -> LLMResponse:
         """Send chat messages to Anthropic with optional tool support."""
+        request = self._prepare_request(
+            messages, model_parameters, tools, reuse_history
+        )
+        response = self.call_with_retries(
+            lambda: self.client.messages.create(**request),
+            model_parameters.max_retries,
+            "Anthropic",
+        )
+        return self._process_response(response, messages, model_parameters, tools)
+
+    @override
+    async def achat(
+        self,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None = None,
+        reuse_history: bool = True,
+    ) -> LLMResponse:
+        """Send chat messages to Anthropic without blocking the event loop."""
+        request = self._prepare_request(
+            messages, model_parameters, tools, reuse_history
+        )
+        client = self.async_client
+        response = await self.acall_with_retries(
+            lambda: client.messages.create(**request),
+            model_parameters.max_retries,
+            "Anthropic",
+        )
+        return self._process_response(response, messages, model_parameters, tools)
+
+    @property
+    def async_client(self) -> anthropic.AsyncAnthropic:
+        """The async client of the running event loop, on the shared connection pool."""
+        return self.get_async_client(
+            lambda http_client: anthropic.AsyncAnthropic(
+                api_key=self.api_key, http_client=http_client
+            )
+        )
+
+    def _prepare_request(
+        self,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None,
+        reuse_history: bool,
+    ) -> dict[str, Any]:
+        """Update the message history and build the arguments of the messages request."""
+        if not reuse_history:
+            # a new conversation, which has no system message unless it is given
+            self.system_message = anthropic.NOT_GIVEN
         # Convert messages to Anthropic format
         anthropic_messages: list[anthropic.types.MessageParam] = self.parse_messages(
             messages
@@ -66,56 +118,98 @@ class AnthropicClient(BaseLLMClient):
             anthropic.NOT_GIVEN
         )
         if tools:
-            tool_schemas = []
-            for tool in tools:
-                if tool.name == "str_replace_based_edit_tool":
-                    tool_schemas.append(
-                        TextEditor20250429(
-                            name="str_replace_based_edit_tool",
-                            type="text_editor_20250429",
-                        )
-                    )
-                elif tool.name == "bash":
-                    tool_schemas.append(
-                        anthropic.types.ToolBash20250124Param(
-                            name="bash", type="bash_20250124"
-                        )
-                    )
-                else:
-                    tool_schemas.append(
-                        anthropic.types.ToolParam(
-                            name=tool.name,
-                            description=tool.description,
-                            input_schema=tool.get_input_schema(),
-                        )
-                    )
+            # the cached schemas are shared, so mark a copy of the list
+            tool_schemas = list(self.get_tool_schemas(tools, self._tool_schema))
+            # tools come first in the prompt, so this caches all of them
+            tool_schemas[-1] = {**tool_schemas[-1], "cache_control": CACHE_CONTROL}
 
-        response = None
-        error_message = ""
-        for i in range(model_parameters.max_retries):
-            try:
-                response = self.client.messages.create(
-                    model=model_parameters.model,
-                    messages=self.message_history,
-                    max_tokens=model_parameters.max_tokens,
-                    system=self.system_message,
-                    tools=tool_schemas if tool_schemas else anthropic.NOT_GIVEN,
-                    temperature=model_parameters.temperature,
-                    top_p=model_parameters.top_p,
-                    top_k=model_parameters.top_k,
+        system: list[anthropic.types.TextBlockParam] | anthropic.NotGiven = (
+            anthropic.NOT_GIVEN
+        )
+        if self.system_message:
+            system = [
+                anthropic.types.TextBlockParam(
+                    type="text", text=self.system_message, cache_control=CACHE_CONTROL
                 )
-                break
-            except Exception as e:
-                error_message += f"Error {i + 1}: {str(e)}\n"
-                # Randomly sleep for 3-30 seconds
-                time.sleep(random.randint(3, 30))
-                continue
+            ]
 
-        if response is None:
-            raise ValueError(
-                f"Failed to get response from Anthropic after max retries: {error_message}"
+        return {
+            "model": model_parameters.model,
+            "messages": self._mark_cache_breakpoints(reuse_history),
+            "max_tokens": model_parameters.max_tokens,
+            "system": system,
+            "tools": tool_schemas if tool_schemas else anthropic.NOT_GIVEN,
+            "temperature": model_parameters.temperature,
+            "top_p": model_parameters.top_p,
+            "top_k": model_parameters.top_k,
+        }
+
+    def _tool_schema(self, tool: Tool) -> anthropic.types.ToolUnionParam:
+        """Describe a tool to the model, using the built-in definitions where they exist."""
+        if tool.name == "str_replace_based_edit_tool":
+            return TextEditor20250429(
+                name="str_replace_based_edit_tool", type="text_editor_20250429"
+            )
+        if tool.name == "bash":
+            return anthropic.types.ToolBash20250124Param(
+                name="bash", type="bash_20250124"
+            )
+        return anthropic.types.ToolParam(
+            name=tool.name,
+            description=tool.description,
+            input_schema=tool.get_input_schema(),
+        )
+
+    def _mark_cache_breakpoints(
+        self, reuse_history: bool
+    ) -> list[anthropic.types.MessageParam]:
+        """Return the message history with cache breakpoints on its latest turn.
+
+        The breakpoint moves forward with the conversation, so every request reads
+        the prefix cached by the previous one and caches its own. The message that
+        carried the breakpoint last time keeps one, which keeps the cache hit even
+        when many messages were added in between. The history itself is not
+        modified.
+        """
+        messages = list(self.message_history)
+        if not messages:
+            return messages
+
+        breakpoints = {len(messages) - 1}
+        if (
+            reuse_history
+            and self._cache_breakpoint is not None
+            and self._cache_breakpoint < len(messages)
+        ):
+            breakpoints.add(self._cache_breakpoint)
+        self._cache_breakpoint = len(messages) - 1 if reuse_history else None
+
+        for index in breakpoints:
+            message = messages[index]
+            content = message["content"]
+            if isinstance(content, str):
+                blocks: list[Any] = [{"type": "text", "text": content}]
+            else:
+                blocks = [
+                    block.model_dump() if hasattr(block, "model_dump") else dict(block)
+                    for block in content
+                ]
+            if not blocks:
+                continue
+            blocks[-1] = {**blocks[-1], "cache_control": CACHE_CONTROL}
+            messages[index] = anthropic.types.MessageParam(
+                role=message["role"], content=blocks
             )
+        return messages
 
+    def _process_response(
+        self,
+        response: anthropic.types.Message,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None,
+    ) -> LLMResponse:
+        """Convert a message to an LLMResponse and append it to the message history."""
         # Handle tool calls in response
         content = ""
         tool_calls: list[ToolCall] = []
@@ -144,12 +238,18 @@ class AnthropicClient(BaseLLMClient):
 
         usage = None
         if response.usage:
+            cache_creation_input_tokens = (
+                response.usage.cache_creation_input_tokens or 0
+            )
+            cache_read_input_tokens = response.usage.cache_read_input_tokens or 0
             usage = LLMUsage(
-                input_tokens=response.usage.input_tokens,
+                # Anthropic does not count cached tokens as input tokens
+                input_tokens=response.usage.input_tokens
+                + cache_creation_input_tokens
+                + cache_read_input_tokens,
                 output_tokens=response.usage.output_tokens,
-                cache_creation_input_tokens=response.usage.cache_creation_input_tokens
-                or 0,
-                cache_read_input_tokens=response.usage.cache_read_input_tokens or 0,
+                cache_creation_input_tokens=cache_creation_input_tokens,
+                cache_read_input_tokens=cache_read_input_tokens,
             )
 
         llm_response = LLMResponse(
@@ -2,13 +2,69 @@
 # SPDX-License-Identifier: MIT
 
 
+import asyncio
+import random
+import time
+import weakref
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+import httpx
+from openai.types import CompletionUsage
 
 from ..tools.base import Tool
 from ..utils.config import ModelParameters
-from ..utils.llm_basics import LLMMessage, LLMResponse
+from ..utils.llm_basics import LLMMessage, LLMResponse, LLMUsage
 from ..utils.trajectory_recorder import TrajectoryRecorder
 
+T = TypeVar("T")
+
+# number of toolsets whose schemas are kept by each client
+TOOL_SCHEMA_CACHE_SIZE = 8
+
+# One pooled HTTP client per event loop, shared by all async provider clients.
+# Connections are bound to the loop they were opened on, so the pool cannot be
+# shared across loops.
+_async_http_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, httpx.AsyncClient
+] = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Get the pooled async HTTP client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=httpx.Timeout(timeout=600.0, connect=5.0),
+            follow_redirects=True,
+        )
+        _async_http_clients[loop] = client
+    return client
+
+
+def chat_completion_usage(usage: CompletionUsage | None) -> LLMUsage | None:
+    """Convert the usage of an OpenAI-compatible chat completion."""
+    if usage is None:
+        return None
+    return LLMUsage(
+        input_tokens=usage.prompt_tokens,
+        output_tokens=usage.completion_tokens,
+        cache_read_input_tokens=(
+            usage.prompt_tokens_details.cached_tokens or 0
+            if usage.prompt_tokens_details
+            else 0
+        ),
+        reasoning_tokens=(
+            usage.completion_tokens_details.reasoning_tokens or 0
+            if usage.completion_tokens_details
+            else 0
+        ),
+    )
+
 
 class BaseLLMClient(ABC):
     """Base class for LLM clients."""
@@ -20,6 +76,13 @@ class BaseLLMClient(ABC):
         self.trajectory_recorder: TrajectoryRecorder | None = (
             None  # TrajectoryRecorder instance
         )
+        self._async_clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, Any
+        ] = weakref.WeakKeyDictionary()
+        # provider schemas of recent toolsets, keyed by the identity of their tools
+        self._tool_schemas: OrderedDict[tuple[int, ...], tuple[list[Tool], Any]] = (
+            OrderedDict()
+        )
 
     def set_trajectory_recorder(self, recorder: TrajectoryRecorder | None) -> None:
         """Set the trajectory recorder for this client."""
@@ -41,7 +104,95 @@ class BaseLLMClient(ABC):
         """Send chat messages to the LLM."""
         pass
 
+    @abstractmethod
+    async def achat(
+        self,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None = None,
+        reuse_history: bool = True,
+    ) -> LLMResponse:
+        """Send chat messages to the LLM without blocking the event loop."""
+        pass
+
     @abstractmethod
     def supports_tool_calling(self, model_parameters: ModelParameters) -> bool:
         """Check if the current model supports tool calling."""
         pass
+
+    def get_async_client(self, factory: Callable[[httpx.AsyncClient], T]) -> T:
+        """Get the async SDK client of the running event loop.
+
+        Args:
+            factory: Creates the SDK client on top of the pooled HTTP client. It is
+                only called once per event loop.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = factory(get_async_http_client())
+            self._async_clients[loop] = client
+        return client
+
+    def get_tool_schemas(
+        self, tools: list[Tool], build: Callable[[Tool], T]
+    ) -> list[T]:
+        """Get the provider schemas of a toolset, built once and reused across requests.
+
+        Tools are matched by identity, so a changed toolset gets new schemas. The
+        returned list is shared between requests and must not be modified.
+
+        Args:
+            tools: The tools to describe to the model.
+            build: Converts a tool to its provider schema.
+        """
+        key = tuple(id(tool) for tool in tools)
+        cached = self._tool_schemas.get(key)
+        if cached is not None:
+            self._tool_schemas.move_to_end(key)
+            return cached[1]
+
+        schemas = [build(tool) for tool in tools]
+        # the tools are kept alive with their schemas so that their ids are not reused
+        self._tool_schemas[key] = (list(tools), schemas)
+        if len(self._tool_schemas) > TOOL_SCHEMA_CACHE_SIZE:
+            self._tool_schemas.popitem(last=False)
+        return schemas
+
+    @staticmethod
+    def call_with_retries(
+        call: Callable[[], T], max_retries: int, provider_name: str
+    ) -> T:
+        """Call `call` until it succeeds, sleeping 3-30 seconds between attempts."""
+        error_message = ""
+        for i in range(max_retries):
+            try:
+                return call()
+            except Exception as e:
+                error_message += f"Error {i + 1}: {str(e)}\n"
+                if i < max_retries - 1:
+                    # Randomly sleep for 3-30 seconds
+                    time.sleep(random.randint(3, 30))
+
+        raise ValueError(
+            f"Failed to get response from {provider_name} after max retries: {error_message}"
+        )
+
+    @staticmethod
+    async def acall_with_retries(
+        call: Callable[[], Awaitable[T]], max_retries: int, provider_name: str
+    ) -> T:
+        """Async version of `call_with_retries`, which does not block the event loop."""
+        error_message = ""
+        for i in range(max_retries):
+            try:
+                return await call()
+            except Exception as e:
+                error_message += f"Error {i + 1}: {str(e)}\n"
+                if i < max_retries - 1:
+                    # Randomly sleep for 3-30 seconds
+                    await asyncio.sleep(random.randint(3, 30))
+
+        raise ValueError(
+            f"Failed to get response from {provider_name} after max retries: {error_message}"
+        )
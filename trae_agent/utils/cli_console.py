@@ -51,6 +51,9 @@ class CLIConsole:
         self.agent_step_history: list[AgentStep] = []
         self.agent_execution: AgentExecution | None = None
 
+        # set whenever there is something new to display
+        self._updated: asyncio.Event = asyncio.Event()
+
     def update_status(
         self,
         agent_step: AgentStep | None = None,
@@ -59,27 +62,61 @@ class CLIConsole:
         if agent_step:
             if len(self.agent_step_history) > 0:
                 if agent_step.step_number > self.agent_step_history[-1].step_number:
+                    # a new step has started, so the previous one is finished
+                    self._add_console_step(self.agent_step_history[-1])
                     self.agent_step_history.append(agent_step)
             else:
                 self.agent_step_history.append(agent_step)
 
         self.agent_execution = agent_execution
+        if agent_execution is not None:
+            for step in self.agent_step_history:
+                self._add_console_step(step)
+
+        self._updated.set()
+
+    def _add_console_step(self, agent_step: AgentStep) -> None:
+        """Display a finished step, and start summarizing it in the background."""
+        step_id = agent_step.step_number
+        if step_id in self.console_steps:
+            return
+
+        panel = self._create_compact_step_display(agent_step)
+        if self.lake_view is None:
+            self.console_steps[step_id] = ConsoleStep(panel, None, True)
+            return
+
+        lake_view_panel_generator = asyncio.create_task(
+            self._create_lakeview_step_display(agent_step)
+        )
+        lake_view_panel_generator.add_done_callback(
+            lambda _: self._on_lake_view_step_done(step_id)
+        )
+        self.console_steps[step_id] = ConsoleStep(panel, lake_view_panel_generator)
+
+    def _on_lake_view_step_done(self, step_id: int) -> None:
+        console_step = self.console_steps[step_id]
+        task = console_step.lake_view_panel_generator
+        lake_view_panel = None
+        if task is not None and not task.cancelled() and task.exception() is None:
+            lake_view_panel = task.result()
+
+        self.console_steps[step_id] = ConsoleStep(
+            lake_view_panel or console_step.panel, None, True
+        )
+        self._updated.set()
+
+    def _is_finished(self) -> bool:
+        return self.agent_execution is not None and all(
+            step.lake_view_generator_done for step in self.console_steps.values()
+        )
 
     async def start(self):
-        while True:
-            if self.agent_execution and (
-                self.lake_view is None
-                or (
-                    len(self.agent_execution.steps) == len(self.console_steps)
-                    and all(
-                        step.lake_view_generator_done
-                        for step in self.console_steps.values()
-                    )
-                )
-            ):
-                break
+        # redraw as soon as a step changes or a summary is ready, instead of polling
+        while not self._is_finished():
+            self._updated.clear()
             self.print_task_progress()
-            await asyncio.sleep(3)
+            await self._updated.wait()
 
         self.print_task_progress()
         if self.live_display is not None:
@@ -246,40 +283,9 @@ class CLIConsole:
         else:
             previous_steps = self.agent_step_history
             current_step = None
-        if len(previous_steps) > 0:
-            for step in previous_steps:
-                step_id = step.step_number
-                if step_id not in self.console_steps:
-                    panel = self._create_compact_step_display(step)
-                    if self.lake_view is not None:
-                        lake_view_panel_generator = asyncio.create_task(
-                            self._create_lakeview_step_display(step)
-                        )
-                    else:
-                        lake_view_panel_generator = None
-                    self.console_steps[step_id] = ConsoleStep(
-                        panel, lake_view_panel_generator
-                    )
-                    panels.append(panel)
-                else:
-                    console_step = self.console_steps[step_id]
-                    if self.lake_view is None:
-                        panels.append(console_step.panel)
-                    else:
-                        if console_step.lake_view_panel_generator is not None:
-                            if console_step.lake_view_panel_generator.done():
-                                lake_view_panel = (
-                                    console_step.lake_view_panel_generator.result()
-                                    or console_step.panel
-                                )
-                                panels.append(lake_view_panel)
-                                self.console_steps[step_id] = ConsoleStep(
-                                    lake_view_panel, None, True
-                                )
-                            else:
-                                panels.append(console_step.panel)
-                        else:
-                            panels.append(console_step.panel)
+        for step in previous_steps:
+            self._add_console_step(step)
+            panels.append(self.console_steps[step.step_number].panel)
 
         if current_step is not None:
             panels.append(self._create_step_display(current_step))
@@ -326,6 +332,12 @@ class CLIConsole:
             table.add_row("Total Tokens", str(total_tokens))
             table.add_row("Input Tokens", str(execution.total_tokens.input_tokens))
             table.add_row("Output Tokens", str(execution.total_tokens.output_tokens))
+            table.add_row(
+                "Cached Tokens", str(execution.total_tokens.cache_read_input_tokens)
+            )
+            table.add_row(
+                "Cache Hit Ratio", f"{execution.total_tokens.cache_hit_ratio:.1%}"
+            )
 
         # Display final result
         if execution.final_result:
@@ -10,10 +10,12 @@
 
 import json
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, override
 
+from ..tools.base import ToolLimits
+
 
 # data class for model parameters
 @dataclass
@@ -40,6 +42,9 @@ class LakeviewConfig:
 
     model_provider: str
     model_name: str
+    max_concurrency: int = 4  # maximum number of concurrent LLM requests
+    tagger_recent_steps: int = 5  # steps the tagger sees verbatim
+    tagger_summary_chars: int = 20_000  # budget for summaries of older steps
 
 
 @dataclass
@@ -51,6 +56,10 @@ class Config:
     model_providers: dict[str, ModelParameters]
     lakeview_config: LakeviewConfig | None = None
     enable_lakeview: bool = True
+    enable_bash_cache: bool = False  # reuse the results of read-only bash commands
+    # limits of the calls of the tools, by tool name
+    tool_limits: dict[str, ToolLimits] = field(default_factory=dict)
+    max_parallel_tool_calls: int | None = None  # tool calls running at once
 
     def __init__(self, config_or_config_file: str | dict = "trae_config.json"):
         # Accept either file path or direct config dict
@@ -74,6 +83,24 @@ class Config:
         self.max_steps = self._config.get("max_steps", 20)
         self.model_providers = {}
         self.enable_lakeview = self._config.get("enable_lakeview", True)
+        self.enable_bash_cache = self._config.get("enable_bash_cache", False)
+        self.tool_limits = {
+            tool_name: ToolLimits(
+                timeout=float(limits["timeout"])
+                if limits.get("timeout") is not None
+                else None,
+                max_concurrency=int(limits["max_concurrency"])
+                if limits.get("max_concurrency") is not None
+                else None,
+            )
+            for tool_name, limits in self._config.get("tool_limits", {}).items()
+        }
+        max_parallel_tool_calls = self._config.get("max_parallel_tool_calls")
+        self.max_parallel_tool_calls = (
+            int(max_parallel_tool_calls)
+            if max_parallel_tool_calls is not None
+            else None
+        )
 
         if len(self._config.get("model_providers", [])) == 0:
             self.model_providers = {
@@ -132,6 +159,19 @@ class Config:
                         "model_name", "claude-sonnet-4-20250514"
                     )
                 ),
+                max_concurrency=int(
+                    self._config.get("lakeview_config", {}).get("max_concurrency", 4)
+                ),
+                tagger_recent_steps=int(
+                    self._config.get("lakeview_config", {}).get(
+                        "tagger_recent_steps", 5
+                    )
+                ),
+                tagger_summary_chars=int(
+                    self._config.get("lakeview_config", {}).get(
+                        "tagger_summary_chars", 20_000
+                    )
+                ),
             )
 
         return
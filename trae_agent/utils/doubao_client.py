@@ -5,12 +5,11 @@
 
 import json
 import os
-import random
-import time
-from typing import override
+from typing import Any, override
 
 import openai
 from openai.types.chat import (
+    ChatCompletion,
     ChatCompletionAssistantMessageParam,
     ChatCompletionFunctionMessageParam,
     ChatCompletionMessageParam,
@@ -26,9 +25,9 @@ from openai.types.chat.chat_completion_tool_message_param import (
 from openai.types.shared_params.function_definition import FunctionDefinition
 
 from ..tools.base import Tool, ToolCall
-from .base_client import BaseLLMClient
+from .base_client import BaseLLMClient, chat_completion_usage
 from .config import ModelParameters
-from .llm_basics import LLMMessage, LLMResponse, LLMUsage
+from .llm_basics import LLMMessage, LLMResponse
 
 
 class DoubaoClient(BaseLLMClient):
@@ -77,7 +76,54 @@ class DoubaoClient(BaseLLMClient):
         tools: list[Tool] | None = None,
         reuse_history: bool = True,
     ) -> LLMResponse:
-        """Send chat messages to model provider with optional tool support."""
+        """Send chat messages to Doubao with optional tool support."""
+        request = self._prepare_request(
+            messages, model_parameters, tools, reuse_history
+        )
+        response = self.call_with_retries(
+            lambda: self.client.chat.completions.create(**request),
+            model_parameters.max_retries,
+            "Doubao",
+        )
+        return self._process_response(response, messages, model_parameters, tools)
+
+    @override
+    async def achat(
+        self,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None = None,
+        reuse_history: bool = True,
+    ) -> LLMResponse:
+        """Send chat messages to Doubao without blocking the event loop."""
+        request = self._prepare_request(
+            messages, model_parameters, tools, reuse_history
+        )
+        client = self.async_client
+        response = await self.acall_with_retries(
+            lambda: client.chat.completions.create(**request),
+            model_parameters.max_retries,
+            "Doubao",
+        )
+        return self._process_response(response, messages, model_parameters, tools)
+
+    @property
+    def async_client(self) -> openai.AsyncOpenAI:
+        """The async client of the running event loop, on the shared connection pool."""
+        return self.get_async_client(
+            lambda http_client: openai.AsyncOpenAI(
+                base_url=self.base_url, api_key=self.api_key, http_client=http_client
+            )
+        )
+
+    def _prepare_request(
+        self,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None,
+        reuse_history: bool,
+    ) -> dict[str, Any]:
+        """Update the message history and build the arguments of the completion request."""
         doubao_messages = self.parse_messages(messages)
         if reuse_history:
             self.message_history = self.message_history + doubao_messages
@@ -87,43 +133,37 @@ class DoubaoClient(BaseLLMClient):
         tool_schemas = None
         # Add tools if provided
         if tools:
-            tool_schemas = [
-                ChatCompletionToolParam(
+            tool_schemas = self.get_tool_schemas(
+                tools,
+                lambda tool: ChatCompletionToolParam(
                     function=FunctionDefinition(
                         name=tool.get_name(),
                         description=tool.get_description(),
                         parameters=tool.get_input_schema(),
                     ),
                     type="function",
-                )
-                for tool in tools
-            ]
-
-        response = None
-        error_message = ""
-        for i in range(model_parameters.max_retries):
-            try:
-                response = self.client.chat.completions.create(
-                    model=model_parameters.model,
-                    messages=self.message_history,
-                    tools=tool_schemas if tool_schemas else openai.NOT_GIVEN,
-                    temperature=model_parameters.temperature,
-                    top_p=model_parameters.top_p,
-                    max_tokens=model_parameters.max_tokens,
-                    n=1,
-                )
-                break
-            except Exception as e:
-                error_message += f"Error {i + 1}: {str(e)}\n"
-                # Randomly sleep for 3-30 seconds
-                time.sleep(random.randint(3, 30))
-                continue
-
-        if response is None:
-            raise ValueError(
-                f"Failed to get response from Doubao after max retries: {error_message}"
+                ),
             )
 
+        return {
+            "model": model_parameters.model,
+            # a copy, as the replies of other requests may be appended meanwhile
+            "messages": list(self.message_history),
+            "tools": tool_schemas if tool_schemas else openai.NOT_GIVEN,
+            "temperature": model_parameters.temperature,
+            "top_p": model_parameters.top_p,
+            "max_tokens": model_parameters.max_tokens,
+            "n": 1,
+        }
+
+    def _process_response(
+        self,
+        response: ChatCompletion,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None,
+    ) -> LLMResponse:
+        """Convert a completion to an LLMResponse and append it to the message history."""
         choice = response.choices[0]
 
         tool_calls: list[ToolCall] | None = None
@@ -145,12 +185,7 @@ class DoubaoClient(BaseLLMClient):
             tool_calls=tool_calls,
             finish_reason=choice.finish_reason,
             model=response.model,
-            usage=LLMUsage(
-                input_tokens=response.usage.prompt_tokens,
-                output_tokens=response.usage.completion_tokens,
-            )
-            if response.usage
-            else None,
+            usage=chat_completion_usage(response.usage),
         )
 
         # update message history
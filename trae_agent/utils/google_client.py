@@ -5,11 +5,9 @@
 
 import json
 import os
-import random
-import time
 import traceback
 import uuid
-from typing import override
+from typing import Any, override
 
 from google import genai
 from google.genai import types
@@ -54,12 +52,54 @@ class GoogleClient(BaseLLMClient):
         reuse_history: bool = True,
     ) -> LLMResponse:
         """Send chat messages to Gemini with optional tool support."""
+        request = self._prepare_request(
+            messages, model_parameters, tools, reuse_history
+        )
+        response = self.call_with_retries(
+            lambda: self.client.models.generate_content(**request),
+            model_parameters.max_retries,
+            "Gemini",
+        )
+        return self._process_response(
+            response, request, messages, model_parameters, tools
+        )
+
+    @override
+    async def achat(
+        self,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None = None,
+        reuse_history: bool = True,
+    ) -> LLMResponse:
+        """Send chat messages to Gemini without blocking the event loop."""
+        request = self._prepare_request(
+            messages, model_parameters, tools, reuse_history
+        )
+        response = await self.acall_with_retries(
+            lambda: self.client.aio.models.generate_content(**request),
+            model_parameters.max_retries,
+            "Gemini",
+        )
+        return self._process_response(
+            response, request, messages, model_parameters, tools
+        )
+
+    def _prepare_request(
+        self,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None,
+        reuse_history: bool,
+    ) -> dict[str, Any]:
+        """Build the arguments of the generate content request."""
         newly_parsed_messages, system_instruction_from_message = self.parse_messages(
             messages
         )
 
-        current_system_instruction = (
-            system_instruction_from_message or self.system_instruction
+        # a new conversation has no system instruction unless it is given
+        current_system_instruction = system_instruction_from_message or (
+            self.system_instruction if reuse_history else None
         )
 
         if reuse_history:
@@ -79,14 +119,14 @@ class GoogleClient(BaseLLMClient):
 
         if tools:
             try:
-                declarations = [
-                    types.FunctionDeclaration(
+                declarations = self.get_tool_schemas(
+                    tools,
+                    lambda tool: types.FunctionDeclaration(
                         name=tool.name,
                         description=tool.description,
                         parameters=tool.get_input_schema(),
-                    )
-                    for tool in tools
-                ]
+                    ),
+                )
                 generation_config.tools = [
                     types.Tool(function_declarations=declarations)
                 ]
@@ -96,27 +136,21 @@ class GoogleClient(BaseLLMClient):
                     f"Failed to convert tools into Gemini FunctionDeclarations: {e}\n{tb}"
                 ) from e
 
-        response = None
-        error_message = ""
-        for i in range(model_parameters.max_retries):
-            try:
-                response = self.client.models.generate_content(
-                    model=model_parameters.model,
-                    contents=current_chat_contents,
-                    config=generation_config,
-                )
-                break
-            except Exception as e:
-                tb = traceback.format_exc()
-                error_message += f"Error {i + 1}: {str(e)}\nTraceback:\n{tb}\n"
-                time.sleep(random.randint(3, 30))
-                continue
-
-        if response is None:
-            raise ValueError(
-                f"Failed to get response from Gemini after max retries: {error_message}"
-            )
+        return {
+            "model": model_parameters.model,
+            "contents": current_chat_contents,
+            "config": generation_config,
+        }
 
+    def _process_response(
+        self,
+        response: types.GenerateContentResponse,
+        request: dict[str, Any],
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None,
+    ) -> LLMResponse:
+        """Convert a response to an LLMResponse and update the message history."""
         content = ""
         tool_calls: list[ToolCall] = []
         assistant_response_content = None
@@ -139,18 +173,14 @@ class GoogleClient(BaseLLMClient):
                             )
                         )
 
-        if reuse_history:
-            new_history = self.message_history + newly_parsed_messages
-        else:
-            new_history = newly_parsed_messages
-
+        new_history: list[types.Content] = list(request["contents"])
         if assistant_response_content:
             new_history.append(assistant_response_content)
 
         self.message_history = new_history
 
-        if current_system_instruction:
-            self.system_instruction = current_system_instruction
+        # the system instruction of the conversation the history now belongs to
+        self.system_instruction = request["config"].system_instruction
 
         usage = None
         if response.usage_metadata:
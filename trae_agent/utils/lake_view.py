@@ -1,10 +1,11 @@
+import asyncio
 import re
 from dataclasses import dataclass
 
 from trae_agent.agent.agent_basics import AgentStep
 
 from .config import Config, ModelParameters
-from .llm_basics import LLMMessage
+from .llm_basics import LLMMessage, LLMResponse
 from .llm_client import LLMClient
 
 StepType = tuple[
@@ -66,6 +67,11 @@ KNOWN_TAGS = {
     "OUTLIER": "⁉️",
 }
 
+# raw steps shown to the tagger are cut to this many characters each
+RECENT_STEP_CHARS = 5_000
+# and each older step is summarized to at most this many characters
+STEP_SUMMARY_CHARS = 300
+
 tags_re = re.compile(r"<tags>([A-Z_,\s]+)</tags>")
 
 
@@ -94,11 +100,24 @@ class LakeView:
             base_url=model_parameters.base_url,
             api_version=model_parameters.api_version,
         )
+        self.model_provider: str = config.lakeview_config.model_provider
         self.lakeview_llm_client: LLMClient = LLMClient(
-            config.lakeview_config.model_provider, self.model_parameters
+            self.model_provider, self.model_parameters
+        )
+        # a client keeps the state of its conversation, e.g. its message history,
+        # so every request in flight has a client of its own
+        self._idle_clients: list[LLMClient] = [self.lakeview_llm_client]
+        # bounds the number of in-flight requests over all steps being summarized
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(
+            config.lakeview_config.max_concurrency
         )
+        self.tagger_recent_steps: int = config.lakeview_config.tagger_recent_steps
+        self.tagger_summary_chars: int = config.lakeview_config.tagger_summary_chars
 
         self.steps: list[str] = []
+        self.step_summaries: list[str] = []
+        # summaries before this index no longer fit in the tagger context
+        self._summary_start: int = 0
 
     def get_label(self, tags: None | list[str], emoji: bool = True) -> str:
         if not tags:
@@ -106,6 +125,21 @@ class LakeView:
 
         return " · ".join([KNOWN_TAGS[tag] + tag if emoji else tag for tag in tags])
 
+    async def _chat(self, llm_messages: list[LLMMessage]) -> LLMResponse:
+        async with self._semaphore:
+            if self._idle_clients:
+                client = self._idle_clients.pop()
+            else:
+                client = LLMClient(self.model_provider, self.model_parameters)
+            try:
+                return await client.achat(
+                    model_parameters=self.model_parameters,
+                    messages=llm_messages,
+                    reuse_history=False,
+                )
+            finally:
+                self._idle_clients.append(client)
+
     async def extract_task_in_step(
         self, prev_step: str, this_step: str
     ) -> tuple[str, str]:
@@ -123,11 +157,7 @@ class LakeView:
         ]
 
         self.model_parameters.temperature = 0.1
-        llm_response = self.lakeview_llm_client.chat(
-            model_parameters=self.model_parameters,
-            messages=llm_messages,
-            reuse_history=False,
-        )
+        llm_response = await self._chat(llm_messages)
 
         content = llm_response.content.strip()
 
@@ -138,11 +168,7 @@ class LakeView:
             or "</details>" not in content
         ):
             retry += 1
-            llm_response = self.lakeview_llm_client.chat(
-                model_parameters=self.model_parameters,
-                messages=llm_messages,
-                reuse_history=False,
-            )
+            llm_response = await self._chat(llm_messages)
             content = llm_response.content.strip()
 
         if (
@@ -158,41 +184,68 @@ class LakeView:
         )
         return desc_task, desc_details
 
-    async def extract_tag_in_step(self, step: str) -> list[str]:
-        steps_fmt = "\n\n".join(
-            f'<step id="{ind + 1}">\n{s.strip()}\n</step>'
-            for ind, s in enumerate(self.steps)
+    def _tagger_context(self, num_steps: int) -> str:
+        """Describe the first `num_steps` steps for the tagger within a fixed budget.
+
+        The most recent steps are shown verbatim, older ones as one-line summaries.
+        Summaries are only ever appended, and dropped from the front in large
+        chunks, so consecutive requests share a long prefix that providers can
+        serve from their prompt cache.
+        """
+        recent_start = max(0, num_steps - self.tagger_recent_steps)
+        summarized = sum(
+            len(s) for s in self.step_summaries[self._summary_start : recent_start]
         )
+        if summarized > self.tagger_summary_chars:
+            while summarized > self.tagger_summary_chars // 2:
+                summarized -= len(self.step_summaries[self._summary_start])
+                self._summary_start += 1
+
+        summary_start = min(self._summary_start, recent_start)
+        summaries = [
+            f"{ind + 1}. {self.step_summaries[ind]}"
+            for ind in range(summary_start, recent_start)
+        ]
+        if summary_start > 0:
+            summaries.insert(0, f"(steps 1-{summary_start} omitted)")
 
-        if len(steps_fmt) > 300_000:
-            # step_fmt is too long, skip tagging
-            return []
+        recent_steps = "\n\n".join(
+            f'<step id="{ind + 1}">\n{self.steps[ind].strip()[:RECENT_STEP_CHARS]}\n</step>'
+            for ind in range(recent_start, num_steps)
+        )
+        return "<summary>\n" + "\n".join(summaries) + "\n</summary>\n\n" + recent_steps
+
+    async def extract_tag_in_step(
+        self, step: str, context: str | None = None
+    ) -> list[str]:
+        if context is None:
+            context = self._tagger_context(len(self.steps))
 
+        # the instructions come first so that they are part of the cached prefix.
+        # They are not a system message, which the client would keep for the
+        # requests of the extractor made on the same client.
         llm_messages = [
+            LLMMessage(role="user", content=TAGGER_PROMPT),
+            LLMMessage(role="assistant", content="I understand."),
             LLMMessage(
                 role="user",
-                content=f"Below is the trajectory of an AI agent solving a software bug until the current step. Each step is marked within a <step> tag.\n\n{steps_fmt}\n\n<current_step>{step}</current_step>",
+                content=f"Below is the trajectory of an AI agent solving a software bug until the current step. Earlier steps are briefly summarized within the <summary> tag, the most recent ones are marked within a <step> tag.\n\n{context}\n\n<current_step>{step[:RECENT_STEP_CHARS]}</current_step>",
             ),
-            LLMMessage(role="assistant", content="I understand."),
-            LLMMessage(role="user", content=TAGGER_PROMPT),
             LLMMessage(role="assistant", content="Sure. The tags are: <tags>"),
         ]
         self.model_parameters.temperature = 0.1
 
         retry = 0
         while retry < 10:
-            llm_response = self.lakeview_llm_client.chat(
-                model_parameters=self.model_parameters,
-                messages=llm_messages,
-                reuse_history=False,
-            )
+            llm_response = await self._chat(llm_messages)
 
             content = "<tags>" + llm_response.content.lstrip()
 
             matched_tags: list[str] = tags_re.findall(content)
-            tags: list[str] = [tag.strip() for tag in matched_tags[0].split(",")]
-            if all(tag in KNOWN_TAGS for tag in tags):
-                return tags
+            if matched_tags:
+                tags: list[str] = [tag.strip() for tag in matched_tags[0].split(",")]
+                if all(tag in KNOWN_TAGS for tag in tags):
+                    return tags
 
             retry += 1
 
@@ -215,19 +268,40 @@ class LakeView:
 
         return content
 
+    def _agent_step_summary(self, agent_step: AgentStep) -> str:
+        assert agent_step.llm_response is not None
+        content = agent_step.llm_response.content.strip()
+        summary = content.splitlines()[0] if content else ""
+
+        if agent_step.llm_response.tool_calls:
+            tool_calls = "; ".join(
+                f"{tool_call.name} {tool_call.arguments}"
+                for tool_call in agent_step.llm_response.tool_calls
+            )
+            summary = f"{summary} [{tool_calls}]" if summary else f"[{tool_calls}]"
+
+        if len(summary) > STEP_SUMMARY_CHARS:
+            summary = summary[: STEP_SUMMARY_CHARS - 3] + "..."
+        return summary
+
     async def create_lakeview_step(self, agent_step: AgentStep) -> LakeViewStep | None:
-        previous_step_str = "(none)"
-        if len(self.steps) > 1:
-            previous_step_str = self.steps[-1]
+        """Summarize a finished step.
 
+        Steps must be submitted in order, but may be summarized concurrently: the
+        context of a step is taken before its first await.
+        """
         this_step_str = self._agent_step_str(agent_step)
+        if not this_step_str:
+            return None
 
-        if this_step_str:
-            desc_task, desc_details = await self.extract_task_in_step(
-                previous_step_str, this_step_str
-            )
-            tags = await self.extract_tag_in_step(this_step_str)
-            tags_emoji = self.get_label(tags)
-            return LakeViewStep(desc_task, desc_details, tags_emoji)
+        previous_step_str = self.steps[-1] if self.steps else "(none)"
+        tagger_context = self._tagger_context(len(self.steps))
+        self.steps.append(this_step_str)
+        self.step_summaries.append(self._agent_step_summary(agent_step))
 
-        return None
+        (desc_task, desc_details), tags = await asyncio.gather(
+            self.extract_task_in_step(previous_step_str, this_step_str),
+            self.extract_tag_in_step(this_step_str, tagger_context),
+        )
+        tags_emoji = self.get_label(tags)
+        return LakeViewStep(desc_task, desc_details, tags_emoji)
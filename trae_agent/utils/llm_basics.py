@@ -20,7 +20,11 @@ class LLMMessage:
 
 @dataclass
 class LLMUsage:
-    """LLM usage format."""
+    """LLM usage format.
+
+    `input_tokens` counts all prompt tokens, including those read from or written
+    to the provider's prompt cache.
+    """
 
     input_tokens: int
     output_tokens: int
@@ -39,6 +43,13 @@ class LLMUsage:
             reasoning_tokens=self.reasoning_tokens + other.reasoning_tokens,
         )
 
+    @property
+    def cache_hit_ratio(self) -> float:
+        """Share of the input tokens that were served from the prompt cache."""
+        if self.input_tokens <= 0:
+            return 0.0
+        return self.cache_read_input_tokens / self.input_tokens
+
     @override
     def __str__(self) -> str:
         return f"LLMUsage(input_tokens={self.input_tokens}, output_tokens={self.output_tokens}, cache_creation_input_tokens={self.cache_creation_input_tokens}, cache_read_input_tokens={self.cache_read_input_tokens}, reasoning_tokens={self.reasoning_tokens})"
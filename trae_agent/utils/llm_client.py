@@ -81,6 +81,16 @@ class LLMClient:
         """Send chat messages to the LLM."""
         return self.client.chat(messages, model_parameters, tools, reuse_history)
 
+    async def achat(
+        self,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None = None,
+        reuse_history: bool = True,
+    ) -> LLMResponse:
+        """Send chat messages to the LLM without blocking the event loop."""
+        return await self.client.achat(messages, model_parameters, tools, reuse_history)
+
     def supports_tool_calling(self, model_parameters: ModelParameters) -> bool:
         """Check if the current client supports tool calling."""
         return hasattr(
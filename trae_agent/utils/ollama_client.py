@@ -6,14 +6,13 @@ Ollama API client wrapper with tool integration
 """
 
 import json
-import random
-import time
-from typing import override
+from typing import Any, override
 
 import openai
 from openai.types.responses import (
     EasyInputMessageParam,
     FunctionToolParam,
+    Response,
     ResponseFunctionToolCallParam,
     ResponseInputParam,
 )
@@ -55,50 +54,93 @@ class OllamaClient(BaseLLMClient):
         reuse_history: bool = True,
     ) -> LLMResponse:
         """Send chat messages to OpenAI with optional tool support."""
+        request = self._prepare_request(
+            messages, model_parameters, tools, reuse_history
+        )
+        response = self.call_with_retries(
+            lambda: self.client.responses.create(**request),
+            model_parameters.max_retries,
+            "OpenAI",
+        )
+        return self._process_response(response, messages, model_parameters, tools)
+
+    @override
+    async def achat(
+        self,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None = None,
+        reuse_history: bool = True,
+    ) -> LLMResponse:
+        """Send chat messages to Ollama without blocking the event loop."""
+        request = self._prepare_request(
+            messages, model_parameters, tools, reuse_history
+        )
+        client = self.async_client
+        response = await self.acall_with_retries(
+            lambda: client.responses.create(**request),
+            model_parameters.max_retries,
+            "OpenAI",
+        )
+        return self._process_response(response, messages, model_parameters, tools)
+
+    @property
+    def async_client(self) -> openai.AsyncOpenAI:
+        """The async client of the running event loop, on the shared connection pool."""
+        return self.get_async_client(
+            lambda http_client: openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.client.base_url,
+                http_client=http_client,
+            )
+        )
+
+    def _prepare_request(
+        self,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None,
+        reuse_history: bool,
+    ) -> dict[str, Any]:
+        """Update the message history and build the arguments of the responses request."""
         openai_messages: ResponseInputParam = self.parse_messages(messages)
 
         tool_schemas = None
         if tools:
-            tool_schemas = [
-                FunctionToolParam(
+            tool_schemas = self.get_tool_schemas(
+                tools,
+                lambda tool: FunctionToolParam(
                     name=tool.name,
                     description=tool.description,
                     parameters=tool.get_input_schema(),
                     strict=True,
                     type="function",
-                )
-                for tool in tools
-            ]
+                ),
+            )
 
         if reuse_history:
             self.message_history = self.message_history + openai_messages
         else:
             self.message_history = openai_messages
 
-        response = None
-        error_message = ""
-        for i in range(model_parameters.max_retries):
-            try:
-                response = self.client.responses.create(
-                    input=self.message_history,
-                    model=model_parameters.model,
-                    tools=tool_schemas if tool_schemas else openai.NOT_GIVEN,
-                    temperature=model_parameters.temperature,
-                    top_p=model_parameters.top_p,
-                    max_output_tokens=model_parameters.max_tokens,
-                )
-                break
-            except Exception as e:
-                error_message += f"Error {i + 1}: {str(e)}\n"
-                # Randomly sleep for 3-30 seconds
-                time.sleep(random.randint(3, 30))
-                continue
-
-        if response is None:
-            raise ValueError(
-                f"Failed to get response from OpenAI after max retries: {error_message}"
-            )
+        return {
+            # a copy, as the replies of other requests may be appended meanwhile
+            "input": list(self.message_history),
+            "model": model_parameters.model,
+            "tools": tool_schemas if tool_schemas else openai.NOT_GIVEN,
+            "temperature": model_parameters.temperature,
+            "top_p": model_parameters.top_p,
+            "max_output_tokens": model_parameters.max_tokens,
+        }
 
+    def _process_response(
+        self,
+        response: Response,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None,
+    ) -> LLMResponse:
+        """Convert a response to an LLMResponse and append it to the message history."""
         content = ""
         tool_calls: list[ToolCall] = []
         for output_block in response.output:
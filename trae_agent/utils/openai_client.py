@@ -5,9 +5,7 @@
 
 import json
 import os
-import random
-import time
-from typing import override
+from typing import Any, override
 
 import openai
 from openai.types.responses import (
@@ -17,6 +15,7 @@ from openai.types.responses import (
     
 )
 from openai.types.chat import (
+    ChatCompletion,
     ChatCompletionMessageParam,
     ChatCompletionAssistantMessageParam,
     ChatCompletionToolParam,
@@ -64,20 +63,70 @@ class OpenAIClient(BaseLLMClient):
         reuse_history: bool = True,
     ) -> LLMResponse:
         """Send chat messages to OpenAI with optional tool support."""
+        request = self._prepare_request(messages, model_parameters, tools, reuse_history)
+        response = self.call_with_retries(
+            lambda: self.client.chat.completions.create(**request),
+            model_parameters.max_retries,
+            "OpenAI",
+        )
+        return self._process_response(
+            response, request["messages"], messages, model_parameters, tools
+        )
+
+    @override
+    async def achat(
+        self,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None = None,
+        reuse_history: bool = True,
+    ) -> LLMResponse:
+        """Send chat messages to OpenAI without blocking the event loop."""
+        request = self._prepare_request(messages, model_parameters, tools, reuse_history)
+        client = self.async_client
+        response = await self.acall_with_retries(
+            lambda: client.chat.completions.create(**request),
+            model_parameters.max_retries,
+            "OpenAI",
+        )
+        return self._process_response(
+            response, request["messages"], messages, model_parameters, tools
+        )
+
+    @property
+    def async_client(self) -> openai.AsyncOpenAI:
+        """The async client of the running event loop, on the shared connection pool."""
+        return self.get_async_client(
+            lambda http_client: openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url="https://api.deepseek.com",
+                http_client=http_client,
+            )
+        )
+
+    def _prepare_request(
+        self,
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None,
+        reuse_history: bool,
+    ) -> dict[str, Any]:
+        """Build the arguments of the completion request."""
         #openai_messages: ResponseInputParam = self.parse_messages(messages)
         openai_messages: list[ChatCompletionMessageParam] = self.parse_messages(messages)
 
         tool_schemas = None
         if tools:
-            tool_schemas = [
-                #FunctionToolParam(
+            tool_schemas = self.get_tool_schemas(
+                tools,
+                #lambda tool: FunctionToolParam(
                 #    name=tool.name,
                 #    description=tool.description,
                 #    parameters=tool.get_input_schema(),
                 #    strict=True,
                 #    type="function",
-                #)
-                ChatCompletionToolParam(
+                #),
+                lambda tool: ChatCompletionToolParam(
                     type="function",
                     function=FunctionDefinition(
                         name=tool.name,
@@ -85,9 +134,8 @@ class OpenAIClient(BaseLLMClient):
                         parameters=tool.get_input_schema(),
                         strict=True
                     )
-                )
-                for tool in tools
-            ]
+                ),
+            )
 
         #api_call_input: ResponseInputParam = []
         api_call_input: list[ChatCompletionMessageParam] = []
@@ -95,35 +143,27 @@ class OpenAIClient(BaseLLMClient):
             api_call_input.extend(self.message_history)
         api_call_input.extend(openai_messages)
 
-        response = None
-        error_message = ""
-        for i in range(model_parameters.max_retries):
-            try:
-                #response = self.client.responses.create(
-                #    input=api_call_input,
-                response = self.client.chat.completions.create(
-                    messages=api_call_input,
-                    model=model_parameters.model,
-                    tools=tool_schemas if tool_schemas else openai.NOT_GIVEN,
-                    temperature=model_parameters.temperature
-                    if "o3" not in model_parameters.model
-                    else openai.NOT_GIVEN,
-                    top_p=model_parameters.top_p,
-                )
-                break
-            except Exception as e:
-                error_message += f"Error {i + 1}: {str(e)}\n"
-                # Randomly sleep for 3-30 seconds
-                time.sleep(random.randint(3, 30))
-                continue
-
-        if response is None:
-            raise ValueError(
-                f"Failed to get response from OpenAI after max retries: {error_message}"
-            )
+        return {
+            "messages": api_call_input,
+            "model": model_parameters.model,
+            "tools": tool_schemas if tool_schemas else openai.NOT_GIVEN,
+            "temperature": model_parameters.temperature
+            if "o3" not in model_parameters.model
+            else openai.NOT_GIVEN,
+            "top_p": model_parameters.top_p,
+        }
 
+    def _process_response(
+        self,
+        response: ChatCompletion,
+        api_call_input: list[ChatCompletionMessageParam],
+        messages: list[LLMMessage],
+        model_parameters: ModelParameters,
+        tools: list[Tool] | None,
+    ) -> LLMResponse:
+        """Convert a completion to an LLMResponse and update the message history."""
         #self.message_history = api_call_input + response.output
-        self.message_history = api_call_input.copy()
+        self.message_history = list(api_call_input)
         self.message_history.append(response.choices[0].message)
 
         #content = ""
@@ -6,46 +6,80 @@
 # pyright: reportArgumentType=false
 # pyright: reportAny=false
 
-"""Trajectory recording functionality for Trae Agent."""
+"""Trajectory recording functionality for Trae Agent.
 
+Trajectories are saved either as a single JSON document, which is rewritten on
+every event, or, when the trajectory path ends with `.jsonl`, as an append-only
+log with one compact record per event. `load_trajectory` reads both formats
+into the JSON layout.
+
+In the append-only format every distinct message is written once, as a
+`message` record keyed by a hash of its content. Message lists of interactions
+and steps are stored as `{"prefix": n, "ids": [...]}`: the first `n` messages
+of the previous list of the same field, followed by the referenced messages.
+This keeps the file linear in the length of the conversation even when every
+interaction carries the full history.
+"""
+
+import hashlib
 import json
+import os
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, TextIO
 
 from ..tools.base import ToolCall, ToolResult
-from .llm_basics import LLMMessage, LLMResponse
+from .llm_basics import LLMMessage, LLMResponse, LLMUsage
+
+
+def _empty_trajectory() -> dict[str, Any]:
+    return {
+        "task": "",
+        "start_time": "",
+        "end_time": "",
+        "provider": "",
+        "model": "",
+        "max_steps": 0,
+        "llm_interactions": [],
+        "agent_steps": [],
+        "success": False,
+        "final_result": None,
+        "execution_time": 0.0,
+    }
 
 
 class TrajectoryRecorder:
     """Records trajectory data for agent execution and LLM interactions."""
 
-    def __init__(self, trajectory_path: str | None = None):
+    def __init__(self, trajectory_path: str | None = None, fsync_interval: float = 5.0):
         """Initialize trajectory recorder.
 
         Args:
             trajectory_path: Path to save trajectory file. If None, generates default path.
+                A path ending with `.jsonl` selects the append-only format.
+            fsync_interval: Minimum number of seconds between two fsyncs of an
+                append-only trajectory. Records are flushed to the OS after every event.
         """
         if trajectory_path is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             trajectory_path = f"trajectory_{timestamp}.json"
 
         self.trajectory_path: Path = Path(trajectory_path)
-        self.trajectory_data: dict[str, Any] = {
-            "task": "",
-            "start_time": "",
-            "end_time": "",
-            "provider": "",
-            "model": "",
-            "max_steps": 0,
-            "llm_interactions": [],
-            "agent_steps": [],
-            "success": False,
-            "final_result": None,
-            "execution_time": 0.0,
-        }
+        self.trajectory_data: dict[str, Any] = _empty_trajectory()
         self._start_time: datetime | None = None
 
+        self.append_only: bool = self.trajectory_path.suffix == ".jsonl"
+        self.fsync_interval: float = fsync_interval
+        self._file: TextIO | None = None
+        self._last_fsync: float = 0.0
+        # ids of the messages written to the append-only file, and of the last
+        # message list written for each field
+        self._message_ids: set[str] = set()
+        self._previous_message_ids: dict[str, list[str]] = {}
+        # token usage of all interactions of the current recording
+        self._total_usage: LLMUsage = LLMUsage(input_tokens=0, output_tokens=0)
+
     def start_recording(
         self, task: str, provider: str, model: str, max_steps: int
     ) -> None:
@@ -58,6 +92,7 @@ class TrajectoryRecorder:
             max_steps: Maximum number of steps allowed
         """
         self._start_time = datetime.now()
+        self._total_usage = LLMUsage(input_tokens=0, output_tokens=0)
         self.trajectory_data.update(
             {
                 "task": task,
@@ -69,7 +104,24 @@ class TrajectoryRecorder:
                 "agent_steps": [],
             }
         )
-        self.save_trajectory()
+        if self.append_only:
+            # a new recording replaces the previous one, like the JSON file does
+            self._close()
+            self._message_ids.clear()
+            self._previous_message_ids.clear()
+            self._append_record(
+                {
+                    "type": "start",
+                    "task": task,
+                    "start_time": self.trajectory_data["start_time"],
+                    "provider": provider,
+                    "model": model,
+                    "max_steps": max_steps,
+                },
+                truncate=True,
+            )
+        else:
+            self.save_trajectory()
 
     def record_llm_interaction(
         self,
@@ -130,7 +182,20 @@ class TrajectoryRecorder:
         }
 
         self.trajectory_data["llm_interactions"].append(interaction)
-        self.save_trajectory()
+        if response.usage:
+            self._total_usage += response.usage
+        if self.append_only:
+            self._append_record(
+                {
+                    "type": "llm_interaction",
+                    **interaction,
+                    "input_messages": self._encode_messages(
+                        "input_messages", interaction["input_messages"]
+                    ),
+                }
+            )
+        else:
+            self.save_trajectory()
 
     def record_agent_step(
         self,
@@ -195,34 +260,68 @@ class TrajectoryRecorder:
         }
 
         self.trajectory_data["agent_steps"].append(step_data)
-        self.save_trajectory()
+        if self.append_only:
+            self._append_record(
+                {
+                    "type": "agent_step",
+                    **step_data,
+                    "llm_messages": self._encode_messages(
+                        "llm_messages", step_data["llm_messages"]
+                    ),
+                }
+            )
+        else:
+            self.save_trajectory()
 
     def finalize_recording(
-        self, success: bool, final_result: str | None = None
+        self,
+        success: bool,
+        final_result: str | None = None,
+        bash_cache_stats: dict[str, int | float] | None = None,
     ) -> None:
         """Finalize the trajectory recording.
 
         Args:
             success: Whether the task completed successfully
             final_result: Final result or output of the task
+            bash_cache_stats: Hits and misses of the bash result cache, if enabled
         """
         end_time = datetime.now()
-        self.trajectory_data.update(
-            {
-                "end_time": end_time.isoformat(),
-                "success": success,
-                "final_result": final_result,
-                "execution_time": (end_time - self._start_time).total_seconds()
-                if self._start_time
-                else 0.0,
-            }
-        )
+        final_data = {
+            "end_time": end_time.isoformat(),
+            "success": success,
+            "final_result": final_result,
+            "execution_time": (end_time - self._start_time).total_seconds()
+            if self._start_time
+            else 0.0,
+            "total_usage": {
+                "input_tokens": self._total_usage.input_tokens,
+                "output_tokens": self._total_usage.output_tokens,
+                "cache_creation_input_tokens": self._total_usage.cache_creation_input_tokens,
+                "cache_read_input_tokens": self._total_usage.cache_read_input_tokens,
+                "reasoning_tokens": self._total_usage.reasoning_tokens,
+                "cache_hit_ratio": round(self._total_usage.cache_hit_ratio, 4),
+            },
+        }
+        if bash_cache_stats is not None:
+            final_data["bash_cache"] = bash_cache_stats
+        self.trajectory_data.update(final_data)
 
         # Save to file
-        self.save_trajectory()
+        if self.append_only:
+            self._append_record({"type": "finalize", **final_data}, fsync=True)
+            self._close()
+        else:
+            self.save_trajectory()
 
     def save_trajectory(self) -> None:
         """Save the current trajectory data to file."""
+        if self.append_only:
+            # records are written as they happen, only make sure they are durable
+            if self._file:
+                self._sync()
+            return
+
         try:
             # Ensure directory exists
             self.trajectory_path.parent.mkdir(parents=True, exist_ok=True)
@@ -233,6 +332,68 @@ class TrajectoryRecorder:
         except Exception as e:
             print(f"Warning: Failed to save trajectory to {self.trajectory_path}: {e}")
 
+    def _append_record(
+        self, record: dict[str, Any], truncate: bool = False, fsync: bool = False
+    ) -> None:
+        """Append one compact record to the append-only trajectory file."""
+        try:
+            if self._file is None:
+                self.trajectory_path.parent.mkdir(parents=True, exist_ok=True)
+                # kept open across events and closed by `finalize_recording`
+                self._file = open(  # noqa: SIM115
+                    self.trajectory_path, "w" if truncate else "a", encoding="utf-8"
+                )
+            self._file.write(
+                json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            )
+            self._file.flush()
+            if fsync or time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._sync()
+        except Exception as e:
+            print(f"Warning: Failed to save trajectory to {self.trajectory_path}: {e}")
+
+    def _encode_messages(
+        self, field: str, messages: list[dict[str, Any]] | None
+    ) -> dict[str, Any] | None:
+        """Write messages not seen before and encode the list relative to the previous one."""
+        if messages is None:
+            return None
+
+        ids: list[str] = []
+        for message in messages:
+            message_id = _message_id(message)
+            if message_id not in self._message_ids:
+                self._append_record(
+                    {"type": "message", "id": message_id, "message": message}
+                )
+                self._message_ids.add(message_id)
+            ids.append(message_id)
+
+        previous_ids = self._previous_message_ids.get(field, [])
+        prefix = 0
+        for previous_id, message_id in zip(previous_ids, ids, strict=False):
+            if previous_id != message_id:
+                break
+            prefix += 1
+        self._previous_message_ids[field] = ids
+        return {"prefix": prefix, "ids": ids[prefix:]}
+
+    def _sync(self) -> None:
+        assert self._file
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _close(self) -> None:
+        if self._file is None:
+            return
+        try:
+            self._sync()
+            self._file.close()
+        except Exception as e:
+            print(f"Warning: Failed to save trajectory to {self.trajectory_path}: {e}")
+        self._file = None
+
     def _serialize_message(self, message: LLMMessage) -> dict[str, Any]:
         """Serialize an LLM message to a dictionary."""
         data: dict[str, Any] = {"role": message.role, "content": message.content}
@@ -262,8 +423,77 @@ class TrajectoryRecorder:
             "result": tool_result.result,
             "error": tool_result.error,
             "id": getattr(tool_result, "id", None),
+            "wall_time": tool_result.wall_time,
         }
 
     def get_trajectory_path(self) -> str:
         """Get the path where trajectory is being saved."""
         return str(self.trajectory_path)
+
+
+def _message_id(message: dict[str, Any]) -> str:
+    """Content address of a serialized message."""
+    content = json.dumps(
+        message, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+def load_trajectory(trajectory_path: str | Path) -> dict[str, Any]:
+    """Load a trajectory file of either format into the JSON layout.
+
+    A truncated last record, e.g. of a run that was killed while writing, is
+    ignored.
+    """
+    trajectory_path = Path(trajectory_path)
+    with open(trajectory_path, "r", encoding="utf-8") as f:
+        if trajectory_path.suffix != ".jsonl":
+            return json.load(f)
+
+        trajectory = _empty_trajectory()
+        messages: dict[str, dict[str, Any]] = {}
+        previous_messages: dict[str, list[dict[str, Any]]] = {}
+
+        def decode(field: str, encoded: dict[str, Any] | None):
+            if encoded is None:
+                return None
+            decoded = previous_messages.get(field, [])[: encoded["prefix"]] + [
+                messages[message_id] for message_id in encoded["ids"]
+            ]
+            previous_messages[field] = decoded
+            return decoded
+
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record: dict[str, Any] = json.loads(line)
+            except json.JSONDecodeError:
+                break
+
+            record_type = record.pop("type")
+            if record_type == "start":
+                trajectory = _empty_trajectory()
+                trajectory.update(record)
+                messages.clear()
+                previous_messages.clear()
+            elif record_type == "message":
+                messages[record["id"]] = record["message"]
+            elif record_type == "llm_interaction":
+                record["input_messages"] = decode(
+                    "input_messages", record["input_messages"]
+                )
+                trajectory["llm_interactions"].append(record)
+            elif record_type == "agent_step":
+                record["llm_messages"] = decode("llm_messages", record["llm_messages"])
+                trajectory["agent_steps"].append(record)
+            elif record_type == "finalize":
+                trajectory.update(record)
+        return trajectory
+
+
+def convert_trajectory(source_path: str | Path, target_path: str | Path) -> None:
+    """Convert a trajectory file to the JSON layout, e.g. an append-only `.jsonl` file."""
+    trajectory = load_trajectory(source_path)
+    with open(target_path, "w", encoding="utf-8") as f:
+        json.dump(trajectory, f, indent=2, ensure_ascii=False)